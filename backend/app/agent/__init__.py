@@ -1,14 +1,22 @@
 """Lightweight Agno-backed agent accessors (no custom harness)."""
 from __future__ import annotations
 
+import asyncio
+import contextvars
+import hashlib
 import json
 import logging
 import threading
-from dataclasses import dataclass
-from typing import Any
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable
 
+from app.core.chat_logging import log_chat_upstream_usage
 from app.core.config import get_settings
+from app.core.metrics import record_upstream_usage
 from app.hitl import set_pending
+from app.services.tokens import estimate_tokens
 from app.skills import build_skill_registry, get_skill_registry
 from app.tool.tools import CHAT_TOOLS, execute_tool
 
@@ -17,6 +25,21 @@ logger = logging.getLogger(__name__)
 _default_agent: _SimpleAgent | None = None
 _default_agent_lock = threading.Lock()
 
+AGENT_PERSONA = "Reply in character: accurate, helpful, concise, and encouraging. Use tools when appropriate."
+
+
+@dataclass(frozen=True, slots=True)
+class AgentSystemPrompt:
+    """Static agent instructions (persona, tools, skill registry), compiled once per agent.
+
+    Sent as the system instructions so every turn starts with the same prefix and the provider can
+    reuse its prompt cache; per-turn data goes in the user message after it. version is a hash of text
+    and tokens its estimated size (app.services.tokens).
+    """
+    text: str
+    version: str
+    tokens: int
+
 
 @dataclass(slots=True)
 class AgentRunResult:
@@ -26,6 +49,16 @@ class AgentRunResult:
     reminder_payload: dict[str, Any] | None = None
     hitl_payload: dict[str, Any] | None = None
     error: str | None = None
+    trace: list[str] = field(default_factory=list)  # tool calls and results of this run
+    reasoning: list[str] = field(default_factory=list)  # reasoning summary lines, if the model returned any
+
+
+@dataclass(slots=True)
+class AgentStreamEvent:
+    """One item from a streaming run: "token", "tool_call", "tool_result", "reminder" or "result"."""
+    kind: str
+    data: dict[str, Any] = field(default_factory=dict)
+    result: AgentRunResult | None = None
 
 
 @dataclass(slots=True)
@@ -35,6 +68,76 @@ class _ToolRuntimeContext:
     user_id: str
     user_timezone: str | None
     loop_context: dict[str, Any]
+    deadline: float | None = None  # time.monotonic() (asyncio's loop clock) by which the turn must end
+
+
+# Tool entrypoints are shared by all runs; each run sees its own context through this var.
+_RUNTIME_CONTEXT: contextvars.ContextVar[_ToolRuntimeContext | None] = contextvars.ContextVar(
+    "agent_tool_runtime_context",
+    default=None,
+)
+
+
+class _RunSlots:
+    """One limit on concurrent agent runs, shared by sync runs (worker threads) and async runs.
+
+    A released slot is handed straight to the oldest waiter. Async waiters park on a future of their
+    own event loop rather than a thread, so a queue of waiting turns does not use up the executor.
+    """
+
+    def __init__(self, limit: int) -> None:
+        self._free = max(1, limit)
+        self._lock = threading.Lock()
+        self._waiters: deque[Callable[[], bool]] = deque()  # each hands the slot over, False if gone
+
+    def release(self) -> None:
+        with self._lock:
+            while self._waiters:
+                if self._waiters.popleft()():
+                    return
+            self._free += 1
+
+    def __enter__(self) -> None:
+        granted = threading.Event()
+        with self._lock:
+            if self._free:
+                self._free -= 1
+                return
+            self._waiters.append(lambda: granted.set() or True)
+        granted.wait()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.release()
+
+    async def __aenter__(self) -> None:
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        state = ["waiting"]  # -> "granted" or "abandoned", changed under self._lock
+
+        def hand_over() -> bool:
+            if state[0] == "abandoned":
+                return False
+            state[0] = "granted"
+            loop.call_soon_threadsafe(lambda: fut.done() or fut.set_result(None))
+            return True
+
+        with self._lock:
+            if self._free:
+                self._free -= 1
+                return
+            self._waiters.append(hand_over)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            with self._lock:
+                granted = state[0] == "granted"
+                state[0] = "abandoned"
+            if granted:
+                self.release()
+            raise
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self.release()
 
 
 class _SimpleAgent:
@@ -57,21 +160,21 @@ class _SimpleAgent:
         settings = get_settings()
         build_skill_registry(settings.skills_dir)
         self._agno_skills = self._build_agno_skills(str(settings.skills_dir))
-        self._last_trace: list[str] = []
-        self._last_reasoning: list[str] = []
-        self._run_lock = threading.Lock()
-        self._runtime_context: _ToolRuntimeContext | None = None
+        self._run_slots = _RunSlots(settings.agent_max_concurrent_runs)
         self._agno_tools = self._build_agno_tools()
         self._agno_db = self._build_agno_db()
+        self.system_prompt = self._compile_system_prompt()
         self._agent = Agent(
             model=OpenAIResponses(
                 id=settings.chat_model,
                 api_key=settings.volcengine_api_key or "sk-fallback",
                 base_url=settings.volcengine_chat_base.rstrip("/"),
+                timeout=settings.chat_request_timeout,
             ),
             tools=self._agno_tools,
             skills=self._agno_skills,
             db=self._agno_db,
+            instructions=self.system_prompt.text,
             add_history_to_context=True,
             num_history_runs=12,
         )
@@ -107,10 +210,13 @@ class _SimpleAgent:
 
     def _execute_tool(self, tool_name: str, kwargs: dict[str, Any]) -> str:
         """Execute a configured chat tool within current runtime context."""
-        runtime_context = self._runtime_context
+        runtime_context = _RUNTIME_CONTEXT.get()
         if runtime_context is None:
             logger.error("Tool %s called without runtime context", tool_name)
             return "Tool runtime context is unavailable."
+        if runtime_context.deadline is not None and time.monotonic() >= runtime_context.deadline:
+            logger.warning("Tool %s skipped: turn deadline passed", tool_name)
+            return json.dumps({"error": "Out of time for this turn; answer with what you have."})
         side_effects = runtime_context.loop_context.setdefault("side_effects", {})
         try:
             res_str, reminder_payload, _ = execute_tool(
@@ -219,13 +325,23 @@ class _SimpleAgent:
             )
         return "\n\n".join(parts) if parts else ""
 
-    def get_last_trace(self) -> list[str]:
-        """Return trace lines from the latest run."""
-        return list(self._last_trace)
+    def _compile_system_prompt(self) -> AgentSystemPrompt:
+        text = "\n\n".join(p for p in (AGENT_PERSONA, self.get_agent_context_text()) if p)
+        return AgentSystemPrompt(
+            text=text,
+            version=hashlib.sha256(text.encode()).hexdigest()[:12],
+            tokens=estimate_tokens(text),
+        )
 
-    def get_last_reasoning(self) -> list[str]:
-        """Return reasoning summary lines from the latest run (if available)."""
-        return list(self._last_reasoning)
+    def _record_usage(self, res: Any, session_id: str) -> None:
+        """Count the run's upstream token usage and prompt-cache reads, and log them for the session."""
+        usage = record_upstream_usage(getattr(res, "metrics", None))
+        if usage is None:
+            return
+        try:
+            log_chat_upstream_usage(session_id, self.system_prompt.version, usage)
+        except Exception:
+            pass
 
     def _build_reasoning_summary(self, run_output: Any) -> list[str]:
         """Build a concise reasoning summary from Agno run output."""
@@ -304,28 +420,73 @@ class _SimpleAgent:
         loop_context: dict[str, Any],
         invoke: Any,
     ) -> Any:
-        with self._run_lock:
-            self._runtime_context = _ToolRuntimeContext(
+        with self._run_slots:
+            token = _RUNTIME_CONTEXT.set(_ToolRuntimeContext(
                 session_id=session_id,
                 user_id=user_id,
                 user_timezone=user_timezone,
                 loop_context=loop_context,
-            )
+            ))
             try:
                 return invoke()
             finally:
-                self._runtime_context = None
+                _RUNTIME_CONTEXT.reset(token)
 
-    def run(
+    async def _arun_with_context(
         self,
-        messages: list[dict[str, Any]],
+        *,
         session_id: str,
         user_id: str,
-        user_timezone: str | None = None,
-    ) -> AgentRunResult:
+        user_timezone: str | None,
+        loop_context: dict[str, Any],
+        invoke: Any,
+        deadline: float | None = None,
+    ) -> Any:
+        """Async counterpart of _run_with_context; waits for a run slot without blocking the loop."""
+        async with self._run_slots:
+            token = _RUNTIME_CONTEXT.set(_ToolRuntimeContext(
+                session_id=session_id,
+                user_id=user_id,
+                user_timezone=user_timezone,
+                loop_context=loop_context,
+                deadline=deadline,
+            ))
+            try:
+                return await invoke()
+            finally:
+                _RUNTIME_CONTEXT.reset(token)
+
+    async def _astream_with_context(
+        self,
+        *,
+        session_id: str,
+        user_id: str,
+        user_timezone: str | None,
+        loop_context: dict[str, Any],
+        invoke: Any,
+        deadline: float | None = None,
+    ) -> AsyncIterator[Any]:
+        async with self._run_slots:
+            token = _RUNTIME_CONTEXT.set(_ToolRuntimeContext(
+                session_id=session_id,
+                user_id=user_id,
+                user_timezone=user_timezone,
+                loop_context=loop_context,
+                deadline=deadline,
+            ))
+            try:
+                async for item in invoke():
+                    yield item
+            finally:
+                try:
+                    _RUNTIME_CONTEXT.reset(token)
+                except ValueError:
+                    # Finalized from another task (e.g. client went away); that context is discarded anyway.
+                    pass
+
+    def _to_agno_messages(self, messages: list[dict[str, Any]]) -> list[Any]:
         from agno.models.message import Message
 
-        loop_context = {"round_index": 1, "max_rounds": 1}
         agno_msgs = []
         for m in messages:
             kwargs: dict[str, Any] = {"role": self._normalize_role(m.get("role")), "content": m.get("content")}
@@ -336,37 +497,55 @@ class _SimpleAgent:
             if m.get("tool_name") is not None:
                 kwargs["tool_name"] = m.get("tool_name")
             agno_msgs.append(Message(**kwargs))
-        res = None
-        try:
-            res = self._run_with_context(
-                session_id=session_id,
-                user_id=user_id,
-                user_timezone=user_timezone,
-                loop_context=loop_context,
-                invoke=lambda: self._agent.run(
-                    agno_msgs,
-                    session_id=session_id,
-                    user_id=user_id,
-                ),
-            )
-        except Exception as exc:
-            logger.exception("Agno agent.run failed")
-            self._last_reasoning = []
-            return AgentRunResult(
-                text=None,
-                used_fallback=True,
-                error=str(exc),
-            )
-        self._last_trace = self._build_trace_from_messages(getattr(res, "messages", None) or [])
-        self._last_reasoning = self._build_reasoning_summary(res)
-        if res and getattr(res, "messages", None):
+        return agno_msgs
+
+    def _finalize_run(
+        self,
+        res: Any,
+        *,
+        session_id: str,
+        user_id: str,
+        user_timezone: str | None,
+        loop_context: dict[str, Any],
+        paused_error: str,
+        messages: list[dict[str, Any]] | None = None,
+        use_content: bool = False,
+    ) -> AgentRunResult:
+        """Turn an Agno run output into an AgentRunResult (shared by the run, continue and stream paths)."""
+        self._record_usage(res, session_id)
+        result = self._result_from_run(
+            res,
+            session_id=session_id,
+            user_id=user_id,
+            user_timezone=user_timezone,
+            loop_context=loop_context,
+            paused_error=paused_error,
+            messages=messages,
+            use_content=use_content,
+        )
+        result.trace = self._build_trace_from_messages(getattr(res, "messages", None) or [])
+        result.reasoning = self._build_reasoning_summary(res)
+        return result
+
+    def _result_from_run(
+        self,
+        res: Any,
+        *,
+        session_id: str,
+        user_id: str,
+        user_timezone: str | None,
+        loop_context: dict[str, Any],
+        paused_error: str,
+        messages: list[dict[str, Any]] | None,
+        use_content: bool,
+    ) -> AgentRunResult:
+        if messages is not None and res and getattr(res, "messages", None):
             self._sync_messages_from_run(messages, res.messages)
         side_effects = loop_context.get("side_effects") or {}
         if bool(getattr(res, "is_paused", False)):
-            requirements = list(getattr(res, "active_requirements", None) or [])
             hitl_payload = self._build_hitl_payload(
                 run_output=res,
-                requirements=requirements,
+                requirements=list(getattr(res, "active_requirements", None) or []),
                 session_id=session_id,
                 user_id=user_id,
                 user_timezone=user_timezone,
@@ -377,7 +556,7 @@ class _SimpleAgent:
                     used_fallback=True,
                     reminder_payload=side_effects.get("reminder_payload"),
                     hitl_payload=None,
-                    error="Paused run missing checkpoint metadata.",
+                    error=paused_error,
                 )
             return AgentRunResult(
                 text=None,
@@ -394,6 +573,15 @@ class _SimpleAgent:
                     reminder_payload=side_effects.get("reminder_payload"),
                     hitl_payload=None,
                 )
+        if use_content:
+            content = getattr(res, "content", None)
+            if isinstance(content, str) and content.strip():
+                return AgentRunResult(
+                    text=content,
+                    used_fallback=False,
+                    reminder_payload=side_effects.get("reminder_payload"),
+                    hitl_payload=None,
+                )
         return AgentRunResult(
             text=None,
             used_fallback=True,
@@ -401,6 +589,183 @@ class _SimpleAgent:
             hitl_payload=None,
         )
 
+    def run(
+        self,
+        messages: list[dict[str, Any]],
+        session_id: str,
+        user_id: str,
+        user_timezone: str | None = None,
+    ) -> AgentRunResult:
+        loop_context = {"round_index": 1, "max_rounds": 1}
+        agno_msgs = self._to_agno_messages(messages)
+        res = None
+        try:
+            res = self._run_with_context(
+                session_id=session_id,
+                user_id=user_id,
+                user_timezone=user_timezone,
+                loop_context=loop_context,
+                invoke=lambda: self._agent.run(
+                    agno_msgs,
+                    session_id=session_id,
+                    user_id=user_id,
+                ),
+            )
+        except Exception as exc:
+            logger.exception("Agno agent.run failed")
+            return AgentRunResult(
+                text=None,
+                used_fallback=True,
+                error=str(exc),
+            )
+        return self._finalize_run(
+            res,
+            session_id=session_id,
+            user_id=user_id,
+            user_timezone=user_timezone,
+            loop_context=loop_context,
+            paused_error="Paused run missing checkpoint metadata.",
+            messages=messages,
+        )
+
+    def _translate_stream_event(self, ev: Any, loop_context: dict[str, Any], state: dict[str, Any]) -> list[AgentStreamEvent]:
+        """Map one Agno stream item to AgentStreamEvents; the final RunOutput and errors go into state."""
+        from agno.run.agent import RunEvent, RunOutput
+
+        if isinstance(ev, RunOutput):
+            state["output"] = ev
+            return []
+        kind = getattr(ev, "event", None)
+        if kind == RunEvent.run_content.value:
+            delta = getattr(ev, "content", None)
+            if isinstance(delta, str) and delta:
+                return [AgentStreamEvent("token", {"delta": delta})]
+        elif kind == RunEvent.tool_call_started.value:
+            tool = getattr(ev, "tool", None)
+            return [AgentStreamEvent("tool_call", {"name": getattr(tool, "tool_name", "") or ""})]
+        elif kind == RunEvent.tool_call_completed.value:
+            tool = getattr(ev, "tool", None)
+            out = [AgentStreamEvent("tool_result", {"name": getattr(tool, "tool_name", "") or ""})]
+            reminder_payload = (loop_context.get("side_effects") or {}).get("reminder_payload")
+            if reminder_payload and not state["reminder_sent"]:
+                state["reminder_sent"] = True
+                out.append(AgentStreamEvent("reminder", dict(reminder_payload)))
+            return out
+        elif kind == RunEvent.run_error.value:
+            state["error"] = str(getattr(ev, "content", "") or "Agent run failed.")
+        return []
+
+    def _stream_result(
+        self,
+        state: dict[str, Any],
+        *,
+        messages: list[dict[str, Any]],
+        session_id: str,
+        user_id: str,
+        user_timezone: str | None,
+        loop_context: dict[str, Any],
+    ) -> AgentStreamEvent:
+        res = state["output"]
+        if res is None:
+            return AgentStreamEvent("result", result=AgentRunResult(text=None, used_fallback=True, error=state["error"]))
+        return AgentStreamEvent("result", result=self._finalize_run(
+            res,
+            session_id=session_id,
+            user_id=user_id,
+            user_timezone=user_timezone,
+            loop_context=loop_context,
+            paused_error="Paused run missing checkpoint metadata.",
+            messages=messages,
+        ))
+
+    async def arun(
+        self,
+        messages: list[dict[str, Any]],
+        session_id: str,
+        user_id: str,
+        user_timezone: str | None = None,
+        deadline: float | None = None,
+    ) -> AgentRunResult:
+        """Async run(): awaits Agno's arun so the upstream call does not hold a worker thread.
+
+        deadline (time.monotonic()) is when the caller will cancel the turn; tools called after it are
+        refused so the model wraps up instead of starting more work.
+        """
+        loop_context = {"round_index": 1, "max_rounds": 1}
+        agno_msgs = self._to_agno_messages(messages)
+        try:
+            res = await self._arun_with_context(
+                session_id=session_id,
+                user_id=user_id,
+                user_timezone=user_timezone,
+                loop_context=loop_context,
+                deadline=deadline,
+                invoke=lambda: self._agent.arun(
+                    agno_msgs,
+                    session_id=session_id,
+                    user_id=user_id,
+                ),
+            )
+        except Exception as exc:
+            logger.exception("Agno agent.arun failed")
+            return AgentRunResult(text=None, used_fallback=True, error=str(exc))
+        return self._finalize_run(
+            res,
+            session_id=session_id,
+            user_id=user_id,
+            user_timezone=user_timezone,
+            loop_context=loop_context,
+            paused_error="Paused run missing checkpoint metadata.",
+            messages=messages,
+        )
+
+    async def arun_stream(
+        self,
+        messages: list[dict[str, Any]],
+        session_id: str,
+        user_id: str,
+        user_timezone: str | None = None,
+        deadline: float | None = None,
+    ) -> AsyncIterator[AgentStreamEvent]:
+        """Stream one agent run as it happens, driven by Agno's async streaming API.
+
+        Yields "token" events with model content deltas, "tool_call"/"tool_result" progress,
+        "reminder" as soon as a tool schedules one, and finally exactly one "result" event.
+        """
+        loop_context: dict[str, Any] = {"round_index": 1, "max_rounds": 1}
+        agno_msgs = self._to_agno_messages(messages)
+        state: dict[str, Any] = {"output": None, "error": None, "reminder_sent": False}
+        try:
+            async for ev in self._astream_with_context(
+                session_id=session_id,
+                user_id=user_id,
+                user_timezone=user_timezone,
+                loop_context=loop_context,
+                deadline=deadline,
+                invoke=lambda: self._agent.arun(
+                    agno_msgs,
+                    stream=True,
+                    stream_events=True,
+                    yield_run_output=True,
+                    session_id=session_id,
+                    user_id=user_id,
+                ),
+            ):
+                for out in self._translate_stream_event(ev, loop_context, state):
+                    yield out
+        except Exception as exc:
+            logger.exception("Agno agent.arun (stream) failed")
+            yield AgentStreamEvent("result", result=AgentRunResult(text=None, used_fallback=True, error=str(exc)))
+            return
+        yield self._stream_result(
+            state,
+            messages=messages,
+            session_id=session_id,
+            user_id=user_id,
+            user_timezone=user_timezone,
+            loop_context=loop_context,
+        )
+
     def continue_run(
         self,
         *,
@@ -426,51 +791,55 @@ class _SimpleAgent:
             )
         except Exception as exc:
             logger.exception("Agno agent.continue_run failed")
-            self._last_reasoning = []
             return AgentRunResult(text=None, used_fallback=True, error=str(exc))
-        self._last_trace = self._build_trace_from_messages(getattr(res, "messages", None) or [])
-        self._last_reasoning = self._build_reasoning_summary(res)
-        side_effects = loop_context.get("side_effects") or {}
-        if bool(getattr(res, "is_paused", False)):
-            hitl_payload = self._build_hitl_payload(
-                run_output=res,
-                requirements=list(getattr(res, "active_requirements", None) or []),
+        return self._finalize_run(
+            res,
+            session_id=session_id,
+            user_id=user_id,
+            user_timezone=user_timezone,
+            loop_context=loop_context,
+            paused_error="Paused continuation missing checkpoint metadata.",
+            use_content=True,
+        )
+
+    async def acontinue_run(
+        self,
+        *,
+        run_id: str,
+        requirements: list[Any],
+        session_id: str,
+        user_id: str,
+        user_timezone: str | None = None,
+        deadline: float | None = None,
+    ) -> AgentRunResult:
+        """Async continue_run() via Agno's acontinue_run."""
+        loop_context = {"round_index": 1, "max_rounds": 1}
+        try:
+            res = await self._arun_with_context(
                 session_id=session_id,
                 user_id=user_id,
                 user_timezone=user_timezone,
+                loop_context=loop_context,
+                deadline=deadline,
+                invoke=lambda: self._agent.acontinue_run(
+                    run_id=run_id,
+                    requirements=requirements,
+                    session_id=session_id,
+                    user_id=user_id,
+                ),
             )
-            if hitl_payload is None:
-                return AgentRunResult(
-                    text=None,
-                    used_fallback=True,
-                    reminder_payload=side_effects.get("reminder_payload"),
-                    hitl_payload=None,
-                    error="Paused continuation missing checkpoint metadata.",
-                )
-            return AgentRunResult(
-                text=None,
-                used_fallback=False,
-                reminder_payload=side_effects.get("reminder_payload"),
-                hitl_payload=hitl_payload,
-            )
-        if res and getattr(res, "messages", None):
-            msgs_all = res.messages
-            if msgs_all and msgs_all[-1].role == "assistant" and not getattr(msgs_all[-1], "tool_calls", None):
-                return AgentRunResult(
-                    text=msgs_all[-1].content or "",
-                    used_fallback=False,
-                    reminder_payload=side_effects.get("reminder_payload"),
-                    hitl_payload=None,
-                )
-        content = getattr(res, "content", None)
-        if isinstance(content, str) and content.strip():
-            return AgentRunResult(
-                text=content,
-                used_fallback=False,
-                reminder_payload=side_effects.get("reminder_payload"),
-                hitl_payload=None,
-            )
-        return AgentRunResult(text=None, used_fallback=True, reminder_payload=None, hitl_payload=None)
+        except Exception as exc:
+            logger.exception("Agno agent.acontinue_run failed")
+            return AgentRunResult(text=None, used_fallback=True, error=str(exc))
+        return self._finalize_run(
+            res,
+            session_id=session_id,
+            user_id=user_id,
+            user_timezone=user_timezone,
+            loop_context=loop_context,
+            paused_error="Paused continuation missing checkpoint metadata.",
+            use_content=True,
+        )
 
 
 def get_default_agent() -> _SimpleAgent:
@@ -490,7 +859,10 @@ def set_default_agent(agent: _SimpleAgent | None) -> None:
 
 
 __all__ = [
+    "AGENT_PERSONA",
     "AgentRunResult",
+    "AgentSystemPrompt",
+    "AgentStreamEvent",
     "get_default_agent",
     "set_default_agent",
 ]
@@ -7,7 +7,7 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
 from app.core.config import get_settings
-from app.db.session import get_conn
+from app.db.session import pooled_connection
 
 router = APIRouter()
 
@@ -34,8 +34,7 @@ def login(body: LoginBody) -> dict:
     if not body.email or not body.password:
         raise HTTPException(status_code=401, detail={"code": "invalid_credentials", "message": "Invalid credentials"})
     settings = get_settings()
-    conn = get_conn()
-    try:
+    with pooled_connection() as conn:
         cur = conn.execute(
             "SELECT id, email, display_name FROM users WHERE id = ?",
             (settings.demo_user_id,),
@@ -49,18 +48,12 @@ def login(body: LoginBody) -> dict:
             "token_type": "bearer",
             "profile": {"id": user["id"], "email": user["email"], "display_name": user["display_name"]},
         }
-    finally:
-        try:
-            conn.close()
-        except Exception:
-            pass
 
 
 @router.post("/register")
 def register(body: RegisterBody) -> dict:
     settings = get_settings()
-    conn = get_conn()
-    try:
+    with pooled_connection() as conn:
         cur = conn.execute("SELECT id, email, display_name FROM users WHERE id = ?", (settings.demo_user_id,))
         row = cur.fetchone()
         if row:
@@ -81,5 +74,3 @@ def register(body: RegisterBody) -> dict:
             "token_type": "bearer",
             "profile": {"id": settings.demo_user_id, "email": body.email or settings.demo_email, "display_name": display},
         }
-    finally:
-        conn.close()
@@ -1,14 +1,17 @@
 """Chat: non-stream and SSE stream with document chunk context."""
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import json
 import logging
 import uuid
+from contextlib import aclosing, asynccontextmanager
 from datetime import datetime, timezone
-from typing import Any
+from typing import Any, AsyncIterator
 
 from agno.run.requirement import RunRequirement
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Request, Response
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
@@ -19,25 +22,27 @@ from app.core.errors import (
     ChatErrorCode,
     raise_chat_validation,
 )
-from app.db.repositories import (
-    get_document,
-    insert_chat_message,
-    list_due_reminders,
-    mark_reminder_acknowledged,
-    upsert_chat_session,
-)
-from app.services.ai import chat as ai_chat, mood_from_text
+from app.core.idempotency import IdempotencyKeyReused, get_idempotent_turns
+from app.core.metrics import incr
+from app.core.session_locks import SessionBusyError, get_session_locks
+from app.db import async_repositories
+from app.db.async_repositories import ChatTurnUnitOfWork
+from app.services.ai import achat as ai_achat, mood_from_text
+from app.services.prompt_builder import build_prompt
+from app.services.retrieval import format_snippets, hybrid_search
 from app.core.chat_logging import (
     log_chat_context,
     log_chat_agent_input,
     log_chat_final_response,
+    log_chat_prompt_budget,
     log_chat_request,
+    log_chat_retrieval,
 )
-from app.agent import AgentRunResult, get_default_agent
+from app.agent import AgentRunResult, AgentStreamEvent, get_default_agent
 from app.context import (
     append_openviking_text_message,
     build_openviking_chat_context,
-    get_agent_context_text,
+    get_agent_system_prompt,
     put_openviking_session,
 )
 from app.hitl import consume_pending
@@ -51,6 +56,8 @@ class ChatBody(BaseModel):
     message: str = Field(..., max_length=CHAT_MESSAGE_MAX_LENGTH)
     history: list[dict[str, Any]] = Field(default_factory=list, max_length=CHAT_HISTORY_MAX_ITEMS)
     doc_id: str | None = None
+    subject_id: str | None = None  # retrieval scope when no document is attached
+    section: str | None = None  # heading path (see GET /documents/{doc_id}/outline) narrowing retrieval
     session_id: str | None = None
     debug_search_trace: bool = False
 
@@ -100,35 +107,120 @@ def _messages_to_conversation_history(
     return history[-max_items:]
 
 
-def _save_exchange(session_id: str, user_msg: str, assistant_msg: str) -> None:
-    user_id = _demo_user_id()
-    upsert_chat_session(session_id, user_id=user_id, title=user_msg[:80])
-    insert_chat_message(str(uuid.uuid4()), session_id=session_id, user_id=user_id, role="user", content=user_msg)
-    insert_chat_message(str(uuid.uuid4()), session_id=session_id, user_id=user_id, role="assistant", content=assistant_msg)
+async def _save_exchange(session_id: str, user_msg: str, assistant_msg: str) -> None:
+    """Persist the session and both sides of the turn in one transaction."""
+    uow = ChatTurnUnitOfWork(session_id, _demo_user_id())
+    uow.upsert_session(title=user_msg[:80])
+    uow.add_message("user", user_msg)
+    uow.add_message("assistant", assistant_msg)
+    await uow.commit()
+
+
+async def _save_paused_turn(session_id: str, user_msg: str) -> None:
+    """Record the session for a turn that paused at a HITL checkpoint (messages are saved on resume)."""
+    uow = ChatTurnUnitOfWork(session_id, _demo_user_id())
+    uow.upsert_session(title=user_msg[:80])
+    await uow.commit()
+
 
+_SESSION_BUSY_MESSAGE = "Still answering your previous message in this chat. Please wait for it to finish."
 
-def _resolve_attachment(doc_id: str | None) -> tuple[str | None, str | None]:
+
+@asynccontextmanager
+async def _session_turn(session_id: str | None, wait: bool | None = None) -> AsyncIterator[None]:
+    """Hold the session's turn lock (app.core.session_locks) for the block; a new chat needs none.
+
+    wait defaults to not Settings.chat_reject_busy_session; a rejected turn raises rate_limited (429).
+    """
+    if not session_id:
+        yield
+        return
+    if wait is None:
+        wait = not get_settings().chat_reject_busy_session
+    try:
+        async with get_session_locks().hold(session_id, wait=wait):
+            yield
+    except SessionBusyError:
+        raise_chat_validation(429, ChatErrorCode.RATE_LIMITED, _SESSION_BUSY_MESSAGE)
+
+
+async def _resolve_attachment(doc_id: str | None) -> tuple[str | None, str | None]:
     if not doc_id:
         return None, None
-    doc = get_document(doc_id, _demo_user_id())
+    doc = await async_repositories.get_document(doc_id, _demo_user_id())
     if not doc:
         return None, None
     return doc.get("title"), doc.get("openviking_uri")
 
 
-def _run_tool_loop(
+async def _arun_tool_loop(
     messages: list[dict[str, Any]],
     session_id: str,
     user_id: str,
     user_timezone: str | None = None,
+    deadline: float | None = None,
 ) -> AgentRunResult:
-    """Run agentic tool loop via harness.
-    When hitl_payload is set, reply_text is None and the chat layer must pause and surface the checkpoint.
+    """Run the agent's tool loop; the upstream call waits on the event loop, not a worker thread.
+
+    When hitl_payload is set, text is None and the chat layer must pause and surface the checkpoint.
     """
-    return get_default_agent().run(messages, session_id, user_id, user_timezone=user_timezone)
+    return await get_default_agent().arun(messages, session_id, user_id, user_timezone=user_timezone, deadline=deadline)
 
 
-def _complete_chat(
+def _build_agent_prompt(
+    session_id: str,
+    msg: str,
+    context_texts: list[str],
+    history: list[dict[str, str]],
+) -> str:
+    """Build the per-turn user message sent to the agent, packed into the prompt token budget.
+
+    Persona, tools and skills are in the agent's stable system prompt; only this turn's data goes here.
+    """
+    built = build_prompt(
+        msg,
+        "",
+        budget=get_settings().prompt_token_budget,
+        context=context_texts,
+        history=history,
+        prefix_tokens=get_agent_system_prompt().tokens,
+    )
+    try:
+        log_chat_prompt_budget(session_id, built.budget, built.usage, built.dropped)
+    except Exception:
+        pass
+    return built.text
+
+
+async def _afallback_chat_result(
+    msg: str,
+    context_texts: list[str],
+    attachment_title: str | None,
+    history: list[dict[str, str]],
+    messages: list[dict[str, Any]],
+    session_id: str,
+    run_res: AgentRunResult,
+) -> AgentRunResult:
+    """Answer with plain chat when the tool loop ended without content."""
+    fallback_history = _messages_to_conversation_history(messages)
+    text, used_fallback = await ai_achat(
+        msg, context_texts, attachment_title, conversation_history=fallback_history or history, session_id=session_id,
+    )
+    if not (text or "").strip():
+        text = "I'm here! Something went wrong on my side—please try again or rephrase."
+    try:
+        log_chat_final_response(session_id, text, used_fallback, run_res.reminder_payload)
+    except Exception:
+        pass
+    return AgentRunResult(
+        text=text,
+        used_fallback=used_fallback,
+        reminder_payload=run_res.reminder_payload,
+        hitl_payload=None,
+    )
+
+
+async def _acomplete_chat(
     msg: str,
     context_texts: list[str],
     attachment_title: str | None,
@@ -136,47 +228,152 @@ def _complete_chat(
     session_id: str,
     user_id: str,
     user_timezone: str | None = None,
+    deadline: float | None = None,
 ) -> AgentRunResult:
-    """Run chat completion (native tool loop).
-    When hitl_payload is set, reply_text is None and the client must show the checkpoint and call hitl-response to resume.
+    """Run one chat turn through the agent's tool loop, falling back to plain chat on an empty reply.
+
+    When hitl_payload is set, text is None and the client must show the checkpoint and call hitl-response to resume.
     """
-    agent_context = get_agent_context_text()
-    context_block = "\n\n".join(context_texts[:14])
-    user_content = (
-        f"Context:\n{context_block}\n\nUser question:\n{msg}\n\n"
-        "Reply in character: accurate, helpful, concise, and encouraging. Use tools when appropriate."
-    )
-    if agent_context:
-        user_content = f"{agent_context}\n\n{user_content}"
+    user_content = _build_agent_prompt(session_id, msg, context_texts, history)
     try:
         log_chat_agent_input(session_id, user_content)
     except Exception:
         pass
     messages: list[dict[str, Any]] = [{"role": "user", "content": user_content}]
-    run_res = _run_tool_loop(messages, session_id, user_id, user_timezone)
+    run_res = await _arun_tool_loop(messages, session_id, user_id, user_timezone, deadline)
     if run_res.hitl_payload is not None:
         return run_res
     if run_res.text is not None:
         return run_res
-    # Fallback when loop ended without content
-    fallback_history = _messages_to_conversation_history(messages)
-    text, used_fallback = ai_chat(msg, context_texts, attachment_title, conversation_history=fallback_history or history)
-    if not (text or "").strip():
-        text = "I'm here! Something went wrong on my side—please try again or rephrase."
+    return await _afallback_chat_result(msg, context_texts, attachment_title, history, messages, session_id, run_res)
+
+
+async def _stream_complete_chat(
+    msg: str,
+    context_texts: list[str],
+    attachment_title: str | None,
+    history: list[dict[str, str]],
+    session_id: str,
+    user_id: str,
+    user_timezone: str | None = None,
+    deadline: float | None = None,
+) -> AsyncIterator[AgentStreamEvent]:
+    """Streaming variant of _acomplete_chat: yields agent deltas and progress, then one "result" event."""
+    user_content = _build_agent_prompt(session_id, msg, context_texts, history)
     try:
-        log_chat_final_response(session_id, text, used_fallback, run_res.reminder_payload)
+        log_chat_agent_input(session_id, user_content)
     except Exception:
         pass
-    return AgentRunResult(
-        text=text,
-        used_fallback=used_fallback,
-        reminder_payload=run_res.reminder_payload,
-        hitl_payload=None,
+    messages: list[dict[str, Any]] = [{"role": "user", "content": user_content}]
+    run_res: AgentRunResult | None = None
+    agent_events = get_default_agent().arun_stream(
+        messages, session_id, user_id, user_timezone=user_timezone, deadline=deadline,
     )
+    async for ev in agent_events:
+        if ev.kind == "result":
+            run_res = ev.result
+            continue
+        yield ev
+    if run_res is None:
+        run_res = AgentRunResult(text=None, used_fallback=True)
+    if run_res.hitl_payload is None and run_res.text is None:
+        run_res = await _afallback_chat_result(
+            msg, context_texts, attachment_title, history, messages, session_id, run_res,
+        )
+    yield AgentStreamEvent("result", result=run_res)
+
+
+def _split_stream_words(pending: str, delta: str) -> tuple[list[str], str]:
+    """Split buffered model output into complete words plus the unfinished tail.
+
+    The SSE contract sends one word per `token` event, so deltas are held until a word ends.
+    """
+    buf = pending + delta
+    if not buf or buf[-1].isspace():
+        return buf.split(), ""
+    words = buf.split()
+    if not words:
+        return [], buf
+    return words[:-1], words[-1]
+
+
+def _sse(event: str, data: dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+_TIMEOUT_MESSAGE = "That took too long to answer. Please try again or ask something more focused."
+_DISCONNECT_POLL_SEC = 0.5
+_EVENTS_END = object()
+
+
+class _ClientDisconnected(Exception):
+    """The client closed the connection before the turn finished."""
 
 
-def _run_chat(body: ChatBody, user_timezone: str | None = None) -> dict[str, Any]:
-    session_id, _first_time, msg, context_texts, attachment_title, effective_history, _ov_session = _build_chat_context(body)
+def _turn_deadline() -> float | None:
+    """Event-loop time by which a turn starting now must finish (Settings.chat_request_timeout; 0 disables)."""
+    timeout = get_settings().chat_request_timeout
+    return asyncio.get_running_loop().time() + timeout if timeout > 0 else None
+
+
+async def _within_deadline(deadline: float | None, awaitable: Any) -> Any:
+    """Await awaitable, cancelling it at deadline; a turn past its deadline fails with upstream_error (504)."""
+    try:
+        async with asyncio.timeout_at(deadline):
+            return await awaitable
+    except TimeoutError:
+        incr("chat.turns_timed_out")
+        raise_chat_validation(504, ChatErrorCode.UPSTREAM_ERROR, _TIMEOUT_MESSAGE)
+
+
+async def _guard_events(
+    request: Request, events: AsyncIterator[AgentStreamEvent], deadline: float | None,
+) -> AsyncIterator[AgentStreamEvent]:
+    """Yield events, which are produced in a task of their own, until they end.
+
+    Raises TimeoutError once deadline passes and _ClientDisconnected when the client goes away; either
+    way the producing task is cancelled, which cancels the upstream model call and any fallback.
+    Producing in one task keeps the agent's per-run context intact across events.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue[Any] = asyncio.Queue()
+
+    async def produce() -> None:
+        try:
+            async for ev in events:
+                queue.put_nowait(ev)
+        except Exception as exc:
+            queue.put_nowait(exc)
+        else:
+            queue.put_nowait(_EVENTS_END)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            wait = _DISCONNECT_POLL_SEC if deadline is None else min(_DISCONNECT_POLL_SEC, deadline - loop.time())
+            if wait <= 0:
+                raise TimeoutError
+            try:
+                item = await asyncio.wait_for(queue.get(), wait)
+            except TimeoutError:
+                if await request.is_disconnected():
+                    raise _ClientDisconnected from None
+                continue
+            if item is _EVENTS_END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+
+
+async def _run_chat(body: ChatBody, user_timezone: str | None = None) -> dict[str, Any]:
+    deadline = _turn_deadline()
+    session_id, _first_time, msg, context_texts, attachment_title, effective_history, _ov_session = await _within_deadline(
+        deadline, _build_chat_context(body),
+    )
     try:
         log_chat_request(
             session_id,
@@ -193,11 +390,12 @@ def _run_chat(body: ChatBody, user_timezone: str | None = None) -> dict[str, Any
         log_chat_context(session_id, context_texts, attachment_title, "")
     except Exception:
         pass
-    run_res = _complete_chat(
+    run_res = await _within_deadline(deadline, _acomplete_chat(
         msg, context_texts, attachment_title, effective_history, session_id, user_id,
-        user_timezone=user_timezone,
-    )
+        user_timezone=user_timezone, deadline=deadline,
+    ))
     if run_res.hitl_payload is not None:
+        await _save_paused_turn(session_id, msg)
         return {
             "hitl": run_res.hitl_payload,
             "session_id": session_id,
@@ -205,7 +403,7 @@ def _run_chat(body: ChatBody, user_timezone: str | None = None) -> dict[str, Any
     text = run_res.text or ""
     mood = mood_from_text(text)
     append_openviking_text_message(session_id, "assistant", text)
-    _save_exchange(session_id, msg, text)
+    await _save_exchange(session_id, msg, text)
 
     response: dict[str, Any] = {
         "message": {"role": "assistant", "content": text, "created_at": datetime.now(tz=timezone.utc).isoformat()},
@@ -219,16 +417,16 @@ def _run_chat(body: ChatBody, user_timezone: str | None = None) -> dict[str, Any
 
 
 @router.get("/reminders")
-def get_reminders(session_id: str) -> list[dict[str, Any]]:
+async def get_reminders(session_id: str) -> list[dict[str, Any]]:
     """List due reminders (break, focus, etc.) for the given session (for the demo user)."""
     user_id = _demo_user_id()
-    return list_due_reminders(session_id, user_id)
+    return await async_repositories.list_due_reminders(session_id, user_id)
 
 
 @router.patch("/reminders/{reminder_id}/ack")
-def ack_reminder(reminder_id: str) -> dict[str, str]:
+async def ack_reminder(reminder_id: str) -> dict[str, str]:
     """Mark a reminder as acknowledged so it is no longer returned by GET."""
-    mark_reminder_acknowledged(reminder_id)
+    await async_repositories.mark_reminder_acknowledged(reminder_id)
     return {"status": "acknowledged", "reminder_id": reminder_id}
 
 
@@ -237,9 +435,44 @@ def _user_timezone_from_request(request: Request) -> str | None:
     return request.headers.get("x-user-timezone") or None
 
 
+def _idempotency_key(request: Request, body: ChatBody) -> tuple[str, str | None] | None:
+    """(key, fingerprint): the client's Idempotency-Key header bound to a hash of the whole body, else a
+    hash of (session_id, message, history length) with no fingerprint.
+
+    A new chat (no session_id) without the header is never deduplicated: two new chats may well start
+    with the same message.
+    """
+    user_id = _demo_user_id()
+    header = (request.headers.get("idempotency-key") or "").strip()
+    if header:
+        return f"{user_id}:key:{header}", hashlib.sha256(body.model_dump_json().encode()).hexdigest()
+    if not body.session_id:
+        return None
+    raw = json.dumps([body.session_id, body.message, len(body.history)])
+    return f"{user_id}:auto:{hashlib.sha256(raw.encode()).hexdigest()}", None
+
+
 @router.post("/chat")
-def chat(request: Request, body: ChatBody) -> dict:
-    return _run_chat(body, user_timezone=_user_timezone_from_request(request))
+async def chat(request: Request, body: ChatBody, response: Response) -> dict:
+    user_timezone = _user_timezone_from_request(request)
+
+    async def turn() -> dict[str, Any]:
+        async with _session_turn(body.session_id):
+            return await _run_chat(body, user_timezone=user_timezone)
+
+    idempotency = _idempotency_key(request, body)
+    if idempotency is None:
+        return await turn()
+    key, fingerprint = idempotency
+    try:
+        result, replayed = await get_idempotent_turns().run(key, turn, fingerprint)
+    except IdempotencyKeyReused:
+        raise_chat_validation(
+            422, ChatErrorCode.IDEMPOTENCY_KEY_REUSED, "This Idempotency-Key was already used for a different request.",
+        )
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
 
 
 class HitlResponseBody(BaseModel):
@@ -253,7 +486,7 @@ class HitlResponseBody(BaseModel):
 
 
 @router.post("/chat/hitl-response")
-def hitl_response(request: Request, body: HitlResponseBody) -> dict[str, Any]:
+async def hitl_response(request: Request, body: HitlResponseBody) -> dict[str, Any]:
     """Resume the agent loop after the user responds to a HITL checkpoint."""
     user_timezone = _user_timezone_from_request(request)
     user_id = _demo_user_id()
@@ -286,23 +519,37 @@ def hitl_response(request: Request, body: HitlResponseBody) -> dict[str, Any]:
         target.reject(note="User rejected")
 
     session_id = entry["session_id"]
-    run_res = get_default_agent().continue_run(
+    async with _session_turn(session_id):
+        return await _resume_hitl_run(run_id, requirements, session_id, user_id, user_timezone)
+
+
+async def _resume_hitl_run(
+    run_id: str,
+    requirements: list[RunRequirement],
+    session_id: str,
+    user_id: str,
+    user_timezone: str | None,
+) -> dict[str, Any]:
+    """Continue the paused run and persist its reply (called under the session's turn lock)."""
+    deadline = _turn_deadline()
+    run_res = await _within_deadline(deadline, get_default_agent().acontinue_run(
         run_id=run_id,
         requirements=requirements,
         session_id=session_id,
         user_id=user_id,
         user_timezone=user_timezone,
-    )
+        deadline=deadline,
+    ))
     if run_res.hitl_payload is not None:
         return {"hitl": run_res.hitl_payload, "session_id": session_id}
     text = run_res.text
     used_fallback = run_res.used_fallback
     reminder = run_res.reminder_payload
     if text is None:
-        text, _ = ai_chat(
+        text, _ = await _within_deadline(deadline, ai_achat(
             "",
-            [], None, conversation_history=[],
-        )
+            [], None, conversation_history=[], session_id=session_id,
+        ))
         if not (text or "").strip():
             text = "Done. Anything else?"
         used_fallback = True
@@ -313,9 +560,10 @@ def hitl_response(request: Request, body: HitlResponseBody) -> dict[str, Any]:
     mood = mood_from_text(text)
     # Persist final assistant message (user side already has the checkpoint; we don't re-save user msg)
     append_openviking_text_message(session_id, "assistant", text)
-    insert_chat_message(
-        str(uuid.uuid4()), session_id, user_id, role="assistant", content=text,
-    )
+    uow = ChatTurnUnitOfWork(session_id, user_id)
+    uow.upsert_session()
+    uow.add_message("assistant", text)
+    await uow.commit()
     out: dict[str, Any] = {
         "message": {"role": "assistant", "content": text, "created_at": datetime.now(tz=timezone.utc).isoformat()},
         "mood": mood,
@@ -327,7 +575,31 @@ def hitl_response(request: Request, body: HitlResponseBody) -> dict[str, Any]:
     return out
 
 
-def _build_chat_context(
+async def _retrieve_snippets(
+    session_id: str, msg: str, user_id: str, doc_id: str | None, subject_id: str | None,
+    section: str | None = None,
+) -> list[str]:
+    """Hybrid (BM25 + semantic) top-k chunk snippets for msg within the attached document or subject."""
+    if not doc_id and not subject_id:
+        return []
+    try:
+        result = await asyncio.to_thread(
+            hybrid_search, msg, user_id, doc_id=doc_id, subject_id=subject_id, section=section
+        )
+    except Exception:
+        logger.exception("Chunk retrieval failed for session %s", session_id)
+        return []
+    log_chat_retrieval(
+        session_id,
+        (f"doc:{doc_id}" if doc_id else f"subject:{subject_id}") + (f" section:{section}" if section else ""),
+        [f"{c.doc_id}#{c.chunk_index}" for c in result.chunks],
+        result.latency_ms,
+        cached=result.cached,
+    )
+    return format_snippets(result.chunks)
+
+
+async def _build_chat_context(
     body: ChatBody,
 ) -> tuple[str, bool, str, list[str], str | None, list[dict[str, str]], Any]:
     """Build context and return (session_id, first_time, msg, context_texts, attachment_title, history, ov_session)."""
@@ -350,31 +622,45 @@ def _build_chat_context(
         )
     session_id = body.session_id or str(uuid.uuid4())
     user_id = _demo_user_id()
-    upsert_chat_session(session_id, user_id=user_id, title=msg[:80])
-
-    attachment_title, attachment_uri = _resolve_attachment(body.doc_id)
-    context_texts, _ov_session = build_openviking_chat_context(
-        session_id=session_id,
-        user_id=user_id,
-        user_message=msg,
-        history=history,
-        doc_id=body.doc_id,
-        attachment_title=attachment_title,
-        attachment_uri=attachment_uri,
+    attachment_title, attachment_uri = await _resolve_attachment(body.doc_id)
+    # OpenViking sessions may load from disk; keep that off the event loop.
+    (context_texts, _ov_session), snippets = await asyncio.gather(
+        asyncio.to_thread(
+            build_openviking_chat_context,
+            session_id=session_id,
+            user_id=user_id,
+            user_message=msg,
+            history=history,
+            doc_id=body.doc_id,
+            attachment_title=attachment_title,
+            attachment_uri=attachment_uri,
+        ),
+        _retrieve_snippets(session_id, msg, user_id, body.doc_id, body.subject_id, body.section),
     )
+    context_texts.extend(snippets)
     put_openviking_session(_ov_session)
     return session_id, False, msg, context_texts, attachment_title, history, _ov_session
 
 
 @router.post("/chat/stream")
-def chat_stream(request: Request, body: ChatBody) -> StreamingResponse:
+async def chat_stream(request: Request, body: ChatBody) -> StreamingResponse:
     user_timezone = _user_timezone_from_request(request)
+    if body.session_id and get_settings().chat_reject_busy_session and get_session_locks().busy(body.session_id):
+        incr("chat.session_busy_rejected")
+        raise_chat_validation(429, ChatErrorCode.RATE_LIMITED, _SESSION_BUSY_MESSAGE)
 
-    def event_stream():
+    async def event_stream():
         stream_id = str(uuid.uuid4())
         fallback_message = "I'm here! Something went wrong on my side—please try again."
+        session_id = body.session_id or str(uuid.uuid4())
+        streamed_tokens = False
+        reminder_sent = False
+        deadline = _turn_deadline()
         try:
-            session_id, first_time, msg, context_texts, attachment_title, effective_history, _ov_session = _build_chat_context(body)
+            async with asyncio.timeout_at(deadline):
+                session_id, first_time, msg, context_texts, attachment_title, effective_history, _ov_session = (
+                    await _build_chat_context(body)
+                )
             try:
                 log_chat_request(body.session_id or "(new)", msg, len(body.history or []), body.doc_id, body.debug_search_trace)
                 log_chat_context(session_id, context_texts, attachment_title, "")
@@ -382,13 +668,36 @@ def chat_stream(request: Request, body: ChatBody) -> StreamingResponse:
                 pass
 
             user_id = _demo_user_id()
-            run_res = _complete_chat(
+            run_res: AgentRunResult | None = None
+            pending = ""
+            agent_events = _stream_complete_chat(
                 msg, context_texts, attachment_title, effective_history, session_id, user_id,
-                user_timezone=user_timezone,
+                user_timezone=user_timezone, deadline=deadline,
             )
+            # Closed on the way out so a cancelled response also cancels the producing task.
+            async with aclosing(_guard_events(request, agent_events, deadline)) as events:
+                async for ev in events:
+                    if ev.kind == "token":
+                        words, pending = _split_stream_words(pending, str(ev.data.get("delta") or ""))
+                        for token in words:
+                            streamed_tokens = True
+                            yield _sse("token", {"token": token, "session_id": session_id, "stream_id": stream_id})
+                    elif ev.kind in ("tool_call", "tool_result"):
+                        yield _sse(ev.kind, {**ev.data, "session_id": session_id, "stream_id": stream_id})
+                    elif ev.kind == "reminder":
+                        reminder_sent = True
+                        yield _sse("reminder", {**ev.data, "stream_id": stream_id})
+                    elif ev.kind == "result":
+                        run_res = ev.result
+            if pending.strip():
+                streamed_tokens = True
+                yield _sse("token", {"token": pending.strip(), "session_id": session_id, "stream_id": stream_id})
+            if run_res is None:
+                run_res = AgentRunResult(text=None, used_fallback=True)
             if run_res.hitl_payload is not None:
-                yield f"event: hitl_checkpoint\ndata: {json.dumps({**run_res.hitl_payload, 'stream_id': stream_id})}\n\n"
-                yield f"event: done\ndata: {json.dumps({'session_id': session_id, 'stream_id': stream_id, 'hitl': True})}\n\n"
+                await _save_paused_turn(session_id, msg)
+                yield _sse("hitl_checkpoint", {**run_res.hitl_payload, "stream_id": stream_id})
+                yield _sse("done", {"session_id": session_id, "stream_id": stream_id, "hitl": True})
                 return
             text = run_res.text
             used_fallback = run_res.used_fallback
@@ -397,21 +706,34 @@ def chat_stream(request: Request, body: ChatBody) -> StreamingResponse:
                 text = fallback_message
             mood = mood_from_text(text or "")
             append_openviking_text_message(session_id, "assistant", text or "")
-            _save_exchange(session_id, msg, text or "")
+            await _save_exchange(session_id, msg, text or "")
+        except _ClientDisconnected:
+            incr("chat.turns_cancelled")
+            logger.info("Chat stream for session %s cancelled: client disconnected", session_id)
+            return
+        except TimeoutError:
+            incr("chat.turns_timed_out")
+            logger.warning("Chat stream for session %s timed out", session_id)
+            text = _TIMEOUT_MESSAGE
+            used_fallback = True
+            reminder = None
+            mood = "neutral"
         except Exception as e:
             logger.exception("Chat stream error: %s", e)
-            session_id = body.session_id or str(uuid.uuid4())
             text = fallback_message
             used_fallback = True
             reminder = None
             mood = "neutral"
 
-        for token in (text or "").split():
-            yield f"event: token\ndata: {json.dumps({'token': token, 'session_id': session_id, 'stream_id': stream_id})}\n\n"
+        # Fallback replies (and errors) never went through the model stream; send them word by word.
+        if not streamed_tokens:
+            for token in (text or "").split():
+                yield _sse("token", {"token": token, "session_id": session_id, "stream_id": stream_id})
         if reminder:
             reminder = {**reminder, "stream_id": stream_id}
-            yield f"event: reminder\ndata: {json.dumps(reminder)}\n\n"
-        yield f"event: mood\ndata: {json.dumps({'mood': mood, 'stream_id': stream_id})}\n\n"
+            if not reminder_sent:
+                yield _sse("reminder", reminder)
+        yield _sse("mood", {"mood": mood, "stream_id": stream_id})
         done_event: dict[str, Any] = {
             "message": text,
             "session_id": session_id,
@@ -420,10 +742,22 @@ def chat_stream(request: Request, body: ChatBody) -> StreamingResponse:
         }
         if reminder:
             done_event["reminder"] = reminder
-        yield f"event: done\ndata: {json.dumps(done_event)}\n\n"
+        yield _sse("done", done_event)
+
+    async def session_event_stream():
+        # Taken when the stream starts, so a stream that never starts holds nothing. A turn that got past
+        # the busy check above while another was starting waits for it instead of being rejected.
+        try:
+            async with _session_turn(body.session_id, wait=True), aclosing(event_stream()) as events:
+                async for chunk in events:
+                    yield chunk
+        except asyncio.CancelledError:
+            # The server cancelled the response (client gone); the turn was cancelled with it.
+            incr("chat.turns_cancelled")
+            raise
 
     return StreamingResponse(
-        event_stream(),
+        session_event_stream(),
         media_type="text/event-stream",
         headers={"Cache-Control": "no-cache", "Connection": "keep-alive"},
     )
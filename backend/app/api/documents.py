@@ -1,4 +1,4 @@
-"""Documents: list, upload, get by id, subject patch."""
+"""Documents: list, upload (background ingestion), status, outline, get by id, subject patch."""
 from __future__ import annotations
 
 import uuid
@@ -9,15 +9,15 @@ from pydantic import BaseModel
 
 from app.core.config import get_settings
 from app.db.repositories import (
-    delete_chunks_for_document,
     get_document,
-    insert_chunk,
+    get_document_outline,
     insert_document,
     list_documents,
     set_document_subject,
-    update_document_status,
 )
-from app.services.document_parser import chunk_text, parse_document
+from app.services.ingestion import get_ingestion_progress, submit_ingestion
+from app.services.retrieval import invalidate_document
+from app.services.uploads import UploadTooLargeError, spool_upload, store_content_addressed
 
 router = APIRouter()
 
@@ -33,6 +33,29 @@ def list_docs() -> list:
     return list_documents(_demo_user_id())
 
 
+@router.get("/{doc_id}/status")
+def get_doc_status(doc_id: str) -> dict:
+    """Ingestion status for polling after upload: DB status plus live stage/progress while processing."""
+    doc = get_document(doc_id, _demo_user_id())
+    if not doc:
+        raise HTTPException(status_code=404, detail={"code": "not_found", "message": "Document not found"})
+    out: dict = {"doc_id": doc_id, "status": doc["status"], "stage": doc["status"], "progress": None, "error": None}
+    live = get_ingestion_progress(doc_id)
+    if live is not None:
+        out.update(live)
+    elif doc["status"] in ("ready", "failed"):
+        out["progress"] = 1.0
+    return out
+
+
+@router.get("/{doc_id}/outline")
+def get_doc_outline(doc_id: str) -> dict:
+    """Section tree from the document's headings (Markdown and DOCX); empty for formats without headings."""
+    if not get_document(doc_id, _demo_user_id()):
+        raise HTTPException(status_code=404, detail={"code": "not_found", "message": "Document not found"})
+    return {"doc_id": doc_id, "sections": get_document_outline(doc_id)}
+
+
 @router.get("/{doc_id}")
 def get_doc(doc_id: str) -> dict:
     doc = get_document(doc_id, _demo_user_id())
@@ -50,10 +73,11 @@ def patch_doc(doc_id: str, body: PatchDocBody) -> dict:
     doc = set_document_subject(doc_id, _demo_user_id(), body.subject_id)
     if not doc:
         raise HTTPException(status_code=404, detail={"code": "not_found", "message": "Document not found"})
+    invalidate_document(doc_id, body.subject_id)
     return doc
 
 
-@router.post("/upload")
+@router.post("/upload", status_code=202)
 async def upload_doc(
     file: UploadFile = File(...),
     folder_name: str | None = Form(None),
@@ -61,18 +85,6 @@ async def upload_doc(
     if not file.filename:
         print("Upload failed: No filename")
         raise HTTPException(status_code=400, detail={"code": "invalid_document", "message": "No file"})
-    content = await file.read()
-    size = len(content)
-    max_bytes = get_settings().max_upload_bytes
-    if size > max_bytes:
-        print(f"Upload failed: Size {size} exceeds limit {max_bytes}")
-        raise HTTPException(
-            status_code=400,
-            detail={"code": "invalid_document", "message": f"File exceeds max upload size ({max_bytes} bytes)"},
-        )
-    if size == 0:
-        print("Upload failed: File is empty")
-        raise HTTPException(status_code=400, detail={"code": "invalid_document", "message": "File is empty"})
     name = file.filename or "document.txt"
     ext = Path(name).suffix.lower()
     if ext not in ALLOWED_EXT:
@@ -81,10 +93,20 @@ async def upload_doc(
 
     doc_id = str(uuid.uuid4())
     upload_dir = Path(get_settings().upload_dir).resolve()
-    upload_dir.mkdir(parents=True, exist_ok=True)
     safe_name = f"{doc_id}{ext}"
-    storage_path = upload_dir / safe_name
-    storage_path.write_bytes(content)
+    max_bytes = get_settings().max_upload_bytes
+    try:
+        stored = await spool_upload(file, upload_dir / safe_name, max_bytes)
+    except UploadTooLargeError as e:
+        print(f"Upload failed: Size exceeds limit {max_bytes}")
+        raise HTTPException(status_code=400, detail={"code": "invalid_document", "message": str(e)})
+    if stored.size_bytes == 0:
+        print("Upload failed: File is empty")
+        stored.path.unlink(missing_ok=True)
+        raise HTTPException(status_code=400, detail={"code": "invalid_document", "message": "File is empty"})
+    stored = store_content_addressed(stored)
+    storage_path = stored.path
+    size = stored.size_bytes
 
     title = Path(name).stem
     mime = file.content_type or "application/octet-stream"
@@ -98,40 +120,27 @@ async def upload_doc(
         storage_path=str(storage_path),
         status="processing",
         source_folder=folder_name,
+        content_hash=stored.content_hash,
     )
-
-    try:
-        raw_text = parse_document(storage_path).strip()
-        if not raw_text:
-            raise ValueError("No readable text extracted from document")
-        chunks_list = chunk_text(raw_text)
-        delete_chunks_for_document(doc_id)
-        for i, text in enumerate(chunks_list):
-            chunk_id = str(uuid.uuid4())
-            insert_chunk(chunk_id, doc_id, i, text, None, None)
-        word_count = len(raw_text.split())
-        update_document_status(doc_id, "ready", word_count, openviking_uri=None)
-        doc = get_document(doc_id, _demo_user_id())
-        if doc is not None:
-            return doc
-        return {
-            "id": doc_id,
-            "user_id": _demo_user_id(),
-            "subject_id": None,
-            "title": title,
-            "filename": name,
-            "source_folder": folder_name,
-            "mime_type": mime,
-            "size_bytes": size,
-            "status": "ready",
-            "word_count": word_count,
-            "topic_hint": None,
-            "difficulty_estimate": None,
-            "storage_path": str(storage_path),
-            "openviking_uri": None,
-            "created_at": "",
-            "updated_at": "",
-        }
-    except Exception as e:
-        update_document_status(doc_id, "failed")
-        raise HTTPException(status_code=500, detail={"code": "processing_failed", "message": str(e)})
+    submit_ingestion(doc_id, storage_path, stored.content_hash)
+    doc = get_document(doc_id, _demo_user_id())
+    if doc is not None:
+        return doc
+    return {
+        "id": doc_id,
+        "user_id": _demo_user_id(),
+        "subject_id": None,
+        "title": title,
+        "filename": name,
+        "source_folder": folder_name,
+        "mime_type": mime,
+        "size_bytes": size,
+        "status": "processing",
+        "word_count": 0,
+        "topic_hint": None,
+        "difficulty_estimate": None,
+        "storage_path": str(storage_path),
+        "openviking_uri": None,
+        "created_at": "",
+        "updated_at": "",
+    }
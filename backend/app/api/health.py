@@ -1,9 +1,17 @@
 """Health check for frontend/load balancer."""
 from fastapi import APIRouter
 
+from app.core.metrics import snapshot
+
 router = APIRouter()
 
 
 @router.get("/health")
 def health() -> dict:
     return {"status": "ok", "service": "waifu-tutor-api"}
+
+
+@router.get("/health/metrics")
+def metrics() -> dict:
+    """Chat path counters and timings since startup (upstream tokens and prompt-cache hits)."""
+    return snapshot()
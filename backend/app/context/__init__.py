@@ -3,6 +3,7 @@ from app.context.context_builder import (
     build_openviking_chat_context,
     get_agent_context,
     get_agent_context_text,
+    get_agent_system_prompt,
     get_cached_tools,
     load_agent_context,
 )
@@ -30,6 +31,7 @@ __all__ = [
     "build_openviking_chat_context",
     "get_agent_context",
     "get_agent_context_text",
+    "get_agent_system_prompt",
     "get_cached_tools",
     "load_agent_context",
     "ContextPart",
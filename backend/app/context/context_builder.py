@@ -2,11 +2,14 @@
 from __future__ import annotations
 
 import logging
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 from app.context.openviking_types import ContextPart, Part, SessionLike, TextPart
 from app.context.session_store import ensure_openviking_session
 
+if TYPE_CHECKING:
+    from app.agent import AgentSystemPrompt
+
 logger = logging.getLogger(__name__)
 
 
@@ -35,6 +38,13 @@ def get_agent_context_text() -> str:
     return get_default_agent().get_agent_context_text()
 
 
+def get_agent_system_prompt() -> AgentSystemPrompt:
+    """Stable system instructions (persona, tools, skills) and their version hash, sent ahead of every turn."""
+    from app.agent import get_default_agent
+
+    return get_default_agent().system_prompt
+
+
 def get_agent_context() -> dict[str, Any]:
     """Return full context dict: tools and preformatted text."""
     return {
@@ -61,16 +71,8 @@ def build_openviking_chat_context(
     )
     context_texts: list[str] = []
 
-    # Build readable recent-history context for prompting.
-    history_lines: list[str] = []
-    for item in history[-12:]:
-        role = str(item.get("role", "user") or "user")
-        content = str(item.get("content", "") or "").strip()
-        if not content:
-            continue
-        history_lines.append(f"[{role}] {content}")
-    if history_lines:
-        context_texts.append("Recent session messages:\n" + "\n".join(history_lines))
+    # History is packed into the prompt by app.services.prompt_builder; record that the session used it.
+    if history:
         try:
             session.used(contexts=[f"viking://session/{session_id}/messages.jsonl"])
         except Exception:
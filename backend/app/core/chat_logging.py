@@ -150,6 +150,50 @@ def log_chat_context(
     _write_chat_log("CHAT CONTEXT SUMMARY", session_id, payload)
 
 
+def log_chat_retrieval(
+    session_id: str,
+    scope: str,
+    hits: list[str],
+    latency_ms: float,
+    cached: bool = False,
+) -> None:
+    """Log a chunk retrieval for chat context (scope, hits as doc_id#chunk_index, latency, cache hit)."""
+    payload = f"""
+  scope: {scope}
+  hits: {len(hits)}{(" (" + ", ".join(hits) + ")") if hits else ""}
+  latency_ms: {latency_ms:.1f}
+  cached: {cached}
+"""
+    _write_chat_log("CHAT RETRIEVAL", session_id, payload)
+
+
+def log_chat_prompt_budget(
+    session_id: str,
+    budget: int,
+    usage: dict[str, int],
+    dropped: dict[str, int],
+) -> None:
+    """Log a built prompt's estimated tokens per segment against the budget, and blocks dropped to fit."""
+    dropped_items = {k: v for k, v in dropped.items() if v}
+    payload = f"""
+  budget: {budget if budget > 0 else "unlimited"}
+  total_tokens: {sum(usage.values())}
+  segments: {", ".join(f"{k}={v}" for k, v in usage.items())}
+  dropped: {", ".join(f"{k}={v}" for k, v in dropped_items.items()) or "none"}
+"""
+    _write_chat_log("CHAT PROMPT BUDGET", session_id, payload)
+
+
+def log_chat_upstream_usage(session_id: str, system_prompt_version: str, usage: dict[str, int]) -> None:
+    """Log one model run's reported token usage, prompt-cache reads and the system prompt version sent."""
+    payload = f"""
+  system_prompt_version: {system_prompt_version}
+  {", ".join(f"{k}={v}" for k, v in usage.items())}
+  cache_hit: {bool(usage.get("cache_read_tokens"))}
+"""
+    _write_chat_log("CHAT UPSTREAM USAGE", session_id, payload)
+
+
 def log_chat_agent_input(session_id: str, prompt_text: str) -> None:
     """Log the full prompt/context sent to the agent for this turn."""
     redacted = _redact_internal_instructions(prompt_text or "")
@@ -18,6 +18,7 @@ class ChatErrorCode:
     RATE_LIMITED = "rate_limited"
     SERVICE_UNAVAILABLE = "service_unavailable"
     UPSTREAM_ERROR = "upstream_error"
+    IDEMPOTENCY_KEY_REUSED = "idempotency_key_reused"
 
 
 def detail(code: str, message: str, **extra: Any) -> dict[str, Any]:
@@ -0,0 +1,95 @@
+"""Idempotent chat turns: a resent request attaches to the running turn or gets its stored response.
+
+Each turn runs as its own task keyed by an idempotency key. A request whose key matches a turn still in
+flight awaits that task instead of starting another model run; one matching a turn completed within the
+TTL gets the stored response. Only successful responses are stored, so a request whose turn failed can
+be retried. The first request going away does not cancel a turn that others are attached to; the turn
+is shielded from its callers. A key may be bound to a fingerprint of its request (a hash of the body);
+reusing it with a different fingerprint raises IdempotencyKeyReused instead of replaying another
+request's response. Only touched from the event loop thread.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+from app.core.config import get_settings
+from app.core.metrics import incr
+
+
+class IdempotencyKeyReused(ValueError):
+    """Raised by IdempotentTurns.run when a key is reused for a request with a different fingerprint."""
+
+
+class IdempotentTurns:
+    def __init__(self, ttl_sec: float, max_entries: int = 1024) -> None:
+        self.ttl_sec = ttl_sec
+        self.max_entries = max_entries
+        self._done: OrderedDict[str, tuple[float, str | None, Any]] = OrderedDict()  # key -> (expires_at, fingerprint, response)
+        self._running: dict[str, tuple[asyncio.Task, str | None]] = {}
+
+    def _lookup(self, key: str) -> tuple[str | None, Any] | None:
+        entry = self._done.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._done[key]
+            return None
+        return entry[1], entry[2]
+
+    def _store(self, key: str, fingerprint: str | None, response: Any) -> None:
+        if self.ttl_sec <= 0:
+            return
+        self._done[key] = (time.monotonic() + self.ttl_sec, fingerprint, response)
+        self._done.move_to_end(key)
+        while len(self._done) > self.max_entries:
+            self._done.popitem(last=False)
+
+    async def run(
+        self, key: str, turn: Callable[[], Awaitable[Any]], fingerprint: str | None = None,
+    ) -> tuple[Any, bool]:
+        """(response, replayed): replayed is True when the response came from an earlier request."""
+        stored = self._lookup(key)
+        if stored is not None:
+            self._check(key, stored[0], fingerprint)
+            incr("chat.idempotent_replayed")
+            return stored[1], True
+        running = self._running.get(key)
+        if running is not None:
+            self._check(key, running[1], fingerprint)
+            incr("chat.idempotent_coalesced")
+            return await asyncio.shield(running[0]), True
+        task = asyncio.ensure_future(turn())
+        self._running[key] = (task, fingerprint)
+        task.add_done_callback(lambda t: self._finish(key, fingerprint, t))
+        return await asyncio.shield(task), False
+
+    @staticmethod
+    def _check(key: str, bound: str | None, fingerprint: str | None) -> None:
+        if bound != fingerprint:
+            incr("chat.idempotency_key_reused")
+            raise IdempotencyKeyReused(key)
+
+    def _finish(self, key: str, fingerprint: str | None, task: asyncio.Task) -> None:
+        running = self._running.get(key)
+        if running is not None and running[0] is task:
+            del self._running[key]
+        if not task.cancelled() and task.exception() is None:
+            self._store(key, fingerprint, task.result())
+
+
+_turns: IdempotentTurns | None = None
+
+
+def get_idempotent_turns() -> IdempotentTurns:
+    global _turns
+    if _turns is None:
+        _turns = IdempotentTurns(get_settings().chat_idempotency_ttl_sec)
+    return _turns
+
+
+def reset_idempotent_turns() -> None:
+    global _turns
+    _turns = None
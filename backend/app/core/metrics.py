@@ -0,0 +1,64 @@
+"""In-process counters and timings for the chat path, served by GET /health/metrics.
+
+Counters only go up (tokens, runs, cache hits). Timings keep count, total and max per name, enough to
+read an average and a worst case without a metrics backend. Values reset when the process restarts.
+"""
+from __future__ import annotations
+
+import threading
+from typing import Any
+
+_lock = threading.Lock()
+_counters: dict[str, int] = {}
+_timings: dict[str, list[float]] = {}  # name -> [count, total, max]
+
+
+def incr(name: str, value: int = 1) -> None:
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def observe(name: str, value: float) -> None:
+    """Record one timing sample (seconds)."""
+    with _lock:
+        entry = _timings.setdefault(name, [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += value
+        entry[2] = max(entry[2], value)
+
+
+def snapshot() -> dict[str, Any]:
+    with _lock:
+        return {
+            "counters": dict(sorted(_counters.items())),
+            "timings": {
+                name: {"count": int(count), "total": round(total, 6), "max": round(peak, 6)}
+                for name, (count, total, peak) in sorted(_timings.items())
+            },
+        }
+
+
+def reset_metrics() -> None:
+    with _lock:
+        _counters.clear()
+        _timings.clear()
+
+
+_USAGE_FIELDS = ("input_tokens", "output_tokens", "cache_read_tokens", "cache_write_tokens")
+
+
+def record_upstream_usage(metrics: Any) -> dict[str, int] | None:
+    """Count one model run's usage from Agno run metrics (None when the provider reported none).
+
+    A run counts as a prompt-cache hit when any input tokens were read from the provider's cache.
+    """
+    if metrics is None:
+        return None
+    usage = {f: int(getattr(metrics, f, 0) or 0) for f in _USAGE_FIELDS}
+    with _lock:
+        _counters["upstream.runs"] = _counters.get("upstream.runs", 0) + 1
+        for f, v in usage.items():
+            _counters[f"upstream.{f}"] = _counters.get(f"upstream.{f}", 0) + v
+        if usage["cache_read_tokens"]:
+            _counters["upstream.cache_hit_runs"] = _counters.get("upstream.cache_hit_runs", 0) + 1
+    return usage
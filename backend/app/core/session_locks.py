@@ -0,0 +1,61 @@
+"""Per-session turn locks: turns of one chat session run one at a time, different sessions in parallel.
+
+A double-submitted message, a client retry or a hitl-response racing a new message would otherwise
+interleave writes to the Agno session history, the OpenViking session store and chat_messages. Each
+session_id gets its own asyncio.Lock while any turn holds or waits for it, and the entry is dropped when
+the last one leaves, so the registry only holds sessions with a turn in flight. Locks are keyed by the
+exact session_id rather than striped over a fixed pool, so unrelated sessions never wait on (or get
+rejected because of) each other. The registry is only touched from the event loop thread.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from app.core.metrics import incr, observe
+
+
+class SessionBusyError(RuntimeError):
+    """Raised by SessionLockRegistry.hold(wait=False) when another turn of the session is in flight."""
+
+
+class SessionLockRegistry:
+    def __init__(self) -> None:
+        self._entries: dict[str, list] = {}  # session_id -> [lock, holders + waiters]
+
+    def busy(self, session_id: str) -> bool:
+        entry = self._entries.get(session_id)
+        return entry is not None and entry[0].locked()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @asynccontextmanager
+    async def hold(self, session_id: str, wait: bool = True) -> AsyncIterator[None]:
+        """Run the block as the session's only turn; the time spent waiting is recorded as
+        chat.session_lock_wait. With wait=False a busy session raises SessionBusyError instead."""
+        entry = self._entries.get(session_id)
+        if entry is None:
+            entry = self._entries[session_id] = [asyncio.Lock(), 0]
+        elif not wait and entry[0].locked():
+            incr("chat.session_busy_rejected")
+            raise SessionBusyError(session_id)
+        entry[1] += 1
+        try:
+            started = time.perf_counter()
+            async with entry[0]:
+                observe("chat.session_lock_wait", time.perf_counter() - started)
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0 and self._entries.get(session_id) is entry:
+                del self._entries[session_id]
+
+
+_registry = SessionLockRegistry()
+
+
+def get_session_locks() -> SessionLockRegistry:
+    return _registry
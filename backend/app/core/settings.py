@@ -32,17 +32,58 @@ class Settings(BaseSettings):
 
     # Database (db/ at project root)
     database_url: str = "sqlite:///../db/data/waifu_tutor.db"
+    # Max pooled SQLite connections per database file (repositories borrow from this pool)
+    sqlite_pool_size: int = 8
+    # Group-commit window: queued writes (messages, chunks, status/reminder updates) committed together
+    sqlite_group_commit_ms: float = 2.0
 
     # Uploads
     upload_dir: Path = Path("../db/data/uploads")
     max_upload_bytes: int = 50 * 1024 * 1024  # 50 MiB
+    # Background ingestion workers (parse + chunk + index run off the request path)
+    ingest_workers: int = 2
+    # Compressed cache of extracted text by content hash + parser version (re-chunking skips parsing)
+    parse_cache_dir: Path = Path("../db/data/parse_cache")
+    # Chunk size and overlap in estimated tokens (app.services.tokens); chunks break at sentence ends
+    chunk_tokens: int = 300
+    chunk_overlap_tokens: int = 50
+    # Per-document parse limits; the parse worker process is killed and the document marked failed
+    parse_timeout_sec: float = 120.0
+    parse_max_rss_mb: int = 1024  # 0 disables the memory cap
+    # Parse worker processes; large PDFs are split into page ranges across them (0 = one per CPU core)
+    parse_workers: int = 0
+
+    # Chat retrieval: BM25 chunks from the attached document or subject packed into the prompt
+    retrieval_top_k: int = 5
+    retrieval_snippet_chars: int = 1200
+    retrieval_cache_size: int = 512  # cached hybrid results (LRU); 0 disables
+    # Chunk FTS tokenization: bigram (CJK bigrams), trigram, unicode61, or "module:function" segmenter.
+    # Changing it rebuilds document_chunks_fts at the next startup.
+    fts_tokenizer: str = "bigram"
+
+    # Dense chunk index (per-user memory-mapped embeddings); embedder "hashing" or "module:factory"
+    vector_index_dir: Path = Path("../db/data/vectors")
+    vector_embedder: str = "hashing"
+    vector_dim: int = 256  # dimension of the hashing embedder
+    vector_dtype: str = "float16"  # or "float32"
+    vector_ivf_min_rows: int = 100_000  # train the IVF coarse quantizer past this many rows
+    vector_ivf_nprobe: int = 16
 
     # AI: Volcengine ARK (e.g. doubao-seed-2-0-mini-260215)
     volcengine_api_key: str | None = None
     volcengine_chat_base: str = "https://ark.cn-beijing.volces.com/api/v3"
     chat_model: str = "doubao-seed-2-0-mini-260215"
-    # Timeout in seconds for chat/tool completion (long skill+subskill context may need >45s)
+    # Deadline in seconds for one chat turn, model calls and tools included (long skill+subskill context
+    # may need >45s); 0 disables it
     chat_request_timeout: float = 90.0
+    # Estimated-token budget for one turn's prompt (app.services.prompt_builder); 0 disables the cap
+    prompt_token_budget: int = 6000
+    # Max agent runs in flight at once across sync and async callers; extra turns wait for a free slot
+    agent_max_concurrent_runs: int = 8
+    # A turn for a session that already has one in flight waits for it; true rejects it with rate_limited
+    chat_reject_busy_session: bool = False
+    # Seconds a completed /chat response is replayed for a resent request (same Idempotency-Key); 0 disables
+    chat_idempotency_ttl_sec: float = 120.0
 
     # Demo user
     demo_user_id: str = "demo-user"
@@ -0,0 +1,70 @@
+"""Async repository helpers for the chat request path: writes via the group-commit writer.
+
+Reads run the sync repositories on a worker thread, so they borrow a warm connection from the same
+bounded pool instead of opening (and running PRAGMA setup on) a fresh connection per call.
+"""
+from __future__ import annotations
+
+import asyncio
+import uuid
+
+from app.db import repositories
+from app.db.repositories import (
+    ACK_REMINDER_SQL,
+    INSERT_CHAT_MESSAGE_SQL,
+    TOUCH_CHAT_SESSION_SQL,
+    UPSERT_CHAT_SESSION_SQL,
+)
+from app.db.writer import WriteStatement, get_writer
+
+
+async def get_document(doc_id: str, user_id: str) -> dict | None:
+    return await asyncio.to_thread(repositories.get_document, doc_id, user_id)
+
+
+class ChatTurnUnitOfWork:
+    """Collects one chat turn's writes (session upsert + messages) and applies them in a single transaction.
+
+    A turn used to commit once per call (two session upserts, one commit and session touch per message);
+    under WAL each commit is its own fsync, so the turn is now one write on the group-commit writer.
+    """
+
+    def __init__(self, session_id: str, user_id: str) -> None:
+        self.session_id = session_id
+        self.user_id = user_id
+        self._upsert_session = False
+        self._title: str | None = None
+        self._messages: list[tuple[str, str, str, str, str]] = []
+
+    def upsert_session(self, title: str | None = None) -> None:
+        """Create the session row if missing (keeping an existing title) and bump its timestamps."""
+        self._upsert_session = True
+        if title is not None and self._title is None:
+            self._title = title
+
+    def add_message(self, role: str, content: str, message_id: str | None = None) -> None:
+        self._messages.append((message_id or str(uuid.uuid4()), self.session_id, self.user_id, role, content))
+
+    async def commit(self) -> None:
+        """Apply the collected writes as one group-commit write and wait until they are durable."""
+        if not self._upsert_session and not self._messages:
+            return
+        statements: list[WriteStatement] = []
+        if self._upsert_session:
+            statements.append(WriteStatement(UPSERT_CHAT_SESSION_SQL, (self.session_id, self.user_id, self._title)))
+        if self._messages:
+            statements.append(WriteStatement(INSERT_CHAT_MESSAGE_SQL, list(self._messages), many=True))
+            if not self._upsert_session:
+                statements.append(WriteStatement(TOUCH_CHAT_SESSION_SQL, (self.session_id, self.user_id)))
+        await asyncio.wrap_future(get_writer().submit(*statements))
+        self._upsert_session = False
+        self._messages.clear()
+
+
+async def list_due_reminders(session_id: str, user_id: str) -> list[dict]:
+    """Return reminders for this session that are due and not yet acknowledged."""
+    return await asyncio.to_thread(repositories.list_due_reminders, session_id, user_id)
+
+
+async def mark_reminder_acknowledged(reminder_id: str) -> None:
+    await asyncio.wrap_future(get_writer().submit(WriteStatement(ACK_REMINDER_SQL, (reminder_id,))))
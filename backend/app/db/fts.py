@@ -0,0 +1,99 @@
+"""Tokenization for the chunk full-text index (document_chunks_fts).
+
+FTS5's default unicode61 tokenizer treats a whole run of CJK characters as one token, so a Chinese
+query only matches chunks containing exactly the same run. FTS_TOKENIZER selects how chunk text is
+tokenized at index time and how query terms are produced at query time:
+
+- "bigram" (default): CJK runs are rewritten as overlapping character bigrams (细胞分裂 -> 细胞 胞分 分裂)
+  before indexing with unicode61; other scripts are unchanged.
+- "trigram": FTS5's built-in trigram tokenizer (substring matching; CJK terms need 3+ characters).
+- "unicode61": the original behaviour.
+- "package.module:function": a pluggable segmenter, function(text) -> list[str], applied to chunk text
+  and queries alike; its tokens are indexed with unicode61.
+
+Index-time segmentation runs in SQL through the fts_segment() function, which every connection
+registers (see register_fts_functions), so the FTS sync triggers and bulk inserts stay in SQL. The
+index's content table (the document_chunk_fts_texts view) also calls it, so highlight() and snippet()
+see the segmented text the index was built from. Writing chunks on a connection without the function
+(the sqlite3 shell, ad-hoc scripts) fails with "no such function: fts_segment".
+"""
+from __future__ import annotations
+
+import importlib
+import re
+import sqlite3
+from functools import lru_cache
+from typing import Callable
+
+from app.core.config import get_settings
+
+CJK_CHARS = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af"  # kana, CJK ideographs, hangul (regex class body)
+_CJK_RUN_RE = re.compile(f"[{CJK_CHARS}]+")
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _bigrams(run: str) -> list[str]:
+    if len(run) < 2:
+        return [run]
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def _bigram_segment(text: str) -> str:
+    return _CJK_RUN_RE.sub(lambda m: " " + " ".join(_bigrams(m.group())) + " ", text)
+
+
+@lru_cache(maxsize=8)
+def _load_segmenter(spec: str) -> Callable[[str], list[str]]:
+    module_name, _, attr = spec.partition(":")
+    if not attr:
+        raise ValueError(f"FTS_TOKENIZER must be bigram, trigram, unicode61 or 'module:function', got {spec!r}")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def fts_mode(spec: str | None = None) -> str:
+    return (spec or get_settings().fts_tokenizer).strip()
+
+
+def fts_tokenize_clause(spec: str | None = None) -> str:
+    """The tokenize= option for CREATE VIRTUAL TABLE document_chunks_fts."""
+    return "trigram" if fts_mode(spec) == "trigram" else "unicode61"
+
+
+def segment_for_fts(text: str | None, spec: str | None = None) -> str | None:
+    """Text as stored in the FTS index for the configured tokenizer."""
+    if text is None:
+        return None
+    mode = fts_mode(spec)
+    if mode in ("unicode61", "trigram"):
+        return text
+    if mode == "bigram":
+        return _bigram_segment(text)
+    return " ".join(_load_segmenter(mode)(text))
+
+
+def query_terms(text: str, spec: str | None = None) -> list[str]:
+    """Lower-cased query terms matching how chunk text was indexed."""
+    mode = fts_mode(spec)
+    if mode not in ("unicode61", "trigram", "bigram"):
+        return [t.lower() for t in _load_segmenter(mode)(text) if t.strip()]
+    terms: list[str] = []
+    for term in _TERM_RE.findall(text.lower()):
+        if mode == "unicode61" or not _CJK_RUN_RE.search(term):
+            terms.append(term)
+            continue
+        for piece in re.split(f"([{CJK_CHARS}]+)", term):
+            if not piece:
+                continue
+            if not _CJK_RUN_RE.fullmatch(piece):
+                terms.append(piece)
+            elif mode == "bigram":
+                terms.extend(_bigrams(piece))
+            elif len(piece) >= 3:
+                terms.extend(piece[i:i + 3] for i in range(len(piece) - 2))
+    return terms
+
+
+def register_fts_functions(conn: sqlite3.Connection) -> None:
+    """Register fts_segment() (used by the chunk FTS triggers) on a connection."""
+    spec = fts_mode()
+    conn.create_function("fts_segment", 1, lambda text: segment_for_fts(text, spec), deterministic=True)
@@ -5,6 +5,11 @@ import sqlite3
 import uuid
 
 from app.core.config import get_settings
+from app.db.fts import fts_tokenize_clause
+
+FTS_CONTENT_VIEW = "document_chunk_fts_texts"
+# app_meta key naming the document whose chunk inserts skip the per-row FTS trigger (deferred bulk FTS).
+FTS_DEFER_KEY = "fts_defer_doc"
 
 
 def run_migrations() -> None:
@@ -12,11 +17,15 @@ def run_migrations() -> None:
     conn = _get_conn()
     try:
         _migrate_break_reminders_to_reminders(conn)
+        _migrate_chunks_to_offsets(conn)
         conn.executescript(_SCHEMA)
+        _migrate_chunks_fts_tokenizer(conn, settings.fts_tokenizer)
+        _migrate_chunk_insert_trigger(conn)
         for sql in _TRIGGERS:
             conn.execute(sql)
         _migrate_documents_add_openviking_uri(conn)
         _migrate_documents_add_source_folder(conn)
+        _migrate_documents_add_content_hash(conn)
         _seed_demo_user(conn, settings)
         conn.commit()
     finally:
@@ -65,12 +74,155 @@ def _migrate_documents_add_source_folder(conn: sqlite3.Connection) -> None:
         conn.execute("ALTER TABLE documents ADD COLUMN source_folder TEXT")
 
 
+def _migrate_documents_add_content_hash(conn: sqlite3.Connection) -> None:
+    """Add content_hash (SHA-256 of the upload) to documents, indexed for dedup lookups."""
+    cur = conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='documents'")
+    if cur.fetchone() is None:
+        return
+    cur = conn.execute("PRAGMA table_info(documents)")
+    columns = [row["name"] for row in cur.fetchall()]
+    if "content_hash" not in columns:
+        conn.execute("ALTER TABLE documents ADD COLUMN content_hash TEXT")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_content_hash ON documents(content_hash, status)")
+
+
+def _migrate_chunks_to_offsets(conn: sqlite3.Connection) -> None:
+    """Move chunks that carry their own chunk_text onto a stored document text plus byte offsets.
+
+    The old chunks overlap, so each document's text becomes its chunk texts joined by blank lines
+    (re-ingesting a document stores its real text once). Chunk ids and rowids are kept, so the dense
+    index stays valid. The FTS index and its triggers are dropped here and rebuilt against
+    FTS_CONTENT_VIEW by _migrate_chunks_fts_tokenizer.
+
+    Everything runs in one explicit transaction (statement by statement: executescript would commit
+    midway), so an interrupted migration leaves the old layout intact and simply runs again.
+    """
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(document_chunks)")}
+    if "chunk_text" not in columns:
+        return
+    conn.execute("BEGIN")
+    try:
+        _move_chunks_to_offsets(conn)
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+def _move_chunks_to_offsets(conn: sqlite3.Connection) -> None:
+    for trigger in ("document_chunks_ai", "document_chunks_ad", "document_chunks_au"):
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    conn.execute("DROP TABLE IF EXISTS document_chunks_fts")
+    conn.execute("ALTER TABLE document_chunks RENAME TO document_chunks_legacy")
+    for statement in _CHUNK_STORAGE_SCHEMA.split(";"):
+        if statement.strip():
+            conn.execute(statement)
+    doc_ids = [r["doc_id"] for r in conn.execute("SELECT DISTINCT doc_id FROM document_chunks_legacy")]
+    for doc_id in doc_ids:
+        rows = conn.execute(
+            "SELECT rowid, id, chunk_index, chunk_text, page, section, created_at FROM document_chunks_legacy"
+            " WHERE doc_id = ? ORDER BY chunk_index, rowid",
+            (doc_id,),
+        ).fetchall()
+        body = bytearray()
+        chunks = []
+        for r in rows:
+            if body:
+                body += b"\n\n"
+            start = len(body)
+            body += r["chunk_text"].encode("utf-8")
+            chunks.append((r["rowid"], r["id"], doc_id, r["chunk_index"], start, len(body), r["page"], r["section"], r["created_at"]))
+        conn.execute("INSERT INTO document_texts (doc_id, body) VALUES (?, ?)", (doc_id, bytes(body)))
+        conn.executemany(
+            "INSERT INTO document_chunks (rowid, id, doc_id, chunk_index, start_offset, end_offset, page, section, created_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            chunks,
+        )
+    conn.execute("DROP TABLE document_chunks_legacy")
+
+
+def _migrate_chunks_fts_tokenizer(conn: sqlite3.Connection, tokenizer: str) -> None:
+    """Create document_chunks_fts for FTS_TOKENIZER; drop and rebuild it (and its triggers) when it changed.
+
+    Databases from before app_meta tracked the tokenizer were indexed with plain unicode61, and older
+    indexes read raw chunk text rather than FTS_CONTENT_VIEW; both are rebuilt.
+    """
+    tokenizer = tokenizer.strip()
+    table = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type='table' AND name='document_chunks_fts'"
+    ).fetchone()
+    exists = table is not None
+    row = conn.execute("SELECT value FROM app_meta WHERE key = 'fts_tokenizer'").fetchone()
+    current = row["value"] if row else ("unicode61" if exists else None)
+    if exists and current == tokenizer and f"content='{FTS_CONTENT_VIEW}'" in table["sql"]:
+        return
+    for trigger in ("document_chunks_ai", "document_chunks_ad", "document_chunks_au"):
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    conn.execute("DROP TABLE IF EXISTS document_chunks_fts")
+    conn.execute(chunks_fts_table_sql(tokenizer))
+    conn.execute("INSERT INTO document_chunks_fts(document_chunks_fts) VALUES ('rebuild')")
+    conn.execute(
+        "INSERT INTO app_meta(key, value) VALUES ('fts_tokenizer', ?)"
+        " ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+        (tokenizer,),
+    )
+
+
+def _migrate_chunk_insert_trigger(conn: sqlite3.Connection) -> None:
+    """Replace a chunk insert trigger from before it could be skipped through FTS_DEFER_KEY."""
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE type='trigger' AND name='document_chunks_ai'").fetchone()
+    if row is not None and FTS_DEFER_KEY not in row["sql"]:
+        conn.execute("DROP TRIGGER document_chunks_ai")
+
+
 def _get_conn() -> sqlite3.Connection:
     from app.db.session import get_conn
 
     return get_conn()
 
 
+def _chunk_text_sql(body: str, row: str) -> str:
+    """SQL expression for a chunk's text: its byte span of the document body, decoded as UTF-8."""
+    return f"CAST(substr({body}, {row}.start_offset + 1, {row}.end_offset - {row}.start_offset) AS TEXT)"
+
+
+# Each document's normalized text is stored once as UTF-8 in document_texts.body; a chunk is a
+# [start_offset, end_offset) byte span of it. Byte rather than character offsets let substr() on the
+# BLOB seek straight to a chunk instead of scanning the text from the start. Also run statement by
+# statement (split on ";"), so keep semicolons out of its comments.
+_CHUNK_STORAGE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS document_texts (
+  doc_id TEXT PRIMARY KEY REFERENCES documents(id),
+  body BLOB NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS document_chunks (
+  id TEXT PRIMARY KEY,
+  doc_id TEXT NOT NULL REFERENCES documents(id),
+  chunk_index INTEGER NOT NULL,
+  start_offset INTEGER NOT NULL,
+  end_offset INTEGER NOT NULL,
+  page INTEGER,
+  section TEXT,
+  created_at TEXT DEFAULT (datetime('now'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_document_chunks_doc ON document_chunks(doc_id, chunk_index);
+
+-- Document outline: one row per heading, spanning to the next heading of the same or a higher level.
+-- path is the heading titles from the top level down, joined by " > " (also document_chunks.section).
+CREATE TABLE IF NOT EXISTS document_sections (
+  doc_id TEXT NOT NULL REFERENCES documents(id),
+  section_index INTEGER NOT NULL,
+  level INTEGER NOT NULL,
+  title TEXT NOT NULL,
+  path TEXT NOT NULL,
+  start_offset INTEGER NOT NULL,
+  end_offset INTEGER NOT NULL,
+  PRIMARY KEY (doc_id, section_index)
+);
+"""
+
 _SCHEMA = """
 CREATE TABLE IF NOT EXISTS users (
   id TEXT PRIMARY KEY,
@@ -107,22 +259,19 @@ CREATE TABLE IF NOT EXISTS documents (
   updated_at TEXT DEFAULT (datetime('now'))
 );
 
-CREATE TABLE IF NOT EXISTS document_chunks (
-  id TEXT PRIMARY KEY,
-  doc_id TEXT NOT NULL REFERENCES documents(id),
-  chunk_index INTEGER NOT NULL,
-  chunk_text TEXT NOT NULL,
-  page INTEGER,
-  section TEXT,
-  created_at TEXT DEFAULT (datetime('now'))
-);
+""" + _CHUNK_STORAGE_SCHEMA + """
+CREATE VIEW IF NOT EXISTS document_chunk_texts AS
+SELECT c.rowid AS rowid, c.id, c.doc_id, c.chunk_index, c.start_offset, c.end_offset, c.page, c.section,
+       """ + _chunk_text_sql("t.body", "c") + """ AS chunk_text
+FROM document_chunks c JOIN document_texts t ON t.doc_id = c.doc_id;
 
-CREATE VIRTUAL TABLE IF NOT EXISTS document_chunks_fts USING fts5(
-  chunk_text,
-  doc_id UNINDEXED,
-  chunk_index UNINDEXED,
-  content='document_chunks',
-  content_rowid='rowid'
+-- Content table of document_chunks_fts: chunk text exactly as it was indexed (see app.db.fts).
+CREATE VIEW IF NOT EXISTS document_chunk_fts_texts AS
+SELECT rowid, fts_segment(chunk_text) AS chunk_text, doc_id, chunk_index FROM document_chunk_texts;
+
+CREATE TABLE IF NOT EXISTS app_meta (
+  key TEXT PRIMARY KEY,
+  value TEXT NOT NULL
 );
 
 CREATE TABLE IF NOT EXISTS chat_sessions (
@@ -165,20 +314,49 @@ CREATE INDEX IF NOT EXISTS idx_reminders_session_status
 ON reminders(session_id, status);
 """
 
-_TRIGGERS = [
-    """CREATE TRIGGER IF NOT EXISTS document_chunks_ai AFTER INSERT ON document_chunks BEGIN
+
+def chunks_fts_table_sql(tokenizer: str) -> str:
+    """CREATE statement for the chunk FTS index (external content; text goes through fts_segment()).
+
+    The content table is the document_chunk_fts_texts view, so chunk text is materialized from
+    document_texts only when FTS5 needs it and never stored twice. The view returns the segmented text
+    the index holds, so highlight() and snippet() offsets line up with it, but their output shows CJK
+    runs as the tokenizer's pieces (bigrams for "bigram"); display text comes from document_chunk_texts.
+    """
+    return f"""CREATE VIRTUAL TABLE IF NOT EXISTS document_chunks_fts USING fts5(
+  chunk_text,
+  doc_id UNINDEXED,
+  chunk_index UNINDEXED,
+  content='{FTS_CONTENT_VIEW}',
+  content_rowid='rowid',
+  tokenize='{fts_tokenize_clause(tokenizer)}'
+)"""
+
+
+def _chunk_text_of(row: str) -> str:
+    return f"(SELECT {_chunk_text_sql('body', row)} FROM document_texts WHERE doc_id = {row}.doc_id)"
+
+
+# Chunk triggers read document_texts, so a document's text is written before its chunks and deleted
+# after them. The insert trigger is skipped for the document named by FTS_DEFER_KEY, which
+# repositories.insert_chunks sets (and clears) within its transaction to fill the index in one pass.
+CHUNK_INSERT_TRIGGER_SQL = f"""CREATE TRIGGER IF NOT EXISTS document_chunks_ai AFTER INSERT ON document_chunks
+WHEN NOT EXISTS (SELECT 1 FROM app_meta WHERE key = '{FTS_DEFER_KEY}' AND value = new.doc_id) BEGIN
   INSERT INTO document_chunks_fts(rowid, chunk_text, doc_id, chunk_index)
-  VALUES (new.rowid, new.chunk_text, new.doc_id, new.chunk_index);
-END""",
-    """CREATE TRIGGER IF NOT EXISTS document_chunks_ad AFTER DELETE ON document_chunks BEGIN
+  VALUES (new.rowid, fts_segment({_chunk_text_of("new")}), new.doc_id, new.chunk_index);
+END"""
+
+_TRIGGERS = [
+    CHUNK_INSERT_TRIGGER_SQL,
+    f"""CREATE TRIGGER IF NOT EXISTS document_chunks_ad AFTER DELETE ON document_chunks BEGIN
   INSERT INTO document_chunks_fts(document_chunks_fts, rowid, chunk_text, doc_id, chunk_index)
-  VALUES('delete', old.rowid, old.chunk_text, old.doc_id, old.chunk_index);
+  VALUES('delete', old.rowid, fts_segment({_chunk_text_of("old")}), old.doc_id, old.chunk_index);
 END""",
-    """CREATE TRIGGER IF NOT EXISTS document_chunks_au AFTER UPDATE ON document_chunks BEGIN
+    f"""CREATE TRIGGER IF NOT EXISTS document_chunks_au AFTER UPDATE ON document_chunks BEGIN
   INSERT INTO document_chunks_fts(document_chunks_fts, rowid, chunk_text, doc_id, chunk_index)
-  VALUES('delete', old.rowid, old.chunk_text, old.doc_id, old.chunk_index);
+  VALUES('delete', old.rowid, fts_segment({_chunk_text_of("old")}), old.doc_id, old.chunk_index);
   INSERT INTO document_chunks_fts(rowid, chunk_text, doc_id, chunk_index)
-  VALUES(new.rowid, new.chunk_text, new.doc_id, new.chunk_index);
+  VALUES(new.rowid, fts_segment({_chunk_text_of("new")}), new.doc_id, new.chunk_index);
 END""",
 ]
 
@@ -3,13 +3,83 @@ from __future__ import annotations
 
 import sqlite3
 import uuid
-
-from app.db.session import get_conn
+from concurrent.futures import Future
+from typing import Any
+
+from app.db.migrations import FTS_DEFER_KEY
+from app.db.session import pooled_connection
+from app.db.writer import WriteStatement, get_writer
+
+# Statements shared with app.db.async_repositories so both access paths stay in sync.
+GET_DOCUMENT_SQL = (
+    "SELECT id, user_id, subject_id, title, filename, mime_type, size_bytes, status, word_count,"
+    " topic_hint, difficulty_estimate, storage_path, openviking_uri, source_folder, created_at, updated_at"
+    " FROM documents WHERE id = ? AND user_id = ?"
+)
+
+UPSERT_CHAT_SESSION_SQL = """
+INSERT INTO chat_sessions (id, user_id, title, last_message_at)
+VALUES (?, ?, ?, datetime('now'))
+ON CONFLICT(id) DO UPDATE SET
+  updated_at = datetime('now'),
+  last_message_at = datetime('now'),
+  title = COALESCE(chat_sessions.title, excluded.title)
+"""
+
+INSERT_CHAT_MESSAGE_SQL = """
+INSERT INTO chat_messages (id, session_id, user_id, role, content)
+VALUES (?, ?, ?, ?, ?)
+"""
+
+TOUCH_CHAT_SESSION_SQL = """
+UPDATE chat_sessions
+SET updated_at = datetime('now'), last_message_at = datetime('now')
+WHERE id = ? AND user_id = ?
+"""
+
+LIST_DUE_REMINDERS_SQL = """
+SELECT id, session_id, user_id, due_at, message, kind, status, created_at
+FROM reminders
+WHERE session_id = ? AND user_id = ? AND status = 'due'
+ORDER BY due_at ASC
+"""
+
+ACK_REMINDER_SQL = "UPDATE reminders SET status = 'acknowledged' WHERE id = ?"
+
+# Chunk count from which insert_chunks defers FTS population to a single pass by default.
+_DEFER_FTS_MIN_CHUNKS = 200
+
+# Offsets are relative to the text just appended to the document's body (see insert_chunks): the
+# trailing parameters are the appended byte length and doc_id, giving base = length(body) - appended.
+INSERT_CHUNK_SQL = """
+INSERT INTO document_chunks (id, doc_id, chunk_index, start_offset, end_offset, page, section)
+SELECT ?, ?, ?, base + ?, base + ?, ?, ?
+FROM (SELECT length(body) - ? AS base FROM document_texts WHERE doc_id = ?)
+"""
+
+APPEND_DOCUMENT_TEXT_SQL = """
+INSERT INTO document_texts (doc_id, body) VALUES (?, ?)
+ON CONFLICT(doc_id) DO UPDATE SET body = CAST(body || excluded.body AS BLOB)
+"""
+
+_PIECE_SEPARATOR = "\n\n"
+
+INSERT_SECTION_SQL = (
+    "INSERT INTO document_sections (doc_id, section_index, level, title, path, start_offset, end_offset)"
+    " VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+def _write(*statements: WriteStatement, wait: bool) -> Future:
+    """Queue statements on the group-commit writer; wait=True blocks until they are committed."""
+    future = get_writer().submit(*statements)
+    if wait:
+        future.result()
+    return future
 
 
 def list_documents(user_id: str) -> list[dict]:
-    conn = get_conn()
-    try:
+    with pooled_connection() as conn:
         cur = conn.execute(
             "SELECT id, user_id, subject_id, title, filename, mime_type, size_bytes, status, word_count,"
             " topic_hint, difficulty_estimate, storage_path, openviking_uri, source_folder, created_at, updated_at"
@@ -17,23 +87,44 @@ def list_documents(user_id: str) -> list[dict]:
             (user_id,),
         )
         return [dict(row) for row in cur.fetchall()]
-    finally:
-        conn.close()
 
 
-def get_document(doc_id: str, user_id: str) -> dict | None:
-    conn = get_conn()
-    try:
+def list_processing_documents() -> list[dict]:
+    """Documents still marked "processing" (e.g. ingestion interrupted by a restart)."""
+    with pooled_connection() as conn:
         cur = conn.execute(
-            "SELECT id, user_id, subject_id, title, filename, mime_type, size_bytes, status, word_count,"
-            " topic_hint, difficulty_estimate, storage_path, openviking_uri, source_folder, created_at, updated_at"
-            " FROM documents WHERE id = ? AND user_id = ?",
-            (doc_id, user_id),
+            "SELECT id, storage_path, content_hash FROM documents WHERE status = 'processing' ORDER BY created_at"
         )
+        return [dict(row) for row in cur.fetchall()]
+
+
+def list_ready_documents(doc_ids: list[str] | None = None) -> list[dict]:
+    """id, user_id, storage_path and content_hash of ready documents (all, or those in doc_ids)."""
+    sql = "SELECT id, user_id, storage_path, content_hash FROM documents WHERE status = 'ready'"
+    params: list[str] = []
+    if doc_ids is not None:
+        sql += f" AND id IN ({','.join('?' * len(doc_ids))})" if doc_ids else " AND 0"
+        params = list(doc_ids)
+    with pooled_connection() as conn:
+        return [dict(row) for row in conn.execute(sql + " ORDER BY created_at", params).fetchall()]
+
+
+def find_ready_document_by_hash(content_hash: str, exclude_doc_id: str | None = None) -> dict | None:
+    """Most recently ingested ready document with this content hash (any user), for dedup."""
+    with pooled_connection() as conn:
+        row = conn.execute(
+            "SELECT id, word_count, storage_path FROM documents"
+            " WHERE content_hash = ? AND status = 'ready' AND id != ? ORDER BY updated_at DESC LIMIT 1",
+            (content_hash, exclude_doc_id or ""),
+        ).fetchone()
+        return dict(row) if row else None
+
+
+def get_document(doc_id: str, user_id: str) -> dict | None:
+    with pooled_connection() as conn:
+        cur = conn.execute(GET_DOCUMENT_SQL, (doc_id, user_id))
         row = cur.fetchone()
         return dict(row) if row else None
-    finally:
-        conn.close()
 
 
 def insert_document(
@@ -47,17 +138,15 @@ def insert_document(
     status: str = "processing",
     subject_id: str | None = None,
     source_folder: str | None = None,
+    content_hash: str | None = None,
 ) -> None:
-    conn = get_conn()
-    try:
+    with pooled_connection() as conn:
         conn.execute(
-            """INSERT INTO documents (id, user_id, subject_id, title, filename, mime_type, size_bytes, status, storage_path, source_folder)
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-            (doc_id, user_id, subject_id, title, filename, mime_type, size_bytes, status, storage_path, source_folder),
+            """INSERT INTO documents (id, user_id, subject_id, title, filename, mime_type, size_bytes, status, storage_path, source_folder, content_hash)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (doc_id, user_id, subject_id, title, filename, mime_type, size_bytes, status, storage_path, source_folder, content_hash),
         )
         conn.commit()
-    finally:
-        conn.close()
 
 
 def update_document_status(
@@ -65,89 +154,72 @@ def update_document_status(
     status: str,
     word_count: int | None = None,
     openviking_uri: str | None = None,
-) -> None:
-    conn = get_conn()
-    try:
-        if word_count is not None:
-            conn.execute(
-                "UPDATE documents SET status = ?, word_count = ?, updated_at = datetime('now'), openviking_uri = COALESCE(?, openviking_uri) WHERE id = ?",
-                (status, word_count, openviking_uri, doc_id),
-            )
-        else:
-            conn.execute(
-                "UPDATE documents SET status = ?, updated_at = datetime('now'), openviking_uri = COALESCE(?, openviking_uri) WHERE id = ?",
-                (status, openviking_uri, doc_id),
-            )
-        conn.commit()
-    finally:
-        conn.close()
+    wait: bool = True,
+) -> Future:
+    if word_count is not None:
+        statement = WriteStatement(
+            "UPDATE documents SET status = ?, word_count = ?, updated_at = datetime('now'), openviking_uri = COALESCE(?, openviking_uri) WHERE id = ?",
+            (status, word_count, openviking_uri, doc_id),
+        )
+    else:
+        statement = WriteStatement(
+            "UPDATE documents SET status = ?, updated_at = datetime('now'), openviking_uri = COALESCE(?, openviking_uri) WHERE id = ?",
+            (status, openviking_uri, doc_id),
+        )
+    return _write(statement, wait=wait)
 
 
 def set_document_subject(doc_id: str, user_id: str, subject_id: str | None) -> dict | None:
-    conn = get_conn()
-    try:
+    with pooled_connection() as conn:
         conn.execute(
             "UPDATE documents SET subject_id = ?, updated_at = datetime('now') WHERE id = ? AND user_id = ?",
             (subject_id, doc_id, user_id),
         )
         conn.commit()
-        cur = conn.execute(
-            "SELECT id, user_id, subject_id, title, filename, mime_type, size_bytes, status, word_count,"
-            " topic_hint, difficulty_estimate, storage_path, openviking_uri, source_folder, created_at, updated_at"
-            " FROM documents WHERE id = ? AND user_id = ?",
-            (doc_id, user_id),
-        )
+        cur = conn.execute(GET_DOCUMENT_SQL, (doc_id, user_id))
         row = cur.fetchone()
         return dict(row) if row else None
-    finally:
-        conn.close()
 
 
 def list_subjects(user_id: str) -> list[dict]:
-    conn = get_conn()
-    try:
+    with pooled_connection() as conn:
         cur = conn.execute(
             "SELECT id, name, created_at FROM subjects WHERE user_id = ? ORDER BY name",
             (user_id,),
         )
         return [dict(row) for row in cur.fetchall()]
-    finally:
-        conn.close()
 
 
 def create_subject(user_id: str, name: str) -> dict:
-    conn = get_conn()
-    try:
-        subject_id = str(uuid.uuid4())
-        conn.execute(
-            "INSERT INTO subjects (id, user_id, name) VALUES (?, ?, ?)",
-            (subject_id, user_id, name),
-        )
-        conn.commit()
-        return {"id": subject_id, "user_id": user_id, "name": name}
-    except sqlite3.IntegrityError:
-        # Subject likely exists
-        cur = conn.execute(
-            "SELECT id, name, created_at FROM subjects WHERE user_id = ? AND name = ?",
-            (user_id, name),
-        )
-        row = cur.fetchone()
-        if row:
-            return dict(row)
-        raise
-    finally:
-        conn.close()
+    with pooled_connection() as conn:
+        try:
+            subject_id = str(uuid.uuid4())
+            conn.execute(
+                "INSERT INTO subjects (id, user_id, name) VALUES (?, ?, ?)",
+                (subject_id, user_id, name),
+            )
+            conn.commit()
+            return {"id": subject_id, "user_id": user_id, "name": name}
+        except sqlite3.IntegrityError:
+            # Subject likely exists
+            cur = conn.execute(
+                "SELECT id, name, created_at FROM subjects WHERE user_id = ? AND name = ?",
+                (user_id, name),
+            )
+            row = cur.fetchone()
+            if row:
+                return dict(row)
+            raise
 
 
 
 
 def delete_chunks_for_document(doc_id: str) -> None:
-    conn = get_conn()
-    try:
+    with pooled_connection() as conn:
         conn.execute("DELETE FROM document_chunks WHERE doc_id = ?", (doc_id,))
+        conn.execute("DELETE FROM document_sections WHERE doc_id = ?", (doc_id,))
+        conn.execute("DELETE FROM document_texts WHERE doc_id = ?", (doc_id,))
         conn.commit()
-    finally:
-        conn.close()
 
 
 def insert_chunk(
@@ -157,52 +229,187 @@ def insert_chunk(
     chunk_text: str,
     page: int | None = None,
     section: str | None = None,
-) -> None:
-    conn = get_conn()
-    try:
-        conn.execute(
-            "INSERT INTO document_chunks (id, doc_id, chunk_index, chunk_text, page, section) VALUES (?, ?, ?, ?, ?, ?)",
-            (chunk_id, doc_id, chunk_index, chunk_text, page, section),
+    wait: bool = True,
+) -> Future:
+    """Append one chunk (and its text) to a document."""
+    chunk = {"id": chunk_id, "chunk_index": chunk_index, "chunk_text": chunk_text, "page": page, "section": section}
+    return insert_chunks(doc_id, [chunk], wait=wait)
+
+
+def _utf8_offsets(text: str, offsets: list[int]) -> dict[int, int]:
+    """Map character offsets into text to UTF-8 byte offsets in one pass over the text."""
+    if text.isascii():
+        return {o: o for o in offsets}
+    mapping: dict[int, int] = {}
+    char_pos = byte_pos = 0
+    for offset in sorted(set(offsets)):
+        byte_pos += len(text[char_pos:offset].encode("utf-8"))
+        char_pos = offset
+        mapping[offset] = byte_pos
+    return mapping
+
+
+def insert_chunks(
+    doc_id: str,
+    chunks: list[dict[str, Any]],
+    replace: bool = False,
+    defer_fts: bool | None = None,
+    wait: bool = True,
+    text: str | None = None,
+    sections: list[dict[str, Any]] | None = None,
+) -> Future:
+    """Store a document's text once and its chunks as spans of it, in one transaction.
+
+    With text, each chunk is a dict with "start"/"end" character offsets into text (as returned by
+    document_parser.chunk_pages); without it, each chunk carries its own "chunk_text" and the document
+    text becomes those texts joined by blank lines. Both take optional "page"/"section"; chunk_index is
+    the list position. The text is appended to the document's stored text, or replaces it (and every
+    existing chunk and section) with replace=True. sections ({"level", "title", "path", "start", "end"}
+    character offsets into text, as from chunk_pages) become the document's outline; they need text and
+    replace=True. With defer_fts (default: automatic for large documents) the
+    per-row FTS trigger is skipped for this document (FTS_DEFER_KEY in app_meta, set and cleared in the
+    same transaction) and document_chunks_fts is filled for it in one INSERT ... SELECT pass instead.
+    """
+    if sections and (text is None or not replace):
+        raise ValueError("sections need the document text and replace=True")
+    if text is None:
+        spans, pos = [], 0
+        for c in chunks:
+            spans.append((pos, pos + len(c["chunk_text"])))
+            pos += len(c["chunk_text"]) + len(_PIECE_SEPARATOR)
+        text = _PIECE_SEPARATOR.join(c["chunk_text"] for c in chunks)
+    else:
+        spans = [(c["start"], c["end"]) for c in chunks]
+    sections = sections or []
+    prefix = b"" if replace else _PIECE_SEPARATOR.encode()
+    body = prefix + text.encode("utf-8")
+    to_bytes = _utf8_offsets(text, [o for span in spans for o in span] + [o for s in sections for o in (s["start"], s["end"])])
+    rows = [
+        (
+            c.get("id") or str(uuid.uuid4()), doc_id, c.get("chunk_index", i),
+            len(prefix) + to_bytes[start], len(prefix) + to_bytes[end], c.get("page"), c.get("section"),
+            len(body), doc_id,
         )
-        conn.commit()
-    finally:
-        conn.close()
+        for i, (c, (start, end)) in enumerate(zip(chunks, spans))
+    ]
+    if defer_fts is None:
+        defer_fts = len(rows) >= _DEFER_FTS_MIN_CHUNKS
+    statements: list[WriteStatement] = []
+    if replace:
+        statements.append(WriteStatement("DELETE FROM document_chunks WHERE doc_id = ?", (doc_id,)))
+        statements.append(WriteStatement("DELETE FROM document_sections WHERE doc_id = ?", (doc_id,)))
+        statements.append(WriteStatement("DELETE FROM document_texts WHERE doc_id = ?", (doc_id,)))
+    statements.append(WriteStatement(APPEND_DOCUMENT_TEXT_SQL, (doc_id, body)))
+    if sections:
+        statements.append(WriteStatement(INSERT_SECTION_SQL, [
+            (doc_id, i, s["level"], s["title"], s["path"], to_bytes[s["start"]], to_bytes[s["end"]])
+            for i, s in enumerate(sections)
+        ], many=True))
+    if defer_fts:
+        statements.append(WriteStatement("INSERT OR REPLACE INTO app_meta(key, value) VALUES (?, ?)", (FTS_DEFER_KEY, doc_id)))
+    statements.append(WriteStatement(INSERT_CHUNK_SQL, rows, many=True))
+    if defer_fts:
+        statements.append(WriteStatement(
+            "INSERT INTO document_chunks_fts(rowid, chunk_text, doc_id, chunk_index)"
+            " SELECT rowid, fts_segment(chunk_text), doc_id, chunk_index FROM document_chunk_texts WHERE doc_id = ?",
+            (doc_id,),
+        ))
+        statements.append(WriteStatement("DELETE FROM app_meta WHERE key = ?", (FTS_DEFER_KEY,)))
+    return _write(*statements, wait=wait)
+
+
+def copy_document_chunks(src_doc_id: str, dst_doc_id: str, wait: bool = True) -> Future:
+    """Give dst_doc_id its own copy of src_doc_id's text, outline and chunks (replacing any it has), FTS included.
+
+    Copies are per document so a later re-chunk or edit of one user's document never touches another's.
+    The text is copied inside SQLite; only the chunk spans pass through Python.
+    """
+    with pooled_connection() as conn:
+        size = conn.execute("SELECT length(body) AS size FROM document_texts WHERE doc_id = ?", (src_doc_id,)).fetchone()
+        spans = conn.execute(
+            "SELECT chunk_index, start_offset, end_offset, page, section FROM document_chunks"
+            " WHERE doc_id = ? ORDER BY chunk_index",
+            (src_doc_id,),
+        ).fetchall()
+    size = size["size"] if size is not None else 0
+    rows = [
+        (str(uuid.uuid4()), dst_doc_id, s["chunk_index"], s["start_offset"], s["end_offset"], s["page"], s["section"], size, dst_doc_id)
+        for s in spans
+    ]
+    return _write(
+        WriteStatement("DELETE FROM document_chunks WHERE doc_id = ?", (dst_doc_id,)),
+        WriteStatement("DELETE FROM document_sections WHERE doc_id = ?", (dst_doc_id,)),
+        WriteStatement("DELETE FROM document_texts WHERE doc_id = ?", (dst_doc_id,)),
+        WriteStatement(
+            "INSERT INTO document_texts (doc_id, body) SELECT ?, body FROM document_texts WHERE doc_id = ?",
+            (dst_doc_id, src_doc_id),
+        ),
+        WriteStatement(
+            "INSERT INTO document_sections (doc_id, section_index, level, title, path, start_offset, end_offset)"
+            " SELECT ?, section_index, level, title, path, start_offset, end_offset FROM document_sections WHERE doc_id = ?",
+            (dst_doc_id, src_doc_id),
+        ),
+        WriteStatement(INSERT_CHUNK_SQL, rows, many=True),
+        wait=wait,
+    )
+
+
+def get_document_text(doc_id: str) -> memoryview | None:
+    """The document's stored UTF-8 text as a read-only buffer (slice it with chunk offsets, no copies)."""
+    with pooled_connection() as conn:
+        row = conn.execute("SELECT body FROM document_texts WHERE doc_id = ?", (doc_id,)).fetchone()
+    return memoryview(row["body"]) if row is not None else None
+
+
+def list_chunk_rows(doc_id: str) -> list[dict]:
+    """rowid, chunk_text and owning user_id of every chunk of a document (for the vector index).
+
+    The text is fetched once and each chunk decoded from a memoryview slice of it.
+    """
+    body = get_document_text(doc_id)
+    if body is None:
+        return []
+    with pooled_connection() as conn:
+        cur = conn.execute(
+            "SELECT c.rowid AS rowid, c.start_offset, c.end_offset, d.user_id FROM document_chunks c"
+            " JOIN documents d ON d.id = c.doc_id WHERE c.doc_id = ? ORDER BY c.chunk_index",
+            (doc_id,),
+        )
+        return [
+            {"rowid": r["rowid"], "chunk_text": str(body[r["start_offset"]:r["end_offset"]], "utf-8"), "user_id": r["user_id"]}
+            for r in cur.fetchall()
+        ]
+
+
+def get_document_outline(doc_id: str) -> list[dict]:
+    """The document's section tree in order: level, title, path and how many chunks each section holds."""
+    with pooled_connection() as conn:
+        cur = conn.execute(
+            "SELECT s.section_index, s.level, s.title, s.path,"
+            " (SELECT COUNT(*) FROM document_chunks c WHERE c.doc_id = s.doc_id AND c.section = s.path) AS chunk_count"
+            " FROM document_sections s WHERE s.doc_id = ? ORDER BY s.section_index",
+            (doc_id,),
+        )
+        return [dict(row) for row in cur.fetchall()]
 
 
 def get_chunks_for_document(doc_id: str, limit: int = 50) -> list[dict]:
-    conn = get_conn()
-    try:
+    with pooled_connection() as conn:
         cur = conn.execute(
-            "SELECT id, doc_id, chunk_index, chunk_text, page, section FROM document_chunks WHERE doc_id = ? ORDER BY chunk_index LIMIT ?",
+            "SELECT id, doc_id, chunk_index, chunk_text, page, section FROM document_chunk_texts WHERE doc_id = ? ORDER BY chunk_index LIMIT ?",
             (doc_id, limit),
         )
         return [dict(row) for row in cur.fetchall()]
-    finally:
-        conn.close()
 
 
 def upsert_chat_session(session_id: str, user_id: str, title: str | None = None) -> None:
-    conn = get_conn()
-    try:
-        conn.execute(
-            """
-            INSERT INTO chat_sessions (id, user_id, title, last_message_at)
-            VALUES (?, ?, ?, datetime('now'))
-            ON CONFLICT(id) DO UPDATE SET
-              updated_at = datetime('now'),
-              last_message_at = datetime('now'),
-              title = COALESCE(chat_sessions.title, excluded.title)
-            """,
-            (session_id, user_id, title),
-        )
+    with pooled_connection() as conn:
+        conn.execute(UPSERT_CHAT_SESSION_SQL, (session_id, user_id, title))
         conn.commit()
-    finally:
-        conn.close()
 
 
 def get_chat_session(session_id: str, user_id: str) -> dict | None:
-    conn = get_conn()
-    try:
+    with pooled_connection() as conn:
         cur = conn.execute(
             """
             SELECT id, user_id, title, created_at, updated_at, last_message_at, committed_at
@@ -213,13 +420,10 @@ def get_chat_session(session_id: str, user_id: str) -> dict | None:
         )
         row = cur.fetchone()
         return dict(row) if row else None
-    finally:
-        conn.close()
 
 
 def list_chat_sessions(user_id: str, limit: int = 50) -> list[dict]:
-    conn = get_conn()
-    try:
+    with pooled_connection() as conn:
         cur = conn.execute(
             """
             SELECT id, user_id, title, created_at, updated_at, last_message_at, committed_at
@@ -231,36 +435,25 @@ def list_chat_sessions(user_id: str, limit: int = 50) -> list[dict]:
             (user_id, limit),
         )
         return [dict(row) for row in cur.fetchall()]
-    finally:
-        conn.close()
 
 
-def insert_chat_message(message_id: str, session_id: str, user_id: str, role: str, content: str) -> None:
-    conn = get_conn()
-    try:
-        conn.execute(
-            """
-            INSERT INTO chat_messages (id, session_id, user_id, role, content)
-            VALUES (?, ?, ?, ?, ?)
-            """,
-            (message_id, session_id, user_id, role, content),
-        )
-        conn.execute(
-            """
-            UPDATE chat_sessions
-            SET updated_at = datetime('now'), last_message_at = datetime('now')
-            WHERE id = ? AND user_id = ?
-            """,
-            (session_id, user_id),
-        )
-        conn.commit()
-    finally:
-        conn.close()
+def insert_chat_message(
+    message_id: str,
+    session_id: str,
+    user_id: str,
+    role: str,
+    content: str,
+    wait: bool = True,
+) -> Future:
+    return _write(
+        WriteStatement(INSERT_CHAT_MESSAGE_SQL, (message_id, session_id, user_id, role, content)),
+        WriteStatement(TOUCH_CHAT_SESSION_SQL, (session_id, user_id)),
+        wait=wait,
+    )
 
 
 def list_chat_messages(session_id: str, user_id: str, limit: int = 500) -> list[dict]:
-    conn = get_conn()
-    try:
+    with pooled_connection() as conn:
         cur = conn.execute(
             """
             SELECT id, session_id, user_id, role, content, created_at
@@ -272,13 +465,10 @@ def list_chat_messages(session_id: str, user_id: str, limit: int = 500) -> list[
             (session_id, user_id, limit),
         )
         return [dict(row) for row in cur.fetchall()]
-    finally:
-        conn.close()
 
 
 def mark_chat_session_committed(session_id: str, user_id: str) -> None:
-    conn = get_conn()
-    try:
+    with pooled_connection() as conn:
         conn.execute(
             """
             UPDATE chat_sessions
@@ -288,8 +478,6 @@ def mark_chat_session_committed(session_id: str, user_id: str) -> None:
             (session_id, user_id),
         )
         conn.commit()
-    finally:
-        conn.close()
 
 
 # Reminders (break, focus, or other scheduled reminders)
@@ -301,58 +489,30 @@ def insert_reminder(
     due_at: str,
     message: str,
     kind: str = "break",
-) -> None:
-    conn = get_conn()
-    try:
-        conn.execute(
+    wait: bool = True,
+) -> Future:
+    return _write(
+        WriteStatement(
             """
             INSERT INTO reminders (id, session_id, user_id, due_at, message, kind, status)
             VALUES (?, ?, ?, ?, ?, ?, 'scheduled')
             """,
             (reminder_id, session_id, user_id, due_at, message, kind),
-        )
-        conn.commit()
-    finally:
-        conn.close()
+        ),
+        wait=wait,
+    )
 
 
 def list_due_reminders(session_id: str, user_id: str) -> list[dict]:
     """Return reminders for this session that are due and not yet acknowledged."""
-    conn = get_conn()
-    try:
-        cur = conn.execute(
-            """
-            SELECT id, session_id, user_id, due_at, message, kind, status, created_at
-            FROM reminders
-            WHERE session_id = ? AND user_id = ? AND status = 'due'
-            ORDER BY due_at ASC
-            """,
-            (session_id, user_id),
-        )
+    with pooled_connection() as conn:
+        cur = conn.execute(LIST_DUE_REMINDERS_SQL, (session_id, user_id))
         return [dict(row) for row in cur.fetchall()]
-    finally:
-        conn.close()
 
 
-def mark_reminder_acknowledged(reminder_id: str) -> None:
-    conn = get_conn()
-    try:
-        conn.execute(
-            "UPDATE reminders SET status = 'acknowledged' WHERE id = ?",
-            (reminder_id,),
-        )
-        conn.commit()
-    finally:
-        conn.close()
+def mark_reminder_acknowledged(reminder_id: str, wait: bool = True) -> Future:
+    return _write(WriteStatement(ACK_REMINDER_SQL, (reminder_id,)), wait=wait)
 
 
-def set_reminder_due(reminder_id: str) -> None:
-    conn = get_conn()
-    try:
-        conn.execute(
-            "UPDATE reminders SET status = 'due' WHERE id = ?",
-            (reminder_id,),
-        )
-        conn.commit()
-    finally:
-        conn.close()
+def set_reminder_due(reminder_id: str, wait: bool = True) -> Future:
+    return _write(WriteStatement("UPDATE reminders SET status = 'due' WHERE id = ?", (reminder_id,)), wait=wait)
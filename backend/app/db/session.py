@@ -1,11 +1,22 @@
-"""SQLite connection and init. Sync for simplicity; init_db runs migrations."""
+"""SQLite connection and init. Sync for simplicity (async handlers use asyncio.to_thread); init_db runs migrations.
+
+Repositories borrow connections from a bounded per-database pool via pooled_connection(); each pooled
+connection runs its PRAGMA setup once and keeps sqlite3's prepared-statement cache warm across calls.
+"""
 from __future__ import annotations
 
+import queue
 import sqlite3
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator
 
 from app.core.config import get_settings
+from app.db.fts import register_fts_functions
+
+# Prepared statements kept per connection (sqlite3 default is 128).
+_STATEMENT_CACHE_SIZE = 256
 
 
 def _db_path() -> Path:
@@ -14,13 +25,122 @@ def _db_path() -> Path:
     return p
 
 
-def get_conn() -> sqlite3.Connection:
-    conn = sqlite3.connect(str(_db_path()), check_same_thread=False)
+def _open_conn(path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(path), check_same_thread=False, cached_statements=_STATEMENT_CACHE_SIZE)
     conn.row_factory = _row_factory
     conn.execute("PRAGMA journal_mode = WAL")
+    register_fts_functions(conn)
     return conn
 
 
+def get_conn() -> sqlite3.Connection:
+    """Open a new, unpooled connection (migrations and one-off scripts). Caller must close it."""
+    return _open_conn(_db_path())
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of sqlite3 connections to one database file.
+
+    Connections are created lazily up to max_size; borrowers beyond that wait for a release.
+    """
+
+    def __init__(self, path: Path, max_size: int, acquire_timeout: float = 30.0) -> None:
+        self.path = path
+        self.max_size = max(1, max_size)
+        self.acquire_timeout = acquire_timeout
+        self._idle: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.max_size:
+                self._created += 1
+                try:
+                    return _open_conn(self.path)
+                except Exception:
+                    self._created -= 1
+                    raise
+        try:
+            return self._idle.get(timeout=self.acquire_timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No SQLite connection available after {self.acquire_timeout}s") from None
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        if self._closed:
+            self._discard(conn)
+            return
+        self._idle.put(conn)
+
+    def _discard(self, conn: sqlite3.Connection) -> None:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._created -= 1
+
+    def close(self) -> None:
+        """Close idle connections; connections still borrowed are closed when released."""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(conn)
+
+
+_POOLS: dict[str, ConnectionPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Return the pool for the configured database (one per file, created on first use)."""
+    path = _db_path()
+    key = str(path.resolve())
+    pool = _POOLS.get(key)
+    if pool is not None:
+        return pool
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            pool = ConnectionPool(path, get_settings().sqlite_pool_size)
+            _POOLS[key] = pool
+    return pool
+
+
+@contextmanager
+def pooled_connection() -> Iterator[sqlite3.Connection]:
+    """Borrow a pooled connection for the duration of the block; uncommitted work is rolled back on return."""
+    pool = get_pool()
+    conn = pool.acquire()
+    try:
+        yield conn
+    finally:
+        pool.release(conn)
+
+
+def close_pools() -> None:
+    """Close all pooled connections (shutdown, tests)."""
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+    for pool in pools:
+        pool.close()
+
+
 def _row_factory(cursor: sqlite3.Cursor, row: tuple[Any, ...]) -> dict[str, Any]:
     return {col[0]: row[i] for i, col in enumerate(cursor.description)}
 
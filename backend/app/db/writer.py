@@ -0,0 +1,171 @@
+"""Group-commit writer: one background thread owns the write connection and commits queued writes in batches.
+
+SQLite serializes writers on the database lock anyway, so funnelling hot writes (chat messages, document
+chunks, status and reminder updates) through one connection removes `database is locked` contention, and
+committing everything queued within a few milliseconds amortizes the fsync across callers.
+
+Every submitted write gets a concurrent.futures.Future that resolves once its batch is committed; sync
+callers use .result(), async callers `await asyncio.wrap_future(...)`. Each write runs under its own
+savepoint, so a failing write only fails its own future.
+"""
+from __future__ import annotations
+
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from app.core.config import get_settings
+from app.db.fts import register_fts_functions
+
+logger = logging.getLogger(__name__)
+
+_MAX_BATCH = 256
+
+
+@dataclass(slots=True)
+class WriteStatement:
+    """One SQL statement of a queued write; many=True runs executemany over params."""
+    sql: str
+    params: Any = ()
+    many: bool = False
+
+
+@dataclass(slots=True)
+class _WriteOp:
+    statements: list[WriteStatement]
+    future: Future = field(default_factory=Future)
+
+
+class GroupCommitWriter:
+    """Background writer for one database file."""
+
+    def __init__(self, path: Path, max_delay: float = 0.002, max_batch: int = _MAX_BATCH) -> None:
+        self.path = path
+        self.max_delay = max(0.0, max_delay)
+        self.max_batch = max(1, max_batch)
+        self._queue: queue.Queue[_WriteOp | None] = queue.Queue()
+        self._stopped = False
+        self._stop_lock = threading.Lock()  # makes the stopped check and the enqueue atomic with stop()
+        self._thread = threading.Thread(target=self._run, name="sqlite-group-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, *statements: WriteStatement) -> Future:
+        """Queue statements to run atomically in the next group commit."""
+        op = _WriteOp(list(statements))
+        with self._stop_lock:
+            if self._stopped:
+                raise RuntimeError("SQLite writer is stopped")
+            self._queue.put(op)
+        return op.future
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Commit everything already queued, then stop the thread. Later submits raise RuntimeError."""
+        with self._stop_lock:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        conn = sqlite3.connect(str(self.path), isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode = WAL")
+        register_fts_functions(conn)
+        try:
+            while True:
+                op = self._queue.get()
+                if op is None:
+                    return
+                batch, stop = self._collect([op])
+                self._commit_batch(conn, batch)
+                if stop:
+                    return
+        finally:
+            conn.close()
+
+    def _collect(self, batch: list[_WriteOp]) -> tuple[list[_WriteOp], bool]:
+        """Gather whatever is already queued plus anything arriving within max_delay."""
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                op = self._queue.get_nowait() if remaining <= 0 else self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if op is None:
+                return batch, True
+            batch.append(op)
+        return batch, False
+
+    def _commit_batch(self, conn: sqlite3.Connection, batch: list[_WriteOp]) -> None:
+        ops = [op for op in batch if op.future.set_running_or_notify_cancel()]
+        if not ops:
+            return
+        applied: list[_WriteOp] = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for op in ops:
+                conn.execute("SAVEPOINT group_write")
+                try:
+                    for st in op.statements:
+                        if st.many:
+                            conn.executemany(st.sql, st.params)
+                        else:
+                            conn.execute(st.sql, st.params)
+                except Exception as exc:
+                    conn.execute("ROLLBACK TO group_write")
+                    conn.execute("RELEASE group_write")
+                    op.future.set_exception(exc)
+                    continue
+                conn.execute("RELEASE group_write")
+                applied.append(op)
+            conn.execute("COMMIT")
+        except Exception as exc:
+            logger.exception("Group commit of %d write(s) failed", len(ops))
+            if conn.in_transaction:
+                try:
+                    conn.execute("ROLLBACK")
+                except sqlite3.Error:
+                    pass
+            for op in ops:
+                if not op.future.done():
+                    op.future.set_exception(exc)
+            return
+        for op in applied:
+            op.future.set_result(None)
+
+
+_WRITERS: dict[str, GroupCommitWriter] = {}
+_WRITERS_LOCK = threading.Lock()
+
+
+def get_writer() -> GroupCommitWriter:
+    """Return the writer for the configured database, starting it on first use."""
+    from app.db.session import _db_path
+
+    path = _db_path()
+    key = str(path.resolve())
+    writer = _WRITERS.get(key)
+    if writer is not None:
+        return writer
+    with _WRITERS_LOCK:
+        writer = _WRITERS.get(key)
+        if writer is None:
+            writer = GroupCommitWriter(path, max_delay=get_settings().sqlite_group_commit_ms / 1000.0)
+            _WRITERS[key] = writer
+    return writer
+
+
+def stop_writers() -> None:
+    """Flush and stop all writers (shutdown, tests)."""
+    with _WRITERS_LOCK:
+        writers = list(_WRITERS.values())
+        _WRITERS.clear()
+    for writer in writers:
+        writer.stop()
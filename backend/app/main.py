@@ -12,9 +12,11 @@ from app.api import auth, chat, documents, health, not_implemented, sessions
 from app.core.errors import ChatErrorCode, detail
 from app.core.chat_logging import log_agent_context_startup
 from app.core.text_logging import log_text
-from app.db.session import init_db
+from app.db.session import close_pools, init_db
+from app.db.writer import stop_writers
+from app.services.ingestion import resume_pending_ingestions, shutdown_ingestion
 from app.context import (
-    get_agent_context_text,
+    get_agent_system_prompt,
     initialize_openviking_client,
     load_agent_context,
 )
@@ -25,8 +27,10 @@ async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
     """Initialize DB and resources on startup."""
     initialize_openviking_client()
     init_db()
+    resume_pending_ingestions()
     load_agent_context()
-    context_text = get_agent_context_text()
+    system_prompt = get_agent_system_prompt()
+    context_text = f"{system_prompt.text}\n\n(system prompt version {system_prompt.version})"
     log_agent_context_startup(context_text)
     log_text(context_text or "(empty)", section="AGENT CONTEXT (startup)")
     print("--- Agent context ---", flush=True)
@@ -34,6 +38,9 @@ async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
     print("---", flush=True)
     sys.stdout.flush()
     yield
+    shutdown_ingestion()
+    stop_writers()
+    close_pools()
 
 
 def _validation_error_message(errors: list) -> str:
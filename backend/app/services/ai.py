@@ -6,7 +6,9 @@ import logging
 from agno.agent import Agent
 from agno.models.openai import OpenAIChat
 
+from app.core.chat_logging import log_chat_prompt_budget
 from app.core.config import get_settings
+from app.services.prompt_builder import build_prompt
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +27,7 @@ def get_base_model() -> OpenAIChat:
         id=model_id,
         api_key=api_key,
         base_url=base_url,
+        timeout=settings.chat_request_timeout,
     )
 
 
@@ -39,32 +42,39 @@ def fallback_chat(prompt: str, context: list[str]) -> str:
     return "I can help! Upload study material or ask a focused question and we will break it down step by step."
 
 
+_CHAT_INSTRUCTIONS = "Reply in character: accurate, helpful, concise, and encouraging."
+
+
+def _build_chat_prompt(
+    prompt: str,
+    context_texts: list[str],
+    conversation_history: list[dict[str, str]] | None = None,
+    session_id: str | None = None,
+) -> str:
+    built = build_prompt(
+        prompt,
+        _CHAT_INSTRUCTIONS,
+        budget=get_settings().prompt_token_budget,
+        context=context_texts,
+        history=conversation_history or (),
+        context_label="Context (from user's documents):",
+    )
+    try:
+        log_chat_prompt_budget(session_id or "(fallback)", built.budget, built.usage, built.dropped)
+    except Exception:
+        pass
+    return built.text
+
+
 def chat(
     prompt: str,
     context_texts: list[str],
     attachment_doc_title: str | None = None,
     conversation_history: list[dict[str, str]] | None = None,
+    session_id: str | None = None,
 ) -> tuple[str, bool]:
     """Returns (reply_text, used_fallback). used_fallback is True when Volcengine was not used."""
-    context_block = "\n\n".join(context_texts[:14])
-    history_block = ""
-    if conversation_history:
-        lines: list[str] = []
-        for item in conversation_history[-12:]:
-            role = str(item.get("role", "user") or "user")
-            content = str(item.get("content", "") or "").strip()
-            if content:
-                lines.append(f"[{role}] {content}")
-        if lines:
-            history_block = "Recent conversation history:\n" + "\n".join(lines) + "\n\n"
-
-    context_label = "Context (from user's documents):"
-    user_content = (
-        f"{history_block}{context_label}\n{context_block}\n\n"
-        f"User question:\n{prompt}\n\n"
-        "Reply in character: accurate, helpful, concise, and encouraging."
-    )
-    
+    user_content = _build_chat_prompt(prompt, context_texts, conversation_history, session_id)
     agent = Agent(model=get_base_model(), markdown=True)
     try:
         response = agent.run(user_content)
@@ -76,6 +86,26 @@ def chat(
     return fallback_chat(prompt, context_texts), True
 
 
+async def achat(
+    prompt: str,
+    context_texts: list[str],
+    attachment_doc_title: str | None = None,
+    conversation_history: list[dict[str, str]] | None = None,
+    session_id: str | None = None,
+) -> tuple[str, bool]:
+    """Async chat(): same prompt and fallback, awaited via Agno's arun."""
+    user_content = _build_chat_prompt(prompt, context_texts, conversation_history, session_id)
+    agent = Agent(model=get_base_model(), markdown=True)
+    try:
+        response = await agent.arun(user_content)
+        if response and response.content:
+            return response.content, False
+    except Exception as e:
+        logger.warning("Chat fallback: Agno request failed: %s", e, exc_info=True)
+
+    return fallback_chat(prompt, context_texts), True
+
+
 def mood_from_text(text: str) -> str:
     text_lower = text.lower()
     if any(w in text_lower for w in ("great", "awesome", "amazing", "proud", "well done")):
@@ -1,47 +1,285 @@
-"""Document parsing and chunking (aligned with lib/document-parser.ts)."""
+"""Document parsing and chunking (aligned with lib/document-parser.ts).
+
+Files are read through a read-only memory map rather than a bytes copy: pypdf reads the mmap as its
+stream (given a path it would load the whole file into a BytesIO), and text files decode straight from it.
+"""
+import mmap
+import re
+from bisect import bisect_right
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Any, Iterator
 
+from app.services.tokens import estimate_tokens
 
-def chunk_text(text: str, chunk_size: int = 700, overlap: int = 120) -> list[str]:
-    words = [w for w in text.split() if w]
-    if not words:
-        return []
-    chunks: list[str] = []
-    start = 0
-    while start < len(words):
-        end = min(start + chunk_size, len(words))
-        chunk = " ".join(words[start:end]).strip()
-        if chunk:
-            chunks.append(chunk)
-        if end >= len(words):
-            break
-        start = max(0, end - overlap)
-    return chunks
+# (page number, text): page is 1-based for PDFs and None for formats without pages.
+PageText = tuple[int | None, str]
 
+# Bump whenever parse_document_pages output changes; cached parses of older versions are not reused.
+PARSER_VERSION = 2
 
-def parse_document(file_path: str | Path) -> str:
+# Chunk size and overlap in estimated tokens (app.services.tokens), the unit the prompt is budgeted in.
+CHUNK_TOKENS = 300
+CHUNK_OVERLAP_TOKENS = 50
+# A paragraph break closes the current chunk early once it holds this share of CHUNK_TOKENS.
+_PARAGRAPH_FILL = 0.6
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_NONSPACE_RE = re.compile(r"\S")
+_WORD_RE = re.compile(r"\S+")
+# Sentence ends: Latin terminators before whitespace, CJK terminators anywhere, and paragraph breaks.
+_SENTENCE_END_RE = re.compile(r"[.!?]+[\"')\]”’]*(?=\s)|[。！？；]+[”’」』）]*|\n\n")
+# Markdown ATX heading lines, and code fence lines (headings inside a fenced block are ignored).
+_HEADING_LINE_RE = re.compile(
+    r"^(?:(?P<hashes>#{1,6})[ \t]+(?P<title>.+?)[ \t#]*|(?P<fence>```|~~~).*)$", re.MULTILINE
+)
+SECTION_PATH_SEP = " > "
+
+
+def _normalize(text: str) -> str:
+    """Collapse whitespace runs to one space, keeping paragraph breaks (blank lines) as "\n\n"."""
+    return _WHITESPACE_RE.sub(lambda m: "\n\n" if m.group().count("\n") > 1 else " ", text).strip()
+
+
+def _iter_units(text: str, max_tokens: int, pos: int, endpos: int) -> Iterator[tuple[int, int, int, bool]]:
+    """(start, end, tokens, starts_paragraph) for each sentence of text[pos:endpos], in order.
+
+    A sentence over max_tokens is yielded word by word instead, and a word over max_tokens in slices of
+    max_tokens characters (no character estimates as more than one token).
+    """
+    ends = _SENTENCE_END_RE.finditer(text, pos, endpos)
+    while pos < endpos:
+        match = next(ends, None)
+        end = match.end() if match else endpos
+        first = _NONSPACE_RE.search(text, pos, end)
+        pos = end
+        if first is None:
+            continue
+        start = first.start()
+        while text[end - 1].isspace():
+            end -= 1
+        paragraph = start == 0 or text.startswith("\n\n", start - 2)
+        tokens = estimate_tokens(text[start:end])
+        if tokens <= max_tokens:
+            yield start, end, tokens, paragraph
+            continue
+        for word in _WORD_RE.finditer(text, start, end):
+            for piece in range(word.start(), word.end(), max_tokens):
+                piece_end = min(piece + max_tokens, word.end())
+                yield piece, piece_end, estimate_tokens(text[piece:piece_end]), paragraph
+                paragraph = False
+
+
+def iter_chunk_spans(
+    text: str,
+    max_tokens: int = CHUNK_TOKENS,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+    pos: int = 0,
+    endpos: int | None = None,
+) -> Iterator[tuple[int, int]]:
+    """(start, end) character offsets of the chunks of normalized text[pos:endpos], generated incrementally.
+
+    Whole sentences are packed into chunks of at most max_tokens estimated tokens; a chunk also ends at
+    a paragraph break once it is reasonably full. Each chunk starts with the trailing sentences of the
+    previous one, up to overlap_tokens. Only the sentences of the current chunk are held in memory.
+    """
+    window: deque[tuple[int, int, int]] = deque()
+    total = 0
+    endpos = len(text) if endpos is None else endpos
+    for start, end, tokens, paragraph in _iter_units(text, max_tokens, pos, endpos):
+        if window and (total + tokens > max_tokens or (paragraph and total >= max_tokens * _PARAGRAPH_FILL)):
+            yield window[0][0], window[-1][1]
+            total -= window.popleft()[2]
+            while window and (total > overlap_tokens or total + tokens > max_tokens):
+                total -= window.popleft()[2]
+        window.append((start, end, tokens))
+        total += tokens
+    if window:
+        yield window[0][0], window[-1][1]
+
+
+def chunk_text(
+    text: str, max_tokens: int = CHUNK_TOKENS, overlap_tokens: int = CHUNK_OVERLAP_TOKENS
+) -> Iterator[str]:
+    """Chunks of text (normalized first), one at a time."""
+    text = _normalize(text)
+    for start, end in iter_chunk_spans(text, max_tokens, overlap_tokens):
+        yield text[start:end]
+
+
+def count_words(text: str) -> int:
+    return sum(1 for _ in _WORD_RE.finditer(text))
+
+
+def _split_headings(text: str) -> Iterator[tuple[int, str | None, str]]:
+    """(level, heading, body) blocks of Markdown text: the text before the first ATX heading comes with
+    level 0 and no heading. Lines inside fenced code blocks are never headings."""
+    level, heading, body_start = 0, None, 0
+    in_fence = False
+    for match in _HEADING_LINE_RE.finditer(text):
+        if match.group("fence"):
+            in_fence = not in_fence
+            continue
+        if in_fence:
+            continue
+        yield level, heading, text[body_start:match.start()]
+        level, heading, body_start = len(match.group("hashes")), match.group("title"), match.end()
+    yield level, heading, text[body_start:]
+
+
+def _docx_heading_level(style_name: str) -> int:
+    if style_name == "Title":
+        return 1
+    match = re.fullmatch(r"Heading (\d)", style_name)
+    return min(int(match.group(1)), 6) if match else 0
+
+
+@dataclass(slots=True)
+class ChunkedDocument:
+    """Normalized document text with its chunks and sections as spans (character offsets) of it.
+
+    chunks: {"start", "end", "page", "section"}; section is the heading path the chunk falls under.
+    sections: {"level", "title", "path", "start", "end"} in document order; a section spans from its
+    heading to the next heading of the same or a higher level. path joins the heading titles from the
+    top level down with SECTION_PATH_SEP.
+    """
+
+    text: str
+    chunks: list[dict[str, Any]] = field(default_factory=list)
+    sections: list[dict[str, Any]] = field(default_factory=list)
+
+
+def join_pages(
+    pages: list[PageText], headings: bool = False
+) -> tuple[str, list[tuple[int, int | None]], list[dict[str, Any]]]:
+    """Normalized document text (see _normalize; pages separated by a blank line), the (character
+    offset, page) at which each page starts, and its sections.
+
+    With headings, Markdown ATX headings (also what .docx heading styles are parsed into) become their
+    own paragraphs and open sections; otherwise the document has no sections.
+    """
+    parts: list[str] = []
+    page_starts: list[tuple[int, int | None]] = []
+    sections: list[dict[str, Any]] = []
+    open_sections: list[dict[str, Any]] = []
+    offset = 0
+
+    def append(piece: str) -> int | None:
+        nonlocal offset
+        piece = _normalize(piece)
+        if not piece:
+            return None
+        if parts:
+            parts.append("\n\n")
+            offset += 2
+        parts.append(piece)
+        offset += len(piece)
+        return offset - len(piece)
+
+    for page, text in pages:
+        page_start = None
+        for level, heading, body in _split_headings(text) if headings else [(0, None, text)]:
+            if heading is not None and (start := append(heading)) is not None:
+                while open_sections and open_sections[-1]["level"] >= level:
+                    open_sections.pop()["end"] = start
+                title = parts[-1]
+                path = SECTION_PATH_SEP.join([s["title"] for s in open_sections] + [title])
+                section = {"level": level, "title": title, "path": path, "start": start, "end": None}
+                open_sections.append(section)
+                sections.append(section)
+                page_start = start if page_start is None else page_start
+            start = append(body)
+            page_start = start if page_start is None else page_start
+        if page_start is not None:
+            page_starts.append((page_start, page))
+    for section in open_sections:
+        section["end"] = offset
+    return "".join(parts), page_starts, sections
+
+
+def chunk_pages(
+    pages: list[PageText],
+    max_tokens: int = CHUNK_TOKENS,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+    headings: bool = False,
+) -> ChunkedDocument:
+    """Normalize and chunk a parsed document.
+
+    Chunks come from iter_chunk_spans and never cross a heading: each section's own text (its heading up
+    to the next heading of any level) is chunked separately and the chunks tagged with the section's path
+    and the page they start on. A heading directly followed by a subheading gets no chunk of its own.
+    The text is stored once and each chunk's text is text[start:end].
+    """
+    text, page_starts, sections = join_pages(pages, headings)
+    page_offsets = [offset for offset, _ in page_starts]
+    doc = ChunkedDocument(text=text, sections=sections)
+    bounds = [(0, None, False)] + [(s["start"], s["path"], True) for s in sections] + [(len(text), None, False)]
+    for (start, path, has_heading), (end, _, _) in zip(bounds, bounds[1:]):
+        if start >= end or (has_heading and "\n\n" not in text[start:end].rstrip()):
+            continue
+        for chunk_start, chunk_end in iter_chunk_spans(text, max_tokens, overlap_tokens, start, end):
+            page = page_starts[bisect_right(page_offsets, chunk_start) - 1][1] if page_starts else None
+            doc.chunks.append({"start": chunk_start, "end": chunk_end, "page": page, "section": path})
+    return doc
+
+
+@contextmanager
+def _mapped(path: Path) -> Iterator[mmap.mmap | bytes]:
+    """Read-only memory map of path (empty files, which cannot be mapped, yield b"")."""
+    with open(path, "rb") as fh:
+        if fh.seek(0, 2) == 0:
+            yield b""
+            return
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield mm
+
+
+def count_pdf_pages(file_path: str | Path) -> int:
+    from pypdf import PdfReader
+
+    with _mapped(Path(file_path)) as data:
+        return len(PdfReader(data).pages)
+
+
+def parse_document_pages(file_path: str | Path, page_range: tuple[int, int] | None = None) -> list[PageText]:
+    """Extract text per page. page_range=(start, end) limits a PDF to pages[start:end] (0-based)."""
     path = Path(file_path)
     ext = path.suffix.lower()
-    raw = path.read_bytes()
 
     if ext in (".txt", ".md"):
-        return raw.decode("utf-8", errors="replace").replace("\r\n", "\n")
+        with _mapped(path) as data:
+            return [(None, str(memoryview(data), "utf-8", errors="replace").replace("\r\n", "\n"))]
 
     if ext == ".pdf":
         from pypdf import PdfReader
-        import io
-        reader = PdfReader(io.BytesIO(raw))
-        parts = []
-        for page in reader.pages:
-            t = page.extract_text()
-            if t:
-                parts.append(t)
-        return "\n".join(parts).strip()
+
+        with _mapped(path) as data:
+            reader = PdfReader(data)
+            start, end = page_range if page_range is not None else (0, len(reader.pages))
+            out: list[PageText] = []
+            for i in range(start, min(end, len(reader.pages))):
+                t = reader.pages[i].extract_text()
+                if t:
+                    out.append((i + 1, t))
+            return out
 
     if ext == ".docx":
         from docx import Document
-        import io
-        doc = Document(io.BytesIO(raw))
-        return "\n".join(p.text for p in doc.paragraphs if p.text.strip()).strip()
+
+        doc = Document(str(path))
+        blocks: list[str] = []
+        for p in doc.paragraphs:
+            text = p.text.strip()
+            if not text:
+                continue
+            level = _docx_heading_level(p.style.name if p.style is not None else "")
+            blocks.append(f"{'#' * level} {text}" if level else text)
+        return [(None, "\n\n".join(blocks))]
 
     raise ValueError(f"Unsupported file type: {ext}")
+
+
+def parse_document(file_path: str | Path) -> str:
+    return "\n".join(text for _, text in parse_document_pages(file_path)).strip()
@@ -0,0 +1,87 @@
+"""Local text embedders for the dense chunk index.
+
+The default HashingEmbedder needs no model or network: word unigrams and bigrams are feature-hashed into
+a fixed number of signed buckets with sublinear term frequency, then L2-normalized, so a dot product is
+a cosine similarity. Another embedder can be plugged in with VECTOR_EMBEDDER="package.module:factory",
+where factory() returns an object with `name`, `dim` and `embed(texts) -> (n, dim) float32 array`.
+"""
+from __future__ import annotations
+
+import importlib
+import math
+import re
+import threading
+import zlib
+from collections import Counter
+from typing import Protocol
+
+import numpy as np
+
+from app.core.config import get_settings
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class Embedder(Protocol):
+    name: str  # identifies the embedding space; an index built with another name is rebuilt
+    dim: int
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """Return an (len(texts), dim) float32 array of L2-normalized rows."""
+        ...
+
+
+class HashingEmbedder:
+    """Feature-hashed bag of unigrams + bigrams with sublinear TF (CPU-only default)."""
+
+    def __init__(self, dim: int = 256) -> None:
+        self.dim = dim
+        self.name = f"hashing-v1-{dim}"
+
+    def _features(self, text: str) -> Counter[str]:
+        tokens = _TOKEN_RE.findall(text.lower())
+        feats: Counter[str] = Counter(tokens)
+        feats.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+        return feats
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            row = out[i]
+            for feat, tf in self._features(text).items():
+                h = zlib.crc32(feat.encode("utf-8"))
+                row[h % self.dim] += (1.0 + math.log(tf)) * (1.0 if h & 0x80000000 else -1.0)
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        np.divide(out, norms, out=out, where=norms > 0)
+        return out
+
+
+_EMBEDDER: Embedder | None = None
+_EMBEDDER_LOCK = threading.Lock()
+
+
+def _load_embedder(spec: str) -> Embedder:
+    if spec == "hashing":
+        return HashingEmbedder(get_settings().vector_dim)
+    module_name, _, attr = spec.partition(":")
+    if not attr:
+        raise ValueError(f"VECTOR_EMBEDDER must be 'hashing' or 'module:factory', got {spec!r}")
+    return getattr(importlib.import_module(module_name), attr)()
+
+
+def get_embedder() -> Embedder:
+    """Return the configured embedder (created on first use)."""
+    global _EMBEDDER
+    if _EMBEDDER is not None:
+        return _EMBEDDER
+    with _EMBEDDER_LOCK:
+        if _EMBEDDER is None:
+            _EMBEDDER = _load_embedder(get_settings().vector_embedder)
+    return _EMBEDDER
+
+
+def reset_embedder() -> None:
+    """Forget the cached embedder (tests, settings changes)."""
+    global _EMBEDDER
+    with _EMBEDDER_LOCK:
+        _EMBEDDER = None
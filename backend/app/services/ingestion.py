@@ -0,0 +1,233 @@
+"""Background document ingestion: parse, chunk and index uploads off the request path.
+
+Uploads are persisted with status "processing" and queued here; a bounded worker pool does the work and
+keeps per-document progress in memory for GET /api/documents/{doc_id}/status. The parse step itself runs
+in app.services.parse_pool's worker processes, and its output is kept in app.services.parse_cache so
+reindex_documents can re-chunk everything later without parsing again. The documents row remains the
+source of truth for the final status ("ready" / "failed").
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from app.core.config import get_settings
+from app.db.repositories import (
+    copy_document_chunks,
+    find_ready_document_by_hash,
+    insert_chunks,
+    list_chunk_rows,
+    list_processing_documents,
+    list_ready_documents,
+    update_document_status,
+)
+from app.services.document_parser import PageText, chunk_pages, count_words
+from app.services.embeddings import get_embedder
+from app.services.parse_cache import cache_path, chunk_cached, load_parsed, store_parsed
+from app.services.parse_pool import close_parser_pool, get_parser_pool, parse_pages_in_pool
+from app.services.retrieval import bump_index_generation, invalidate_document
+from app.services.uploads import file_sha256
+from app.services.vector_index import drop_vector_index, get_vector_index
+
+logger = logging.getLogger(__name__)
+
+_PROGRESS: dict[str, dict[str, Any]] = {}
+_PROGRESS_LOCK = threading.Lock()
+_PROGRESS_TTL_SEC = 60 * 60  # finished entries are dropped after an hour
+_HEADING_FORMATS = (".md", ".docx")  # parsed with Markdown headings, so they get a section tree
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is not None:
+        return _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max(1, get_settings().ingest_workers),
+                thread_name_prefix="ingest",
+            )
+    return _executor
+
+
+def _set_progress(doc_id: str, stage: str, progress: float, error: str | None = None) -> None:
+    with _PROGRESS_LOCK:
+        _PROGRESS[doc_id] = {
+            "stage": stage,
+            "progress": round(progress, 3),
+            "error": error,
+            "updated_at": time.monotonic(),
+        }
+
+
+def _prune_progress() -> None:
+    now = time.monotonic()
+    with _PROGRESS_LOCK:
+        stale = [
+            doc_id for doc_id, entry in _PROGRESS.items()
+            if entry["stage"] in ("ready", "failed") and now - entry["updated_at"] > _PROGRESS_TTL_SEC
+        ]
+        for doc_id in stale:
+            del _PROGRESS[doc_id]
+
+
+def get_ingestion_progress(doc_id: str) -> dict[str, Any] | None:
+    """Return {stage, progress, error} for a queued/running/recently finished ingestion, else None."""
+    with _PROGRESS_LOCK:
+        entry = _PROGRESS.get(doc_id)
+        if entry is None:
+            return None
+        return {k: v for k, v in entry.items() if k != "updated_at"}
+
+
+def _index_vectors(doc_id: str) -> None:
+    """Embed the document's chunks into its owner's dense index. Best effort: BM25 still works without it.
+
+    Afterwards drops cached retrieval results for the document, whose chunks just changed.
+    """
+    try:
+        rows = list_chunk_rows(doc_id)
+        if rows:
+            vectors = get_embedder().embed([r["chunk_text"] for r in rows])
+            get_vector_index(rows[0]["user_id"]).add([r["rowid"] for r in rows], vectors)
+    except Exception:
+        logger.exception("Vector indexing failed for document %s", doc_id)
+    finally:
+        invalidate_document(doc_id)
+
+
+def _cached_parse(storage_path: Path, content_hash: str | None) -> tuple[list[PageText], bool]:
+    """Non-empty (page, stripped text) of a stored upload from the parse cache, parsing and caching it on a
+    miss. Returns (pages, cache_hit)."""
+    ext = storage_path.suffix.lower()
+    content_hash = content_hash or file_sha256(storage_path)
+    pages = load_parsed(content_hash, ext)
+    if pages is not None:
+        return pages, True
+    pages = [(page, text.strip()) for page, text in parse_pages_in_pool(storage_path)]
+    pages = [(page, text) for page, text in pages if text]
+    try:
+        store_parsed(content_hash, ext, pages)
+    except OSError:
+        logger.exception("Could not cache parsed text of %s", storage_path)
+    return pages, False
+
+
+def ingest_document(doc_id: str, storage_path: Path, content_hash: str | None = None) -> None:
+    """Parse, chunk and index one stored upload, recording progress. Marks the document ready or failed.
+
+    If a ready document with the same content hash exists, its chunks are copied instead of parsing again;
+    otherwise the text comes from the parse cache when this content was parsed before.
+    """
+    try:
+        source = find_ready_document_by_hash(content_hash, exclude_doc_id=doc_id) if content_hash else None
+        if source is not None:
+            _set_progress(doc_id, "indexing", 0.7)
+            copy_document_chunks(source["id"], doc_id)
+            _index_vectors(doc_id)
+            update_document_status(doc_id, "ready", source["word_count"])
+            _set_progress(doc_id, "ready", 1.0)
+            logger.info("Document %s reused parsed content of %s", doc_id, source["id"])
+            return
+        _set_progress(doc_id, "parsing", 0.1)
+        pages, _ = _cached_parse(Path(storage_path), content_hash)
+        if not pages:
+            raise ValueError("No readable text extracted from document")
+        _set_progress(doc_id, "chunking", 0.5)
+        settings = get_settings()
+        chunked = chunk_pages(
+            pages, settings.chunk_tokens, settings.chunk_overlap_tokens,
+            headings=Path(storage_path).suffix.lower() in _HEADING_FORMATS,
+        )
+        del pages
+        _set_progress(doc_id, "indexing", 0.7)
+        insert_chunks(doc_id, chunked.chunks, replace=True, text=chunked.text, sections=chunked.sections)
+        _index_vectors(doc_id)
+        word_count = count_words(chunked.text)
+        update_document_status(doc_id, "ready", word_count, openviking_uri=None)
+        _set_progress(doc_id, "ready", 1.0)
+    except Exception as exc:
+        logger.exception("Ingestion failed for document %s", doc_id)
+        update_document_status(doc_id, "failed")
+        _set_progress(doc_id, "failed", 1.0, error=str(exc))
+
+
+def submit_ingestion(doc_id: str, storage_path: Path, content_hash: str | None = None) -> None:
+    """Queue a stored upload for background ingestion."""
+    _prune_progress()
+    _set_progress(doc_id, "queued", 0.0)
+    _get_executor().submit(ingest_document, doc_id, storage_path, content_hash)
+
+
+def resume_pending_ingestions() -> int:
+    """Re-queue documents left "processing" by a previous run (startup). Returns how many were queued."""
+    pending = list_processing_documents()
+    for doc in pending:
+        submit_ingestion(doc["id"], Path(doc["storage_path"]), doc["content_hash"])
+    if pending:
+        logger.info("Resumed ingestion for %d document(s)", len(pending))
+    return len(pending)
+
+
+def _reindex_one(doc: dict[str, Any]) -> str:
+    """Re-chunk and re-index one ready document from its cached parse. Returns "cached", "parsed" or "failed"."""
+    storage_path = Path(doc["storage_path"])
+    try:
+        content_hash = doc["content_hash"] or file_sha256(storage_path)
+        ext = storage_path.suffix.lower()
+        entry = cache_path(content_hash, ext)
+        outcome = "cached"
+        if not entry.exists():
+            _cached_parse(storage_path, content_hash)
+            outcome = "parsed"
+        settings = get_settings()
+        chunked = get_parser_pool().run(
+            chunk_cached, str(entry), settings.chunk_tokens, settings.chunk_overlap_tokens, ext in _HEADING_FORMATS,
+        )
+        insert_chunks(doc["id"], chunked.chunks, replace=True, text=chunked.text, sections=chunked.sections)
+        _index_vectors(doc["id"])
+        update_document_status(doc["id"], "ready", count_words(chunked.text))
+        return outcome
+    except Exception:
+        logger.exception("Re-indexing failed for document %s", doc["id"])
+        return "failed"
+
+
+def reindex_documents(doc_ids: list[str] | None = None, workers: int | None = None) -> dict[str, int]:
+    """Re-chunk and re-index ready documents (all, or doc_ids) with the current chunk settings, in parallel.
+
+    Text comes from the parse cache; only documents without an entry (older uploads, a new PARSER_VERSION)
+    are parsed again. Chunking runs in the parser pool's worker processes, `workers` documents at a time
+    (default: one per parse worker). A full run rebuilds each owner's dense index from scratch. The
+    backend should be stopped meanwhile: it keeps dense indexes and cached retrieval results in memory.
+    Returns counts of documents per outcome ("cached", "parsed", "failed").
+    """
+    docs = list_ready_documents(doc_ids)
+    if doc_ids is None:
+        for user_id in sorted({d["user_id"] for d in docs}):
+            drop_vector_index(user_id)
+    workers = workers or get_parser_pool().max_workers
+    counts = {"cached": 0, "parsed": 0, "failed": 0}
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="reindex") as pool:
+        for outcome in pool.map(_reindex_one, docs):
+            counts[outcome] += 1
+    bump_index_generation()
+    logger.info("Re-indexed %d document(s): %s", len(docs), counts)
+    return counts
+
+
+def shutdown_ingestion(wait: bool = True) -> None:
+    """Stop the worker pool (at shutdown). Queued documents stay "processing" in the DB."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait, cancel_futures=True)
+    close_parser_pool()
@@ -0,0 +1,76 @@
+"""On-disk cache of extracted document text, so re-chunking a document never re-parses it.
+
+Each entry is the parse_document_pages output of one stored upload, as gzip-compressed JSON
+([[page, text], ...]) at parse_cache_dir/<hash[:2]>/<sha256><ext>.v<PARSER_VERSION>.json.gz. Entries are
+keyed by content hash, so byte-identical uploads share one, and by PARSER_VERSION, so a parser change
+misses every older entry instead of serving stale text (prune_parse_cache deletes those).
+"""
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+from app.core.config import get_settings
+from app.services.document_parser import PARSER_VERSION, ChunkedDocument, PageText, chunk_pages
+
+logger = logging.getLogger(__name__)
+
+_SUFFIX = f".v{PARSER_VERSION}.json.gz"
+
+
+def cache_path(content_hash: str, ext: str, cache_dir: Path | None = None) -> Path:
+    root = Path(cache_dir or get_settings().parse_cache_dir)
+    return root / content_hash[:2] / f"{content_hash}{ext.lower()}{_SUFFIX}"
+
+
+def _read(path: Path) -> list[PageText]:
+    with gzip.open(path, "rt", encoding="utf-8") as fh:
+        return [(page, text) for page, text in json.load(fh)]
+
+
+def load_parsed(content_hash: str, ext: str) -> list[PageText] | None:
+    """Cached pages for the content hash and extension, or None on a miss (or an unreadable entry)."""
+    path = cache_path(content_hash, ext)
+    try:
+        return _read(path)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, EOFError):  # EOFError: truncated gzip
+        logger.warning("Ignoring unreadable parse cache entry %s", path)
+        return None
+
+
+def store_parsed(content_hash: str, ext: str, pages: list[PageText]) -> Path:
+    """Write pages to the cache (atomically: readers see the old entry, none, or the whole new one)."""
+    path = cache_path(content_hash, ext)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # A temp file per call: threads of one process may store the same hash at the same time.
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f"{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8", compresslevel=6) as fh:
+            json.dump([[page, text] for page, text in pages], fh, ensure_ascii=False)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    return path
+
+
+def chunk_cached(path: str, max_tokens: int, overlap_tokens: int, headings: bool) -> ChunkedDocument:
+    """Read a cache entry and chunk it; runs in a parser-pool worker so documents chunk in parallel."""
+    return chunk_pages(_read(Path(path)), max_tokens, overlap_tokens, headings=headings)
+
+
+def prune_parse_cache() -> int:
+    """Delete entries written by other parser versions. Returns how many were removed."""
+    root = Path(get_settings().parse_cache_dir)
+    removed = 0
+    for path in root.glob("*/*.json.gz"):
+        if not path.name.endswith(_SUFFIX):
+            path.unlink(missing_ok=True)
+            removed += 1
+    return removed
@@ -0,0 +1,230 @@
+"""Process pool for document parsing, with a per-document timeout and RSS cap.
+
+pypdf / python-docx extraction is CPU-bound and can blow up on pathological files, so it runs in
+separate worker processes. The parent watches each job: if it exceeds the wall-clock timeout or the
+worker's resident memory goes over the cap, that worker is killed (and replaced on next use) and the
+job raises, so the caller can mark the document failed. Workers are reused between documents.
+
+Large PDFs are split into page ranges that are extracted in parallel across the workers; per-page text
+is kept so chunks can record the page they start on.
+"""
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Connection
+from pathlib import Path
+from typing import Any, Callable
+
+from app.core.config import get_settings
+from app.services.document_parser import PageText, count_pdf_pages, parse_document_pages
+
+logger = logging.getLogger(__name__)
+
+_POLL_INTERVAL_SEC = 0.05
+# PDFs with fewer pages are extracted by a single worker; splitting costs a reopen of the file per range.
+_PARALLEL_MIN_PAGES = 32
+# spawn, not fork: the parent runs writer/ingestion threads that must not be duplicated mid-lock.
+_MP_CONTEXT = multiprocessing.get_context("spawn")
+
+
+class ParseTimeoutError(TimeoutError):
+    """Parsing a document took longer than the configured timeout."""
+
+
+class ParseMemoryError(MemoryError):
+    """The parse worker's resident memory went over the configured cap."""
+
+
+class ParseWorkerError(RuntimeError):
+    """The parse worker died or the parser raised inside it."""
+
+
+def _worker_main(conn: Connection) -> None:
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            return
+        if job is None:
+            return
+        fn, args = job
+        try:
+            result = ("ok", fn(*args))
+        except Exception as exc:
+            result = ("error", f"{type(exc).__name__}: {exc}")
+        conn.send(result)
+
+
+def _rss_bytes(pid: int) -> int | None:
+    """Resident set size of pid from /proc (Linux); None where unavailable."""
+    try:
+        with open(f"/proc/{pid}/statm", "rb") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class _Worker:
+    def __init__(self) -> None:
+        self.conn, child_conn = _MP_CONTEXT.Pipe()
+        self.process = _MP_CONTEXT.Process(target=_worker_main, args=(child_conn,), name="parse-worker", daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join(1.0)
+        self.conn.close()
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(1.0)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join(1.0)
+        self.conn.close()
+
+
+class ParserPool:
+    """Bounded pool of parse worker processes; callers beyond max_workers wait for a free worker."""
+
+    def __init__(self, max_workers: int, timeout_sec: float, max_rss_bytes: int | None) -> None:
+        self.max_workers = max(1, max_workers)
+        self.timeout_sec = timeout_sec
+        self.max_rss_bytes = max_rss_bytes
+        self._idle: queue.LifoQueue[_Worker] = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.max_workers)
+        self._closed = False
+
+    def run(self, fn: Callable[..., Any], *args: Any, deadline: float | None = None) -> Any:
+        """Run module-level fn(*args) in a worker process.
+
+        deadline is a time.monotonic() instant that also bounds the wait for a free worker; without
+        one the job gets the pool's timeout_sec from when it starts. Raises ParseTimeoutError /
+        ParseMemoryError, or ParseWorkerError if fn raised or the worker died.
+        """
+        if self._closed:
+            raise RuntimeError("Parser pool is closed")
+        if deadline is None:
+            self._slots.acquire()
+        elif not self._slots.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            raise ParseTimeoutError("Parsing ran past its deadline while waiting for a free worker")
+        try:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                worker = _Worker()
+            if deadline is None:
+                deadline = time.monotonic() + self.timeout_sec
+            try:
+                result = self._run(worker, fn, args, deadline)
+            except BaseException:
+                worker.kill()
+                raise
+            if self._closed:
+                worker.stop()
+            else:
+                self._idle.put(worker)
+        finally:
+            self._slots.release()
+        status, value = result
+        if status == "error":
+            raise ParseWorkerError(value)
+        return value
+
+    def _run(self, worker: _Worker, fn: Callable[..., Any], args: tuple, deadline: float) -> tuple[str, Any]:
+        worker.conn.send((fn, args))
+        while not worker.conn.poll(_POLL_INTERVAL_SEC):
+            if not worker.process.is_alive():
+                raise ParseWorkerError(f"Parse worker exited with code {worker.process.exitcode}")
+            if time.monotonic() > deadline:
+                raise ParseTimeoutError("Parsing ran past its deadline")
+            if self.max_rss_bytes is not None:
+                rss = _rss_bytes(worker.process.pid)
+                if rss is not None and rss > self.max_rss_bytes:
+                    raise ParseMemoryError(
+                        f"Parsing exceeded memory limit ({rss // (1024 * 1024)} MiB > "
+                        f"{self.max_rss_bytes // (1024 * 1024)} MiB)"
+                    )
+        try:
+            return worker.conn.recv()
+        except (EOFError, OSError) as exc:
+            raise ParseWorkerError("Parse worker exited before returning a result") from exc
+
+    def close(self) -> None:
+        """Stop idle workers; workers busy with a job are stopped when it finishes."""
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            worker.stop()
+
+
+_POOL: ParserPool | None = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_parser_pool() -> ParserPool:
+    """Return the shared parser pool, created from settings on first use."""
+    global _POOL
+    if _POOL is not None:
+        return _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            settings = get_settings()
+            max_rss_mb = settings.parse_max_rss_mb
+            _POOL = ParserPool(
+                max_workers=settings.parse_workers or os.cpu_count() or 1,
+                timeout_sec=settings.parse_timeout_sec,
+                max_rss_bytes=max_rss_mb * 1024 * 1024 if max_rss_mb > 0 else None,
+            )
+    return _POOL
+
+
+def _page_ranges(page_count: int, parts: int) -> list[tuple[int, int]]:
+    size = -(-page_count // parts)
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+
+def parse_pages_in_pool(path: Path, pool: ParserPool | None = None) -> list[PageText]:
+    """Extract a stored upload's text per page in the process pool (default: the shared one).
+
+    PDFs of at least _PARALLEL_MIN_PAGES pages are split into one contiguous page range per worker and
+    extracted in parallel; the whole document shares one wall-clock budget (parse_timeout_sec).
+    """
+    pool = pool or get_parser_pool()
+    # One deadline for the whole document, counted from now: queueing for a worker and every page
+    # range spend from the same budget.
+    deadline = time.monotonic() + pool.timeout_sec
+    if path.suffix.lower() != ".pdf" or pool.max_workers == 1:
+        return pool.run(parse_document_pages, path, deadline=deadline)
+    page_count = pool.run(count_pdf_pages, path, deadline=deadline)
+    if page_count < _PARALLEL_MIN_PAGES:
+        return pool.run(parse_document_pages, path, deadline=deadline)
+    ranges = _page_ranges(page_count, pool.max_workers)
+    with ThreadPoolExecutor(max_workers=len(ranges), thread_name_prefix="parse-range") as dispatch:
+        futures = [
+            dispatch.submit(pool.run, parse_document_pages, path, page_range, deadline=deadline)
+            for page_range in ranges
+        ]
+        return [page for future in futures for page in future.result()]
+
+
+def close_parser_pool() -> None:
+    """Stop the shared parser pool's workers (shutdown, tests)."""
+    global _POOL
+    with _POOL_LOCK:
+        pool, _POOL = _POOL, None
+    if pool is not None:
+        pool.close()
@@ -0,0 +1,111 @@
+"""Token-budgeted prompt assembly for chat turns.
+
+A prompt is built from segments, each measured with app.services.tokens.estimate_tokens:
+
+- system: the reply instructions, always included, plus prefix_tokens for a system prompt sent separately
+- message: the user's question, always included
+- context: attachment and retrieved chunk blocks, in rank order; a block that does not fit is skipped
+  and smaller lower-ranked blocks may still be packed
+- history: conversation turns, newest first; packing stops at the first turn that does not fit, so the
+  kept turns are always the most recent ones
+
+Segments are packed in that priority order into the budget and rendered in reading order (history,
+context, question, instructions). A segment's usage includes its label, and whitespace between
+blocks is free, so the usages add up to the estimate of the whole prompt plus prefix_tokens.
+"""
+from __future__ import annotations
+
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+
+from app.services.tokens import estimate_tokens
+
+SEGMENTS = ("system", "message", "context", "history")
+
+_HISTORY_LABEL = "Recent conversation history:"
+_MESSAGE_LABEL = "User question:"
+
+
+@dataclass(slots=True)
+class BuiltPrompt:
+    """The assembled prompt with estimated tokens used per segment and blocks dropped per segment."""
+
+    text: str
+    budget: int
+    usage: dict[str, int] = field(default_factory=lambda: dict.fromkeys(SEGMENTS, 0))
+    dropped: dict[str, int] = field(default_factory=lambda: dict.fromkeys(SEGMENTS, 0))
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(self.usage.values())
+
+
+def _history_line(item: dict[str, str]) -> str:
+    role = str(item.get("role", "user") or "user")
+    content = str(item.get("content", "") or "").strip()
+    return f"[{role}] {content}" if content else ""
+
+
+def build_prompt(
+    message: str,
+    instructions: str,
+    *,
+    budget: int,
+    context: Sequence[str] = (),
+    history: Sequence[dict[str, str]] = (),
+    prefix_tokens: int = 0,
+    context_label: str = "Context:",
+) -> BuiltPrompt:
+    """Pack the segments of one turn's prompt into budget estimated tokens (0 or less: no limit).
+
+    The message and instructions are always kept, even past the budget. prefix_tokens counts a stable
+    system prompt sent ahead of this text (e.g. the agent's tools and skills) against the budget.
+    """
+    usage = dict.fromkeys(SEGMENTS, 0)
+    dropped = dict.fromkeys(SEGMENTS, 0)
+    usage["system"] = prefix_tokens + estimate_tokens(instructions)
+    usage["message"] = estimate_tokens(_MESSAGE_LABEL) + estimate_tokens(message)
+    remaining = budget - usage["system"] - usage["message"] if budget > 0 else None
+
+    def fits(tokens: int) -> bool:
+        return remaining is None or tokens <= remaining
+
+    def take(segment: str, tokens: int) -> None:
+        nonlocal remaining
+        usage[segment] += tokens
+        if remaining is not None:
+            remaining -= tokens
+
+    context_blocks: list[str] = []
+    label_tokens = estimate_tokens(context_label)
+    for block in context:
+        if not (block or "").strip():
+            continue
+        tokens = estimate_tokens(block) + (0 if context_blocks else label_tokens)
+        if fits(tokens):
+            context_blocks.append(block)
+            take("context", tokens)
+        else:
+            dropped["context"] += 1
+
+    history_lines: list[str] = []
+    lines = [line for line in map(_history_line, history) if line]
+    label_tokens = estimate_tokens(_HISTORY_LABEL)
+    for i in range(len(lines) - 1, -1, -1):
+        tokens = estimate_tokens(lines[i]) + (0 if history_lines else label_tokens)
+        if not fits(tokens):
+            dropped["history"] = i + 1
+            break
+        history_lines.append(lines[i])
+        take("history", tokens)
+    history_lines.reverse()
+
+    parts: list[str] = []
+    if history_lines:
+        parts.append(_HISTORY_LABEL + "\n" + "\n".join(history_lines))
+    if context_blocks:
+        parts.append(context_label + "\n" + "\n\n".join(context_blocks))
+    parts.append(f"{_MESSAGE_LABEL}\n{message}")
+    if instructions:
+        parts.append(instructions)
+    return BuiltPrompt(text="\n\n".join(parts), budget=budget, usage=usage, dropped=dropped)
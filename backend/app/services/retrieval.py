@@ -0,0 +1,310 @@
+"""Chunk retrieval for chat context: BM25-ranked full-text search over document_chunks_fts.
+
+A chat message becomes an OR query of its distinct terms; matches are scoped to one document (the
+attachment) or to every document in a subject, ranked with FTS5's bm25(), and the top-k chunks are
+packed into context blocks for the prompt. A section (heading path) narrows the scope further. semantic_search ranks the same scope by embedding
+similarity using the per-user dense index (app.services.vector_index).
+
+hybrid_search runs both concurrently and fuses them with reciprocal-rank fusion; its results are cached
+(app.services.retrieval_cache) until a document in scope is re-ingested or moved between subjects.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+
+from app.core.config import get_settings
+from app.db.fts import query_terms
+from app.db.session import pooled_connection
+from app.services.document_parser import SECTION_PATH_SEP
+from app.services.embeddings import get_embedder
+from app.services.retrieval_cache import RetrievalCache, normalize_query
+from app.services.vector_index import get_vector_index
+
+logger = logging.getLogger(__name__)
+
+_MAX_QUERY_TERMS = 24
+# Very common English words that would match nearly every chunk and only slow the OR query down.
+_STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from had has have how i in is it its me my of on or "
+    "so that the their them then there these they this to was we were what when where which who why "
+    "will with you your".split()
+)
+
+_SEARCH_SQL = """
+SELECT c.rowid AS rowid, c.doc_id, c.chunk_index, c.page, c.section, c.chunk_text, d.title,
+       bm25(document_chunks_fts) AS score
+FROM document_chunks_fts
+JOIN document_chunk_texts c ON c.rowid = document_chunks_fts.rowid
+JOIN documents d ON d.id = c.doc_id
+WHERE document_chunks_fts MATCH ? AND d.user_id = ? {scope}
+ORDER BY score
+LIMIT ?
+"""
+
+
+@dataclass(slots=True)
+class RetrievedChunk:
+    rowid: int
+    doc_id: str
+    chunk_index: int
+    page: int | None
+    section: str | None
+    text: str
+    title: str
+    score: float  # lower is better: bm25() for keyword search, negated cosine similarity for semantic
+
+
+@dataclass(slots=True)
+class RetrievalResult:
+    query: str
+    chunks: list[RetrievedChunk] = field(default_factory=list)
+    latency_ms: float = 0.0
+    cached: bool = False
+
+
+def build_match_query(text: str) -> str | None:
+    """FTS5 MATCH expression OR-ing the distinct terms of text (each quoted), or None if it has none.
+
+    Terms come from app.db.fts.query_terms, so CJK text is split the same way chunks were indexed.
+    """
+    terms: list[str] = []
+    seen: set[str] = set()
+    for term in query_terms(text):
+        if term in seen or term in _STOPWORDS or (len(term) < 2 and term.isascii()):
+            continue
+        seen.add(term)
+        terms.append(f'"{term}"')
+        if len(terms) >= _MAX_QUERY_TERMS:
+            break
+    return " OR ".join(terms) if terms else None
+
+
+def _scope_clause(doc_id: str | None, subject_id: str | None, section: str | None) -> tuple[str, list[str]]:
+    """SQL conditions (on chunks c, documents d) and parameters for a doc_id / subject_id scope.
+
+    section narrows to chunks under that heading path, subsections included.
+    """
+    clauses: list[str] = []
+    params: list[str] = []
+    if doc_id:
+        clauses.append("AND c.doc_id = ?")
+        params.append(doc_id)
+    elif subject_id:
+        clauses.append("AND d.subject_id = ?")
+        params.append(subject_id)
+    if section:
+        escaped = section.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        clauses.append("AND (c.section = ? OR c.section LIKE ? ESCAPE '\\')")
+        params.extend([section, escaped + SECTION_PATH_SEP + "%"])
+    return " ".join(clauses), params
+
+
+def search_chunks(
+    query: str,
+    user_id: str,
+    *,
+    doc_id: str | None = None,
+    subject_id: str | None = None,
+    section: str | None = None,
+    limit: int | None = None,
+) -> RetrievalResult:
+    """Top-`limit` chunks for query within doc_id (if given) or subject_id and section, best first, with latency."""
+    started = time.perf_counter()
+    result = RetrievalResult(query=query)
+    match = build_match_query(query)
+    if match is not None:
+        scope, scope_params = _scope_clause(doc_id, subject_id, section)
+        params: list = [match, user_id, *scope_params, limit or get_settings().retrieval_top_k]
+        with pooled_connection() as conn:
+            rows = conn.execute(_SEARCH_SQL.format(scope=scope), params).fetchall()
+        result.chunks = [
+            RetrievedChunk(
+                rowid=r["rowid"], doc_id=r["doc_id"], chunk_index=r["chunk_index"], page=r["page"],
+                section=r["section"], text=r["chunk_text"], title=r["title"], score=r["score"],
+            )
+            for r in rows
+        ]
+    result.latency_ms = (time.perf_counter() - started) * 1000
+    logger.debug("Retrieved %d chunk(s) in %.1f ms for %r", len(result.chunks), result.latency_ms, query[:80])
+    return result
+
+
+_SCOPE_ROWIDS_SQL = """
+SELECT c.rowid AS rowid FROM document_chunks c JOIN documents d ON d.id = c.doc_id
+WHERE d.user_id = ? {scope}
+"""
+
+_CHUNKS_BY_ROWID_SQL = """
+SELECT c.rowid AS rowid, c.doc_id, c.chunk_index, c.page, c.section, c.chunk_text, d.title
+FROM document_chunk_texts c JOIN documents d ON d.id = c.doc_id
+WHERE c.rowid IN ({marks})
+"""
+
+
+def semantic_search(
+    query: str,
+    user_id: str,
+    *,
+    doc_id: str | None = None,
+    subject_id: str | None = None,
+    section: str | None = None,
+    limit: int | None = None,
+) -> RetrievalResult:
+    """Top-`limit` chunks by embedding similarity within doc_id / subject_id (else all the user's chunks) and section."""
+    started = time.perf_counter()
+    result = RetrievalResult(query=query)
+    scope, scope_params = _scope_clause(doc_id, subject_id, section)
+    params = [user_id, *scope_params]
+    with pooled_connection() as conn:
+        candidates = [r["rowid"] for r in conn.execute(_SCOPE_ROWIDS_SQL.format(scope=scope), params).fetchall()]
+    if candidates and query.strip():
+        query_vec = get_embedder().embed([query])[0]
+        hits = get_vector_index(user_id).search(query_vec, limit or get_settings().retrieval_top_k, candidates)
+        hits = [(rowid, similarity) for rowid, similarity in hits if similarity > 0]  # no shared features
+        if hits:
+            with pooled_connection() as conn:
+                rows = conn.execute(
+                    _CHUNKS_BY_ROWID_SQL.format(marks=",".join("?" * len(hits))), [rowid for rowid, _ in hits]
+                ).fetchall()
+            by_rowid = {r["rowid"]: r for r in rows}
+            result.chunks = [
+                RetrievedChunk(
+                    rowid=rowid, doc_id=r["doc_id"], chunk_index=r["chunk_index"], page=r["page"],
+                    section=r["section"], text=r["chunk_text"], title=r["title"], score=-similarity,
+                )
+                for rowid, similarity in hits
+                if (r := by_rowid.get(rowid)) is not None
+            ]
+    result.latency_ms = (time.perf_counter() - started) * 1000
+    logger.debug("Semantic search found %d chunk(s) in %.1f ms for %r", len(result.chunks), result.latency_ms, query[:80])
+    return result
+
+
+_RRF_K = 60  # standard reciprocal-rank-fusion damping constant
+_FUSION_DEPTH = 4  # each retriever contributes up to k * _FUSION_DEPTH candidates
+
+_cache: RetrievalCache | None = None
+_executor: ThreadPoolExecutor | None = None
+_state_lock = threading.Lock()
+_index_generation = 0  # bumped by a full re-index; part of every cache key
+
+
+def _get_cache() -> RetrievalCache:
+    global _cache
+    if _cache is None:
+        with _state_lock:
+            if _cache is None:
+                _cache = RetrievalCache(get_settings().retrieval_cache_size)
+    return _cache
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _state_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="retrieval")
+    return _executor
+
+
+def _scope_deps(user_id: str, doc_id: str | None, subject_id: str | None) -> list[str]:
+    if doc_id:
+        return [f"doc:{doc_id}"]
+    if not subject_id:
+        return ["all"]
+    with pooled_connection() as conn:
+        rows = conn.execute(
+            "SELECT id FROM documents WHERE user_id = ? AND subject_id = ?", (user_id, subject_id)
+        ).fetchall()
+    return [f"subject:{subject_id}", *(f"doc:{r['id']}" for r in rows)]
+
+
+def reciprocal_rank_fusion(rankings: list[list[RetrievedChunk]], k: int) -> list[RetrievedChunk]:
+    """Fuse best-first rankings by summed 1 / (_RRF_K + rank); returned scores are the negated fused score."""
+    fused: dict[int, float] = {}
+    chunks: dict[int, RetrievedChunk] = {}
+    for ranking in rankings:
+        for rank, chunk in enumerate(ranking, start=1):
+            fused[chunk.rowid] = fused.get(chunk.rowid, 0.0) + 1.0 / (_RRF_K + rank)
+            chunks.setdefault(chunk.rowid, chunk)
+    best = sorted(fused, key=lambda rowid: -fused[rowid])[:k]
+    return [replace(chunks[rowid], score=-fused[rowid]) for rowid in best]
+
+
+def hybrid_search(
+    query: str,
+    user_id: str,
+    *,
+    doc_id: str | None = None,
+    subject_id: str | None = None,
+    section: str | None = None,
+    limit: int | None = None,
+) -> RetrievalResult:
+    """Keyword (BM25) and semantic search run concurrently, fused with RRF, served from the LRU when possible.
+
+    section (a heading path) narrows the scope before either retriever scores anything.
+    """
+    started = time.perf_counter()
+    k = limit or get_settings().retrieval_top_k
+    scope = ("doc", doc_id) if doc_id else ("subject", subject_id) if subject_id else ("user", None)
+    scope += (section,)
+    key = (normalize_query(query), user_id, scope, k, f"{get_embedder().name}:{_index_generation}")
+    cache = _get_cache()
+    hit = cache.get(key)
+    if hit is not None:
+        return replace(hit, query=query, latency_ms=(time.perf_counter() - started) * 1000, cached=True)
+    # Taken before the scope and both searches are read: an invalidation landing mid-search skips the put.
+    since = cache.mark()
+    deps = _scope_deps(user_id, doc_id, subject_id)
+    depth = k * _FUSION_DEPTH
+    executor = _get_executor()
+    scope_kwargs = {"doc_id": doc_id, "subject_id": subject_id, "section": section}
+    keyword = executor.submit(search_chunks, query, user_id, **scope_kwargs, limit=depth)
+    semantic = executor.submit(semantic_search, query, user_id, **scope_kwargs, limit=depth)
+    rankings = [keyword.result().chunks]
+    try:
+        rankings.append(semantic.result().chunks)
+    except Exception:
+        logger.exception("Semantic search failed; using keyword results only")
+    result = RetrievalResult(query=query, chunks=reciprocal_rank_fusion(rankings, k))
+    result.latency_ms = (time.perf_counter() - started) * 1000
+    cache.put(key, result, deps, since=since)
+    return result
+
+
+def invalidate_document(doc_id: str, subject_id: str | None = None) -> int:
+    """Drop cached results that depend on doc_id (re-ingest) and, if given, on subject_id (doc moved into it)."""
+    deps = [f"doc:{doc_id}", "all"]
+    if subject_id:
+        deps.append(f"subject:{subject_id}")
+    return _get_cache().invalidate(*deps)
+
+
+def bump_index_generation() -> None:
+    """Invalidate every cached result (after a full re-index)."""
+    global _index_generation
+    with _state_lock:
+        _index_generation += 1
+    _get_cache().clear()
+
+
+def reset_retrieval_cache() -> None:
+    """Forget the cache (tests, settings changes)."""
+    global _cache
+    with _state_lock:
+        _cache = None
+
+
+def format_snippets(chunks: list[RetrievedChunk], max_chars: int | None = None) -> list[str]:
+    """One context block per chunk: a source line then the chunk text, trimmed to max_chars."""
+    max_chars = max_chars or get_settings().retrieval_snippet_chars
+    blocks: list[str] = []
+    for chunk in chunks:
+        source = chunk.title + (f", p. {chunk.page}" if chunk.page else "") + (f", {chunk.section}" if chunk.section else "")
+        text = chunk.text if len(chunk.text) <= max_chars else chunk.text[:max_chars].rsplit(" ", 1)[0] + " …"
+        blocks.append(f"Relevant passage ({source}):\n{text}")
+    return blocks
@@ -0,0 +1,105 @@
+"""LRU cache for chunk retrieval results with dependency-based invalidation.
+
+Entries are keyed by (normalized query, scope, k, index version) and tagged with the dependencies they
+were computed from: "doc:<id>" for every document in scope, "subject:<id>" for a subject scope, and "all"
+for unscoped searches. Re-ingesting a document drops only the entries that depend on it.
+
+A result computed while one of its dependencies is invalidated may already be stale, so callers take a
+mark() before computing and pass it to put(); the put is skipped if any of the entry's dependencies (or
+the whole cache) was invalidated since.
+"""
+from __future__ import annotations
+
+import re
+import threading
+from collections import OrderedDict
+from collections.abc import Hashable, Iterable
+from typing import Any
+
+_SPACE_RE = re.compile(r"\s+")
+_EDGE_PUNCT = " \t\n?!.,;:\"'()[]{}"
+
+
+def normalize_query(query: str) -> str:
+    """Case-fold, collapse whitespace and trim surrounding punctuation so trivial variants share entries."""
+    return _SPACE_RE.sub(" ", query.casefold()).strip(_EDGE_PUNCT)
+
+
+class RetrievalCache:
+    """Thread-safe LRU of retrieval results."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max(0, max_entries)
+        self._entries: OrderedDict[Hashable, tuple[Any, frozenset[str]]] = OrderedDict()
+        self._by_dep: dict[str, set[Hashable]] = {}
+        self._lock = threading.Lock()
+        self._tick = 0  # bumped by every invalidate() and clear()
+        self._changed_at: dict[str, int] = {}  # dep -> tick of its last invalidation
+        self._cleared_at = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def mark(self) -> int:
+        """The current invalidation tick, to pass to put() as since for a result computed after this call."""
+        with self._lock:
+            return self._tick
+
+    def put(self, key: Hashable, value: Any, deps: Iterable[str], since: int | None = None) -> bool:
+        """Store value unless a dependency was invalidated after mark() returned since. Returns whether it was stored."""
+        if not self.max_entries:
+            return False
+        deps = frozenset(deps)
+        with self._lock:
+            if since is not None and (
+                self._cleared_at > since or any(self._changed_at.get(dep, 0) > since for dep in deps)
+            ):
+                return False
+            self._remove(key)
+            self._entries[key] = (value, deps)
+            for dep in deps:
+                self._by_dep.setdefault(dep, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+            return True
+
+    def invalidate(self, *deps: str) -> int:
+        """Drop every entry depending on any of deps. Returns how many were dropped."""
+        with self._lock:
+            self._tick += 1
+            for dep in deps:
+                self._changed_at[dep] = self._tick
+            keys = set().union(*(self._by_dep.get(dep, ()) for dep in deps)) if deps else set()
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tick += 1
+            self._cleared_at = self._tick
+            self._entries.clear()
+            self._by_dep.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for dep in entry[1]:
+            keys = self._by_dep.get(dep)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_dep[dep]
@@ -0,0 +1,26 @@
+"""Approximate token counts, shared by the chunker and the chat prompt builder.
+
+No model tokenizer is loaded. Each CJK character (kana, ideograph, hangul) counts as one token, and any
+other run of non-space characters counts about one token per four characters (at least one), which is
+close to BPE tokenizers' averages for Chinese and English text. Whitespace is free, so the estimate of a
+text equals the sum of the estimates of its whitespace-separated pieces and can be accumulated piecewise.
+"""
+from __future__ import annotations
+
+import re
+
+from app.db.fts import CJK_CHARS
+
+_PIECE_RE = re.compile(f"[{CJK_CHARS}]|[^\\s{CJK_CHARS}]+")
+_CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str | None) -> int:
+    """Approximate model tokens in text."""
+    if not text:
+        return 0
+    tokens = 0
+    for match in _PIECE_RE.finditer(text):
+        length = match.end() - match.start()
+        tokens += max(1, (length + _CHARS_PER_TOKEN // 2) // _CHARS_PER_TOKEN)
+    return tokens
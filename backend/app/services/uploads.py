@@ -0,0 +1,69 @@
+"""Upload spooling: stream an UploadFile to disk in fixed-size blocks.
+
+Only one block is held in memory per upload. Size and SHA-256 are computed while writing, and the size
+limit is enforced mid-stream so an oversized upload is cut off without being read in full. Stored files
+are then content-addressed (<sha256><ext>), so byte-identical uploads share one file on disk.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+from fastapi import UploadFile
+
+UPLOAD_BLOCK_SIZE = 1024 * 1024  # 1 MiB
+
+
+class UploadTooLargeError(ValueError):
+    """The upload went over max_upload_bytes while being spooled."""
+
+
+@dataclass(slots=True)
+class StoredUpload:
+    path: Path
+    size_bytes: int
+    content_hash: str  # hex SHA-256 of the file bytes
+
+
+async def spool_upload(file: UploadFile, dest: Path, max_bytes: int) -> StoredUpload:
+    """Write file to dest block by block. On any error (including UploadTooLargeError) nothing is left at dest."""
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    part = dest.with_name(dest.name + ".part")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(part, "wb") as fh:
+            while block := await file.read(UPLOAD_BLOCK_SIZE):
+                size += len(block)
+                if size > max_bytes:
+                    raise UploadTooLargeError(f"File exceeds max upload size ({max_bytes} bytes)")
+                digest.update(block)
+                await asyncio.to_thread(fh.write, block)
+        os.replace(part, dest)
+    except BaseException:
+        part.unlink(missing_ok=True)
+        raise
+    return StoredUpload(path=dest, size_bytes=size, content_hash=digest.hexdigest())
+
+
+def store_content_addressed(stored: StoredUpload) -> StoredUpload:
+    """Move a spooled upload to <content_hash><ext> in its directory, or drop it if that blob already exists."""
+    blob = stored.path.with_name(stored.content_hash + stored.path.suffix.lower())
+    if blob != stored.path:
+        if blob.exists():
+            stored.path.unlink(missing_ok=True)
+        else:
+            os.replace(stored.path, blob)
+    return StoredUpload(path=blob, size_bytes=stored.size_bytes, content_hash=stored.content_hash)
+
+
+def file_sha256(path: Path) -> str:
+    """Hex SHA-256 of a stored file, read block by block (for documents stored without a content hash)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        while block := fh.read(UPLOAD_BLOCK_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
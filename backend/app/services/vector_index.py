@@ -0,0 +1,259 @@
+"""Per-user dense chunk index: append-only, memory-mapped embedding matrix keyed by document_chunks.rowid.
+
+Layout under vector_index_dir/<user>/:
+- vectors.bin: row-major float16/float32 embeddings, one row per appended chunk
+- rowids.bin:  int64 document_chunks.rowid for each row
+- lists.bin:   int32 IVF list of each row (only once the IVF quantizer is trained)
+- ivf.npy:     IVF centroids
+- meta.json:   dim, dtype, embedder name and the committed row count
+
+Rows are only ever appended; meta.json's count is written after the data, so rows past it (a crash
+mid-append) are ignored and overwritten. When a rowid is appended again the newest row wins, and rows of
+deleted chunks drop out because searches are restricted to live candidate rowids from the database (or
+filtered against it). Search is a blockwise NumPy dot product plus argpartition top-k. Once an index
+passes vector_ivf_min_rows, a k-means coarse quantizer is trained and searches scan only the nprobe
+nearest lists.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_BLOCK_ROWS = 65_536  # rows converted to float32 per matmul block
+_KMEANS_ITERS = 10
+_KMEANS_SAMPLE = 50_000
+
+
+class VectorIndex:
+    """Dense index for one user. Thread-safe; one instance per directory (see get_vector_index)."""
+
+    def __init__(self, path: Path, dim: int, dtype: str, embedder_name: str) -> None:
+        self.path = path
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.embedder_name = embedder_name
+        self._lock = threading.RLock()
+        self._count = 0
+        self._vectors: np.ndarray | None = None
+        self._rowids: np.ndarray | None = None
+        self._lists: np.ndarray | None = None
+        self._centroids: np.ndarray | None = None
+        self._ivf_trained_at = 0
+        self._latest: tuple[int, np.ndarray] | None = None  # (count, newest-row mask) cache
+        self._open()
+
+    # -- storage ---------------------------------------------------------------------------------------
+
+    def _file(self, name: str) -> Path:
+        return self.path / name
+
+    def _open(self) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        meta_path = self._file("meta.json")
+        if meta_path.exists():
+            meta = json.loads(meta_path.read_text())
+            if (meta.get("dim"), meta.get("dtype"), meta.get("embedder")) != (self.dim, self.dtype.name, self.embedder_name):
+                logger.warning("Vector index %s was built with %s; rebuilding empty", self.path, meta)
+                self._reset_files()
+            else:
+                self._count = int(meta.get("count", 0))
+                self._ivf_trained_at = int(meta.get("ivf_trained_at", 0))
+        if self._ivf_trained_at and self._file("ivf.npy").exists():
+            self._centroids = np.load(self._file("ivf.npy"))
+        else:
+            self._ivf_trained_at = 0
+        self._remap()
+
+    def _reset_files(self) -> None:
+        for name in ("vectors.bin", "rowids.bin", "lists.bin", "ivf.npy", "meta.json"):
+            self._file(name).unlink(missing_ok=True)
+        self._count = 0
+        self._ivf_trained_at = 0
+        self._centroids = None
+
+    def _write_meta(self) -> None:
+        tmp = self._file("meta.json.tmp")
+        tmp.write_text(json.dumps({
+            "dim": self.dim,
+            "dtype": self.dtype.name,
+            "embedder": self.embedder_name,
+            "count": self._count,
+            "ivf_trained_at": self._ivf_trained_at,
+        }))
+        os.replace(tmp, self._file("meta.json"))
+
+    def _map(self, name: str, dtype: np.dtype, shape: tuple[int, ...]) -> np.ndarray | None:
+        if not shape[0]:
+            return None
+        return np.memmap(self._file(name), dtype=dtype, mode="r", shape=shape)
+
+    def _remap(self) -> None:
+        n = self._count
+        self._vectors = self._map("vectors.bin", self.dtype, (n, self.dim))
+        self._rowids = self._map("rowids.bin", np.dtype(np.int64), (n,))
+        self._lists = self._map("lists.bin", np.dtype(np.int32), (n,)) if self._centroids is not None else None
+
+    def _append(self, name: str, data: np.ndarray, itemsize: int) -> None:
+        with open(self._file(name), "r+b" if self._file(name).exists() else "wb") as fh:
+            fh.seek(self._count * itemsize)
+            fh.truncate()
+            fh.write(data.tobytes())
+            fh.flush()
+            os.fsync(fh.fileno())
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, rowids: list[int] | np.ndarray, vectors: np.ndarray) -> None:
+        """Append embeddings for chunk rowids (vectors: (n, dim), L2-normalized)."""
+        ids = np.asarray(rowids, dtype=np.int64)
+        vecs = np.asarray(vectors, dtype=np.float32).reshape(len(ids), self.dim)
+        if not len(ids):
+            return
+        with self._lock:
+            self._append("vectors.bin", vecs.astype(self.dtype), self.dtype.itemsize * self.dim)
+            self._append("rowids.bin", ids, 8)
+            if self._centroids is not None:
+                self._append("lists.bin", self._assign(vecs), 4)
+            self._count += len(ids)
+            self._write_meta()
+            settings = get_settings()
+            if self._count >= settings.vector_ivf_min_rows and self._count >= 2 * self._ivf_trained_at:
+                self._train_ivf()
+            self._remap()
+
+    # -- IVF -------------------------------------------------------------------------------------------
+
+    def _assign(self, vecs: np.ndarray) -> np.ndarray:
+        return np.argmax(vecs @ self._centroids.T, axis=1).astype(np.int32)
+
+    def _replace_file(self, name: str, write) -> None:
+        """Write name to a temporary file and atomically move it into place."""
+        tmp = self._file(name + ".tmp")
+        with open(tmp, "wb") as fh:
+            write(fh)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, self._file(name))
+
+    def _train_ivf(self) -> None:
+        """(Re)train the k-means coarse quantizer (spherical, sqrt(n) lists) and reassign every row.
+
+        Called with self._lock held, so searches pick up the new centroids and lists together.
+        """
+        self._remap()
+        n = self._count
+        nlist = max(1, int(np.sqrt(n)))
+        rng = np.random.default_rng(0)
+        sample = self._vectors[np.sort(rng.choice(n, size=min(n, _KMEANS_SAMPLE), replace=False))].astype(np.float32)
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+        for _ in range(_KMEANS_ITERS):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            filled = norms[:, 0] > 0
+            centroids[filled] = sums[filled] / norms[filled]
+        self._centroids = centroids
+        lists = np.concatenate([
+            self._assign(self._vectors[start:start + _BLOCK_ROWS].astype(np.float32))
+            for start in range(0, n, _BLOCK_ROWS)
+        ])
+        # Searches may still be reading the old lists.bin through a memmap taken before this retrain, so
+        # new files replace the old ones (old mappings keep the old inode) instead of being rewritten.
+        self._replace_file("lists.bin", lists.tofile)
+        self._replace_file("ivf.npy", lambda fh: np.save(fh, centroids))
+        self._ivf_trained_at = n
+        self._write_meta()
+        self._remap()
+        logger.info("Trained IVF quantizer for %s: %d rows, %d lists", self.path, n, nlist)
+
+    # -- search ----------------------------------------------------------------------------------------
+
+    def _latest_rows(self, rowids: np.ndarray) -> np.ndarray:
+        """Boolean mask keeping only the newest row for each rowid (cached per row count)."""
+        cached = self._latest
+        if cached is not None and cached[0] == len(rowids):
+            return cached[1].copy()
+        _, last_from_end = np.unique(rowids[::-1], return_index=True)
+        keep = np.zeros(len(rowids), dtype=bool)
+        keep[len(rowids) - 1 - last_from_end] = True
+        self._latest = (len(rowids), keep)
+        return keep.copy()
+
+    def search(self, query: np.ndarray, k: int, candidates: np.ndarray | list[int] | None = None) -> list[tuple[int, float]]:
+        """Top-k (rowid, cosine similarity), best first. candidates restricts the search to those rowids."""
+        with self._lock:
+            vectors, rowids, lists, centroids = self._vectors, self._rowids, self._lists, self._centroids
+        if vectors is None or k <= 0:
+            return []
+        q = np.asarray(query, dtype=np.float32).reshape(self.dim)
+        mask = self._latest_rows(np.asarray(rowids))
+        if candidates is not None:
+            mask &= np.isin(rowids, np.asarray(candidates, dtype=np.int64))
+        if centroids is not None and lists is not None and mask.sum() > get_settings().vector_ivf_min_rows:
+            nprobe = min(len(centroids), get_settings().vector_ivf_nprobe)
+            probe = np.argpartition(-(centroids @ q), nprobe - 1)[:nprobe]
+            mask &= np.isin(lists, probe)
+        rows = np.flatnonzero(mask)
+        if not len(rows):
+            return []
+        scores = np.empty(len(rows), dtype=np.float32)
+        for start in range(0, len(rows), _BLOCK_ROWS):
+            block = rows[start:start + _BLOCK_ROWS]
+            scores[start:start + len(block)] = vectors[block].astype(np.float32) @ q
+        k = min(k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(rowids[rows[i]]), float(scores[i])) for i in top]
+
+
+_INDEXES: dict[str, VectorIndex] = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def _user_dir(user_id: str) -> Path:
+    return Path(get_settings().vector_index_dir).resolve() / re.sub(r"[^\w.-]", "_", user_id)
+
+
+def get_vector_index(user_id: str) -> VectorIndex:
+    """Return the user's index (opened on first use with the configured embedder's dim and name)."""
+    from app.services.embeddings import get_embedder
+
+    path = _user_dir(user_id)
+    key = str(path)
+    index = _INDEXES.get(key)
+    if index is not None:
+        return index
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(key)
+        if index is None:
+            embedder = get_embedder()
+            index = VectorIndex(path, embedder.dim, get_settings().vector_dtype, embedder.name)
+            _INDEXES[key] = index
+    return index
+
+
+def drop_vector_index(user_id: str) -> None:
+    """Delete a user's index files (before a full re-index)."""
+    path = _user_dir(user_id)
+    with _INDEXES_LOCK:
+        _INDEXES.pop(str(path), None)
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def close_vector_indexes() -> None:
+    """Forget open indexes (tests, shutdown); files stay on disk."""
+    with _INDEXES_LOCK:
+        _INDEXES.clear()
@@ -9,6 +9,7 @@ from app.core.chat_logging import log_tool_call
 from . import (
     create_subject,
     get_current_time,
+    get_document_outline,
     list_recent_uploads,
     list_subjects,
     set_break_reminder,
@@ -20,6 +21,7 @@ _TOOL_MODULES = [
     set_focus_timer,
     get_current_time,
     list_recent_uploads,
+    get_document_outline,
     list_subjects,
     create_subject,
 ]
@@ -0,0 +1,42 @@
+"""Read a document's section outline (heading tree) without its text."""
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from app.db.repositories import get_document, get_document_outline
+
+TOOL_SCHEMA: dict[str, Any] = {
+    "type": "function",
+    "function": {
+        "name": "get_document_outline",
+        "description": "Get the section outline of an uploaded document (Markdown/DOCX headings): level, title, path and chunk_count per section, in document order. Use this to see a document's structure (e.g. for a study guide) without loading its content; PDFs and plain text return no sections.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "doc_id": {
+                    "type": "string",
+                    "description": "Document id (from list_recent_uploads or the attached document).",
+                }
+            },
+            "required": ["doc_id"],
+        },
+    },
+}
+
+
+def run(
+    args: dict[str, Any],
+    session_id: str,
+    user_id: str,
+    user_timezone: str | None = None,
+) -> tuple[str, dict[str, Any] | None]:
+    doc_id = str(args.get("doc_id") or "").strip()
+    doc = get_document(doc_id, user_id) if doc_id else None
+    if not doc:
+        return json.dumps({"error": "Document not found"}), None
+    sections = [
+        {"level": s["level"], "title": s["title"], "path": s["path"], "chunk_count": s["chunk_count"]}
+        for s in get_document_outline(doc_id)
+    ]
+    return json.dumps({"doc_id": doc_id, "title": doc["title"], "sections": sections}), None
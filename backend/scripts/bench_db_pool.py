@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Micro-benchmark: per-query overhead of a fresh connection vs the pooled connection.
+
+Runs get_document-style lookups and chat-message inserts against a throwaway database and prints
+microseconds per call for both connection strategies.
+
+Usage (from backend directory):
+  uv run python scripts/bench_db_pool.py
+  uv run python scripts/bench_db_pool.py --iterations 5000
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import Callable
+
+_BACKEND = Path(__file__).resolve().parent.parent
+if str(_BACKEND) not in sys.path:
+    sys.path.insert(0, str(_BACKEND))
+
+
+def _time_per_call(fn: Callable[[], None], iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="waifu-bench-")
+    os.chdir(tmp)
+    os.environ["DATABASE_URL"] = "sqlite:///bench.db"
+
+    from app.core.config import get_settings
+    from app.db.repositories import GET_DOCUMENT_SQL, INSERT_CHAT_MESSAGE_SQL, UPSERT_CHAT_SESSION_SQL
+    from app.db.session import close_pools, get_conn, init_db, pooled_connection
+
+    get_settings.cache_clear()
+    init_db()
+    user_id = get_settings().demo_user_id
+    with pooled_connection() as conn:
+        conn.execute(UPSERT_CHAT_SESSION_SQL, ("bench-session", user_id, "bench"))
+        conn.commit()
+
+    def read_fresh() -> None:
+        conn = get_conn()
+        try:
+            conn.execute(GET_DOCUMENT_SQL, ("missing", user_id)).fetchone()
+        finally:
+            conn.close()
+
+    def read_pooled() -> None:
+        with pooled_connection() as conn:
+            conn.execute(GET_DOCUMENT_SQL, ("missing", user_id)).fetchone()
+
+    def write_fresh() -> None:
+        conn = get_conn()
+        try:
+            conn.execute(INSERT_CHAT_MESSAGE_SQL, (str(uuid.uuid4()), "bench-session", user_id, "user", "hi"))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def write_pooled() -> None:
+        with pooled_connection() as conn:
+            conn.execute(INSERT_CHAT_MESSAGE_SQL, (str(uuid.uuid4()), "bench-session", user_id, "user", "hi"))
+            conn.commit()
+
+    print(f"iterations: {args.iterations}  db: {Path(tmp) / 'bench.db'}")
+    print(f"{'case':<8} {'fresh conn (us)':>16} {'pooled (us)':>12} {'speedup':>8}")
+    for name, fresh, pooled in (("read", read_fresh, read_pooled), ("write", write_fresh, write_pooled)):
+        fresh_us = _time_per_call(fresh, args.iterations)
+        pooled_us = _time_per_call(pooled, args.iterations)
+        print(f"{name:<8} {fresh_us:>16.1f} {pooled_us:>12.1f} {fresh_us / pooled_us:>7.1f}x")
+    close_pools()
+
+
+if __name__ == "__main__":
+    main()
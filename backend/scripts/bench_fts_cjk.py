@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Benchmark: chunk FTS query latency and recall per FTS_TOKENIZER on a mixed Chinese/English corpus.
+
+Builds a synthetic corpus (Chinese sentences written without spaces, English sentences, and mixed
+chunks), indexes it once per tokenizer, then runs word queries whose ground truth is every chunk that
+contains the query word as a substring. Prints mean/p95 latency and recall@k per tokenizer and script.
+
+Usage (from backend directory):
+  uv run python scripts/bench_fts_cjk.py
+  uv run python scripts/bench_fts_cjk.py --chunks 20000 --queries 500 --tokenizers bigram,trigram
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+_BACKEND = Path(__file__).resolve().parent.parent
+if str(_BACKEND) not in sys.path:
+    sys.path.insert(0, str(_BACKEND))
+
+_ZH_WORDS = (
+    "细胞 分裂 有丝分裂 减数分裂 染色体 线粒体 叶绿体 光合作用 呼吸作用 蛋白质 遗传 基因 突变 进化 生态系统 "
+    "化学键 氧化 还原 催化剂 反应速率 平衡常数 溶液 浓度 电解质 酸碱 函数 导数 积分 极限 矩阵 向量 概率 "
+    "统计 牛顿 力学 能量 动量 电场 磁场 波长 频率 历史 革命 王朝 经济 文化 语言 文学 诗歌"
+).split()
+_EN_WORDS = (
+    "cell division mitosis meiosis chromosome mitochondria chloroplast photosynthesis respiration protein "
+    "genetics gene mutation evolution ecosystem bond oxidation reduction catalyst equilibrium solution "
+    "function derivative integral limit matrix vector probability statistics newton energy momentum field "
+    "wavelength frequency history revolution economy culture language poetry"
+).split()
+_ZH_FILLER = "的 是 在 和 了 有 中 把 被 对 从 与".split()
+
+
+def _zh_sentence(rng: random.Random) -> str:
+    return "".join(rng.choice(_ZH_WORDS) + rng.choice(_ZH_FILLER) for _ in range(rng.randint(6, 12))) + "。"
+
+
+def _en_sentence(rng: random.Random) -> str:
+    return " ".join(rng.choice(_EN_WORDS) for _ in range(rng.randint(8, 14))) + "."
+
+
+def _corpus(n: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    chunks = []
+    for i in range(n):
+        kind = i % 3
+        if kind == 0:
+            chunks.append("".join(_zh_sentence(rng) for _ in range(4)))
+        elif kind == 1:
+            chunks.append(" ".join(_en_sentence(rng) for _ in range(4)))
+        else:
+            chunks.append(_zh_sentence(rng) + " " + _en_sentence(rng) + " " + _zh_sentence(rng))
+    return chunks
+
+
+def _run(tokenizer: str, chunks: list[str], queries: list[str], k: int) -> dict[str, list[float]]:
+    from app.core.config import get_settings
+    from app.db.repositories import insert_chunks, insert_document
+    from app.db.session import close_pools, init_db
+    from app.db.writer import stop_writers
+    from app.services.retrieval import search_chunks
+
+    os.chdir(tempfile.mkdtemp(prefix="waifu-bench-fts-"))
+    os.environ["DATABASE_URL"] = "sqlite:///bench.db"
+    os.environ["FTS_TOKENIZER"] = tokenizer
+    get_settings.cache_clear()
+    init_db()
+    user_id = get_settings().demo_user_id
+    insert_document("bench", user_id, "Bench", "bench.txt", "text/plain", 0, "bench.txt")
+    started = time.perf_counter()
+    insert_chunks("bench", [{"chunk_text": t} for t in chunks])
+    index_sec = time.perf_counter() - started
+
+    stats: dict[str, list[float]] = {"zh_ms": [], "en_ms": [], "zh_recall": [], "en_recall": []}
+    for query in queries:
+        relevant = {i for i, text in enumerate(chunks) if query.lower() in text.lower()}
+        t0 = time.perf_counter()
+        hits = search_chunks(query, user_id, doc_id="bench", limit=k).chunks
+        ms = (time.perf_counter() - t0) * 1000
+        found = {c.chunk_index for c in hits}
+        script = "en" if query.isascii() else "zh"
+        stats[f"{script}_ms"].append(ms)
+        stats[f"{script}_recall"].append(len(found & relevant) / min(k, len(relevant)) if relevant else 1.0)
+    stop_writers()
+    close_pools()
+    stats["index_sec"] = [index_sec]
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=6000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--tokenizers", default="unicode61,trigram,bigram")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    chunks = _corpus(args.chunks, args.seed)
+    rng = random.Random(args.seed + 1)
+    queries = [rng.choice(_ZH_WORDS) if i % 2 == 0 else rng.choice(_EN_WORDS) for i in range(args.queries)]
+
+    print(f"{args.chunks} chunks, {args.queries} queries, recall@{args.k}")
+    print(f"{'tokenizer':>10}  {'index s':>7}  {'zh ms':>6}  {'zh p95':>6}  {'zh rec':>6}  {'en ms':>6}  {'en p95':>6}  {'en rec':>6}")
+    for tokenizer in args.tokenizers.split(","):
+        s = _run(tokenizer.strip(), chunks, queries, args.k)
+
+        def p95(xs: list[float]) -> float:
+            return sorted(xs)[int(0.95 * (len(xs) - 1))] if xs else 0.0
+
+        print(
+            f"{tokenizer:>10}  {s['index_sec'][0]:>7.2f}"
+            f"  {statistics.fmean(s['zh_ms']):>6.2f}  {p95(s['zh_ms']):>6.2f}  {statistics.fmean(s['zh_recall']):>6.2f}"
+            f"  {statistics.fmean(s['en_ms']):>6.2f}  {p95(s['en_ms']):>6.2f}  {statistics.fmean(s['en_recall']):>6.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Benchmark: PDF text extraction throughput (pages/sec) against parse worker count.
+
+Extracts a PDF through the parse process pool with 1, 2, 4, ... workers up to the core count and prints
+pages/sec and speedup over a single worker. Without --pdf a synthetic text-heavy PDF is generated.
+
+Usage (from backend directory):
+  uv run python scripts/bench_pdf_extract.py
+  uv run python scripts/bench_pdf_extract.py --pdf ~/books/textbook.pdf --max-workers 8
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+_BACKEND = Path(__file__).resolve().parent.parent
+if str(_BACKEND) not in sys.path:
+    sys.path.insert(0, str(_BACKEND))
+
+_LINE = "The mitochondria is the powerhouse of the cell and produces ATP through respiration."
+
+
+def _write_pdf(path: Path, pages: int, lines_per_page: int = 40) -> None:
+    """Write a PDF with lines_per_page lines of Helvetica text on each page."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % (4 + 2 * i) for i in range(pages)) + b"] /Count %d >>" % pages,
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i in range(pages):
+        text = b" ".join(b"(%s) Tj T*" % f"{i + 1}.{n} {_LINE}".encode() for n in range(lines_per_page))
+        stream = b"BT /F1 9 Tf 11 TL 36 756 Td " + text + b" ET"
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >>"
+            b" /Contents %d 0 R >>" % (5 + 2 * i)
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for num, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % num + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(bytes(out))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", type=Path, help="PDF to extract (default: generated)")
+    parser.add_argument("--pages", type=int, default=600, help="pages in the generated PDF")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per worker count (best is reported)")
+    args = parser.parse_args()
+
+    from app.services.document_parser import count_pdf_pages
+    from app.services.parse_pool import ParserPool, parse_pages_in_pool
+
+    pdf = args.pdf
+    if pdf is None:
+        pdf = Path(tempfile.mkdtemp(prefix="waifu-bench-")) / "synthetic.pdf"
+        _write_pdf(pdf, args.pages)
+    page_count = count_pdf_pages(pdf)
+    print(f"{pdf} ({page_count} pages), {os.cpu_count()} cores")
+
+    counts = sorted({1, *(2 ** k for k in range(1, args.max_workers.bit_length())), args.max_workers})
+    baseline = None
+    print(f"{'workers':>7}  {'seconds':>8}  {'pages/s':>8}  {'speedup':>7}")
+    for workers in counts:
+        pool = ParserPool(max_workers=workers, timeout_sec=3600, max_rss_bytes=None)
+        try:
+            # Warm the workers so process start-up is not timed.
+            parse_pages_in_pool(pdf, pool)
+            best = float("inf")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                parse_pages_in_pool(pdf, pool)
+                best = min(best, time.perf_counter() - start)
+        finally:
+            pool.close()
+        baseline = baseline or best
+        print(f"{workers:>7}  {best:>8.2f}  {page_count / best:>8.1f}  {baseline / best:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
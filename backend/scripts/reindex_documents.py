@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Admin: re-chunk and re-index documents from the parse cache (after changing CHUNK_TOKENS /
+CHUNK_OVERLAP_TOKENS, a chunker fix, or to rebuild the dense index).
+
+Text is read from the compressed parse cache (PARSE_CACHE_DIR); only documents without a cached parse
+for the current parser version are parsed again. Chunking runs in the parser worker processes, several
+documents at a time. Stop the backend first: it holds dense indexes and cached retrieval results in memory.
+
+Usage (from backend directory):
+  uv run python scripts/reindex_documents.py
+  uv run python scripts/reindex_documents.py --workers 8
+  uv run python scripts/reindex_documents.py --doc-id <id> --doc-id <id>
+  uv run python scripts/reindex_documents.py --prune-cache
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+_BACKEND = Path(__file__).resolve().parent.parent
+if str(_BACKEND) not in sys.path:
+    sys.path.insert(0, str(_BACKEND))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--doc-id", action="append", dest="doc_ids", help="only this document (repeatable)")
+    parser.add_argument("--workers", type=int, default=None, help="documents in flight (default: PARSE_WORKERS)")
+    parser.add_argument("--prune-cache", action="store_true", help="first delete cache entries of older parser versions")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+
+    from app.db.session import close_pools, init_db
+    from app.db.writer import stop_writers
+    from app.services.ingestion import reindex_documents, shutdown_ingestion
+    from app.services.parse_cache import prune_parse_cache
+
+    init_db()
+    try:
+        if args.prune_cache:
+            print(f"Pruned {prune_parse_cache()} stale parse cache entries")
+        started = time.perf_counter()
+        counts = reindex_documents(args.doc_ids, workers=args.workers)
+        elapsed = time.perf_counter() - started
+        total = sum(counts.values())
+        print(
+            f"Re-indexed {total} document(s) in {elapsed:.1f} s: {counts['cached']} from cache,"
+            f" {counts['parsed']} parsed, {counts['failed']} failed"
+        )
+    finally:
+        shutdown_ingestion()
+        stop_writers()
+        close_pools()
+    sys.exit(1 if counts["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
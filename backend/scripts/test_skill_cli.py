@@ -76,22 +76,16 @@ def run_agentic_loop_cli(
     agent = get_default_agent()
     while True:
         run_res = agent.run(messages, session_id, user_id, user_timezone=None)
-        trace_getter = getattr(agent, "get_last_trace", None)
-        if callable(trace_getter):
-            trace_lines = trace_getter()
-            if trace_lines:
-                print("\n--- Agent execution trace ---")
-                for line in trace_lines:
-                    print(f"  - {line}")
-                print("--- End trace ---")
-        reasoning_getter = getattr(agent, "get_last_reasoning", None)
-        if callable(reasoning_getter):
-            reasoning_lines = reasoning_getter()
-            if reasoning_lines:
-                print("\n--- Agent thought summary ---")
-                for line in reasoning_lines:
-                    print(f"  - {line}")
-                print("--- End thoughts ---")
+        if run_res.trace:
+            print("\n--- Agent execution trace ---")
+            for line in run_res.trace:
+                print(f"  - {line}")
+            print("--- End trace ---")
+        if run_res.reasoning:
+            print("\n--- Agent thought summary ---")
+            for line in run_res.reasoning:
+                print(f"  - {line}")
+            print("--- End thoughts ---")
         if run_res.hitl_payload is None:
             return run_res.text, None
         checkpoint_id = str(run_res.hitl_payload.get("checkpoint_id") or "")
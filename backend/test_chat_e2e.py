@@ -1,12 +1,13 @@
+import asyncio
 import sys
-from app.api.chat import _complete_chat
+from app.api.chat import _acomplete_chat
 from app.agent import get_default_agent
 from pydantic import BaseModel
 
 class DummyRequest(BaseModel):
     pass
 
-res = _complete_chat(
+res = asyncio.run(_acomplete_chat(
     msg="Tell me a very short joke.",
     context_texts=[],
     attachment_title=None,
@@ -14,7 +15,7 @@ res = _complete_chat(
     session_id="test_session_agno",
     user_id="test_user",
     user_timezone="UTC"
-)
+))
 
 print(f"Chat Response: {res.text}")
 if res.hitl_payload:
@@ -0,0 +1,112 @@
+"""Tests for concurrent agent runs and per-run tool context."""
+from __future__ import annotations
+
+import asyncio
+import threading
+
+from agno.models.message import Message
+from agno.run.agent import RunOutput
+
+from app.agent import _RunSlots, get_default_agent
+
+
+def test_concurrent_runs_keep_their_own_tool_context(monkeypatch):
+    agent = get_default_agent()
+    barrier = threading.Barrier(2, timeout=5)
+    seen: dict[str, str] = {}
+
+    def fake_execute_tool(name, arguments, session_id, user_id, user_timezone=None, loop_context=None):
+        return session_id, None, None
+
+    def fake_invoke(session_id: str):
+        def _invoke():
+            # Both runs are inside _run_with_context at the same time.
+            barrier.wait()
+            seen[session_id] = agent._execute_tool("get_current_time", {})
+            return None
+
+        return _invoke
+
+    monkeypatch.setattr("app.agent.execute_tool", fake_execute_tool)
+
+    def _worker(session_id: str) -> None:
+        agent._run_with_context(
+            session_id=session_id,
+            user_id="u1",
+            user_timezone=None,
+            loop_context={},
+            invoke=fake_invoke(session_id),
+        )
+
+    threads = [threading.Thread(target=_worker, args=(sid,)) for sid in ("s1", "s2")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert seen == {"s1": "s1", "s2": "s2"}
+
+
+def test_execute_tool_outside_run_has_no_context():
+    agent = get_default_agent()
+    assert agent._execute_tool("get_current_time", {}) == "Tool runtime context is unavailable."
+
+
+def test_run_slots_are_one_limit_for_threads_and_tasks():
+    slots = _RunSlots(1)
+    holding = threading.Event()
+    release = threading.Event()
+
+    def _sync_run() -> None:
+        with slots:
+            holding.set()
+            release.wait(5)
+
+    async def main() -> None:
+        worker = threading.Thread(target=_sync_run)
+        worker.start()
+        assert holding.wait(5)
+        waiting = asyncio.ensure_future(slots.__aenter__())
+        await asyncio.sleep(0.05)
+        assert not waiting.done()
+        # A cancelled waiter gives up its place without taking the slot.
+        abandoned = asyncio.ensure_future(slots.__aenter__())
+        await asyncio.sleep(0)
+        abandoned.cancel()
+        release.set()
+        await asyncio.wait_for(waiting, 5)
+        await slots.__aexit__(None, None, None)
+        worker.join()
+        async with slots:
+            pass
+
+    asyncio.run(main())
+    assert slots._free == 1
+
+
+def test_concurrent_runs_return_their_own_trace(monkeypatch):
+    agent = get_default_agent()
+
+    def fake_agent_arun(self, agno_msgs, **kwargs):
+        session_id = kwargs["session_id"]
+
+        async def _coro():
+            await asyncio.sleep(0.01)
+            return RunOutput(messages=[
+                *agno_msgs,
+                Message(role="tool", tool_name=f"tool_{session_id}", content="ok"),
+                Message(role="assistant", content=f"done {session_id}"),
+            ])
+
+        return _coro()
+
+    monkeypatch.setattr("agno.agent.Agent.arun", fake_agent_arun)
+
+    async def main():
+        return await asyncio.gather(*(
+            agent.arun([{"role": "user", "content": "hi"}], sid, "u1") for sid in ("s1", "s2")
+        ))
+
+    first, second = asyncio.run(main())
+    assert first.trace == ["tool_result: tool_s1 => ok"]
+    assert second.trace == ["tool_result: tool_s2 => ok"]
@@ -0,0 +1,40 @@
+"""Tests for the stable agent system prompt and upstream usage metrics."""
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+from app.agent import AGENT_PERSONA, get_default_agent
+from app.api import chat as chat_api
+from app.core.metrics import snapshot
+
+
+def test_system_prompt_is_static_and_per_turn_data_follows_it():
+    agent = get_default_agent()
+    prompt = agent.system_prompt
+
+    assert prompt.text.startswith(AGENT_PERSONA)
+    assert "get_current_time" in prompt.text
+    assert agent._compile_system_prompt() == prompt
+    assert agent._agent.instructions == prompt.text
+
+    user_content = chat_api._build_agent_prompt("s1", "What is ATP?", ["mitochondria make atp"], [])
+    assert "get_current_time" not in user_content
+    assert user_content == "Context:\nmitochondria make atp\n\nUser question:\nWhat is ATP?"
+
+
+def test_finalize_run_records_upstream_usage_and_cache_hits(tmp_db):
+    agent = get_default_agent()
+    for cache_read in (0, 900):
+        res = SimpleNamespace(
+            messages=[],
+            metrics=SimpleNamespace(input_tokens=1000, output_tokens=50, cache_read_tokens=cache_read, cache_write_tokens=0),
+        )
+        agent._finalize_run(
+            res, session_id="s1", user_id="u1", user_timezone=None, loop_context={}, paused_error="",
+        )
+
+    counters = snapshot()["counters"]
+    assert counters["upstream.runs"] == 2
+    assert counters["upstream.input_tokens"] == 2000
+    assert counters["upstream.cache_read_tokens"] == 900
+    assert counters["upstream.cache_hit_runs"] == 1
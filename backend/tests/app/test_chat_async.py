@@ -0,0 +1,51 @@
+"""Tests for the async chat endpoints."""
+from __future__ import annotations
+
+from agno.models.message import Message
+from agno.run.agent import RunContentEvent, RunOutput
+from fastapi.testclient import TestClient
+
+from app.db.repositories import list_chat_messages
+from app.main import create_app
+
+
+def _fake_arun(reply: str):
+    def fake_agent_arun(self, agno_msgs, **kwargs):
+        output = RunOutput(messages=[*agno_msgs, Message(role="assistant", content=reply)])
+        if kwargs.get("stream"):
+            async def _gen():
+                for word in reply.split(" "):
+                    yield RunContentEvent(content=word + " ")
+                yield output
+
+            return _gen()
+
+        async def _coro():
+            return output
+
+        return _coro()
+
+    return fake_agent_arun
+
+
+def test_chat_endpoint_runs_async_and_persists_exchange(tmp_db, monkeypatch):
+    monkeypatch.setattr("agno.agent.Agent.arun", _fake_arun("Great question!"))
+    client = TestClient(create_app())
+
+    res = client.post("/api/ai/chat", json={"message": "hi", "session_id": "s-async"})
+
+    assert res.status_code == 200
+    assert res.json()["message"]["content"] == "Great question!"
+    rows = list_chat_messages("s-async", "demo-user")
+    assert [(r["role"], r["content"]) for r in rows] == [("user", "hi"), ("assistant", "Great question!")]
+
+
+def test_chat_stream_emits_tokens_before_done(tmp_db, monkeypatch):
+    monkeypatch.setattr("agno.agent.Agent.arun", _fake_arun("You got this"))
+    client = TestClient(create_app())
+
+    res = client.post("/api/ai/chat/stream", json={"message": "hi", "session_id": "s-stream"})
+
+    events = [line.split(": ", 1)[1] for line in res.text.splitlines() if line.startswith("event: ")]
+    assert events == ["token", "token", "token", "mood", "done"]
+    assert '"message": "You got this"' in res.text
@@ -0,0 +1,107 @@
+"""Tests for chat turn deadlines and client-disconnect cancellation."""
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.agent import _RUNTIME_CONTEXT, _ToolRuntimeContext, get_default_agent
+from app.api import chat as chat_api
+from app.core.config import get_settings
+from app.core.metrics import snapshot
+from app.db.repositories import list_chat_messages
+from app.main import create_app
+
+
+def _hanging_arun(cancelled: list[bool]):
+    def fake_agent_arun(self, agno_msgs, **kwargs):
+        async def _hang():
+            try:
+                await asyncio.sleep(30)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        if kwargs.get("stream"):
+            async def _gen():
+                await _hang()
+                yield None
+
+            return _gen()
+        return _hang()
+
+    return fake_agent_arun
+
+
+@pytest.fixture
+def short_timeout(tmp_db, monkeypatch):
+    monkeypatch.setenv("CHAT_REQUEST_TIMEOUT", "0.3")
+    get_settings.cache_clear()
+
+
+def test_chat_past_deadline_cancels_the_run_and_returns_504(short_timeout, monkeypatch):
+    cancelled: list[bool] = []
+    monkeypatch.setattr("agno.agent.Agent.arun", _hanging_arun(cancelled))
+    client = TestClient(create_app())
+
+    res = client.post("/api/ai/chat", json={"message": "hi", "session_id": "s-slow"})
+
+    assert res.status_code == 504
+    assert res.json()["detail"]["code"] == "upstream_error"
+    assert cancelled == [True]
+    assert list_chat_messages("s-slow", "demo-user") == []
+    assert snapshot()["counters"]["chat.turns_timed_out"] == 1
+
+
+def test_stream_past_deadline_ends_with_timeout_message(short_timeout, monkeypatch):
+    cancelled: list[bool] = []
+    monkeypatch.setattr("agno.agent.Agent.arun", _hanging_arun(cancelled))
+    client = TestClient(create_app())
+
+    res = client.post("/api/ai/chat/stream", json={"message": "hi", "session_id": "s-slow"})
+
+    done = [line for line in res.text.splitlines() if line.startswith("data: ")][-1]
+    assert json.loads(done[len("data: "):])["message"] == chat_api._TIMEOUT_MESSAGE
+    assert cancelled == [True]
+    assert list_chat_messages("s-slow", "demo-user") == []
+    assert snapshot()["counters"]["chat.turns_timed_out"] == 1
+
+
+def test_client_disconnect_cancels_the_producing_task(monkeypatch):
+    monkeypatch.setattr(chat_api, "_DISCONNECT_POLL_SEC", 0.01)
+    cancelled: list[bool] = []
+
+    class _GoneRequest:
+        async def is_disconnected(self) -> bool:
+            return True
+
+    async def events():
+        try:
+            await asyncio.sleep(30)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        yield None
+
+    async def main():
+        with pytest.raises(chat_api._ClientDisconnected):
+            async for _ in chat_api._guard_events(_GoneRequest(), events(), None):
+                pass
+
+    asyncio.run(main())
+    assert cancelled == [True]
+
+
+def test_tools_are_refused_after_the_deadline():
+    agent = get_default_agent()
+    token = _RUNTIME_CONTEXT.set(_ToolRuntimeContext(
+        session_id="s1", user_id="u1", user_timezone=None, loop_context={}, deadline=time.monotonic() - 1,
+    ))
+    try:
+        result = agent._execute_tool("get_current_time", {})
+    finally:
+        _RUNTIME_CONTEXT.reset(token)
+    assert "Out of time" in json.loads(result)["error"]
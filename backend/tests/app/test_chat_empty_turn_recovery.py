@@ -1,24 +1,30 @@
 from __future__ import annotations
 
+import asyncio
+
+from app.agent import AgentSystemPrompt
 from app.api import chat as chat_api
 
 def test_run_tool_loop_returns_typed_fallback_result_on_empty_turn(monkeypatch):
 
-    def fake_agent_run(self, agno_msgs, **kwargs):
+    def fake_agent_arun(self, agno_msgs, **kwargs):
         class MockRunOutput:
             @property
             def messages(self):
                 return agno_msgs
-        return MockRunOutput()
 
-    monkeypatch.setattr("agno.agent.Agent.run", fake_agent_run)
+        async def _coro():
+            return MockRunOutput()
+        return _coro()
+
+    monkeypatch.setattr("agno.agent.Agent.arun", fake_agent_arun)
 
-    run_res = chat_api._run_tool_loop(
+    run_res = asyncio.run(chat_api._arun_tool_loop(
         messages=[{"role": "user", "content": "write essay"}],
         session_id="s1",
         user_id="u1",
         user_timezone=None,
-    )
+    ))
 
     assert run_res.text is None
     assert run_res.used_fallback is True
@@ -27,7 +33,7 @@ def test_run_tool_loop_returns_typed_fallback_result_on_empty_turn(monkeypatch):
 
 
 def test_complete_chat_does_not_call_ai_fallback_when_loop_returns_text(monkeypatch):
-    def fake_run_tool_loop(messages, session_id, user_id, user_timezone=None):
+    async def fake_arun_tool_loop(messages, session_id, user_id, user_timezone=None, deadline=None):
         return chat_api.AgentRunResult(
             text="Recovery text",
             used_fallback=True,
@@ -35,14 +41,14 @@ def test_complete_chat_does_not_call_ai_fallback_when_loop_returns_text(monkeypa
             hitl_payload=None,
         )
 
-    def fail_ai_chat(*args, **kwargs):
-        raise AssertionError("ai_chat fallback should not be called when tool loop already returned text")
+    async def fail_ai_achat(*args, **kwargs):
+        raise AssertionError("ai_achat fallback should not be called when tool loop already returned text")
 
-    monkeypatch.setattr(chat_api, "_run_tool_loop", fake_run_tool_loop)
-    monkeypatch.setattr(chat_api, "ai_chat", fail_ai_chat)
-    monkeypatch.setattr(chat_api, "get_agent_context_text", lambda: "")
+    monkeypatch.setattr(chat_api, "_arun_tool_loop", fake_arun_tool_loop)
+    monkeypatch.setattr(chat_api, "ai_achat", fail_ai_achat)
+    monkeypatch.setattr(chat_api, "get_agent_system_prompt", lambda: AgentSystemPrompt(text="", version="", tokens=0))
 
-    run_res = chat_api._complete_chat(
+    run_res = asyncio.run(chat_api._acomplete_chat(
         msg="yes please",
         context_texts=[],
         attachment_title=None,
@@ -50,7 +56,7 @@ def test_complete_chat_does_not_call_ai_fallback_when_loop_returns_text(monkeypa
         session_id="s1",
         user_id="u1",
         user_timezone=None,
-    )
+    ))
 
     assert run_res.text == "Recovery text"
     assert run_res.used_fallback is True
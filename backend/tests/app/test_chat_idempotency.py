@@ -0,0 +1,100 @@
+"""Tests for idempotent chat requests and in-flight coalescing."""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from agno.models.message import Message
+from agno.run.agent import RunOutput
+from fastapi.testclient import TestClient
+
+from app.core.idempotency import IdempotencyKeyReused, IdempotentTurns
+from app.db.repositories import list_chat_messages
+from app.main import create_app
+
+
+def _counting_arun(calls: list[int]):
+    def fake_agent_arun(self, agno_msgs, **kwargs):
+        calls.append(1)
+
+        async def _coro():
+            return RunOutput(messages=[*agno_msgs, Message(role="assistant", content=f"reply {len(calls)}")])
+
+        return _coro()
+
+    return fake_agent_arun
+
+
+def test_resent_chat_request_replays_stored_response(tmp_db, monkeypatch):
+    calls: list[int] = []
+    monkeypatch.setattr("agno.agent.Agent.arun", _counting_arun(calls))
+    client = TestClient(create_app())
+    body = {"message": "hi", "session_id": "s-idem"}
+
+    first = client.post("/api/ai/chat", json=body, headers={"Idempotency-Key": "k1"})
+    again = client.post("/api/ai/chat", json=body, headers={"Idempotency-Key": "k1"})
+
+    assert again.json() == first.json()
+    assert again.headers["Idempotent-Replayed"] == "true"
+    assert len(calls) == 1
+    assert len(list_chat_messages("s-idem", "demo-user")) == 2
+
+
+def test_requests_without_key_dedupe_on_session_message_and_history_length(tmp_db, monkeypatch):
+    calls: list[int] = []
+    monkeypatch.setattr("agno.agent.Agent.arun", _counting_arun(calls))
+    client = TestClient(create_app())
+    body = {"message": "yes", "session_id": "s-auto"}
+
+    client.post("/api/ai/chat", json=body)
+    client.post("/api/ai/chat", json=body)
+    assert len(calls) == 1
+
+    # The same words as a new turn (history has grown) run again.
+    history = [{"role": "user", "content": "yes"}, {"role": "assistant", "content": "reply 1"}]
+    res = client.post("/api/ai/chat", json={**body, "history": history})
+    assert "Idempotent-Replayed" not in res.headers
+    assert len(calls) == 2
+
+
+def test_in_flight_duplicates_attach_to_the_running_turn_and_failures_are_not_stored():
+    turns = IdempotentTurns(ttl_sec=60)
+    started: list[str] = []
+
+    async def turn():
+        started.append("run")
+        await asyncio.sleep(0.02)
+        return {"message": "done"}
+
+    async def failing():
+        raise RuntimeError("upstream down")
+
+    async def main():
+        results = await asyncio.gather(turns.run("k", turn), turns.run("k", turn))
+        assert results == [({"message": "done"}, False), ({"message": "done"}, True)]
+        with pytest.raises(RuntimeError):
+            await turns.run("bad", failing)
+        assert await turns.run("bad", turn) == ({"message": "done"}, False)
+        running = asyncio.ensure_future(turns.run("bound", turn, "body-a"))
+        await asyncio.sleep(0)
+        with pytest.raises(IdempotencyKeyReused):
+            await turns.run("bound", turn, "body-b")
+        assert await running == ({"message": "done"}, False)
+
+    asyncio.run(main())
+    assert started == ["run", "run", "run"]
+
+
+def test_reused_key_with_a_different_body_is_rejected(tmp_db, monkeypatch):
+    calls: list[int] = []
+    monkeypatch.setattr("agno.agent.Agent.arun", _counting_arun(calls))
+    client = TestClient(create_app())
+    headers = {"Idempotency-Key": "k2"}
+
+    first = client.post("/api/ai/chat", json={"message": "hi", "session_id": "s-reuse"}, headers=headers)
+    other = client.post("/api/ai/chat", json={"message": "bye", "session_id": "s-reuse"}, headers=headers)
+
+    assert first.status_code == 200
+    assert other.status_code == 422
+    assert other.json()["detail"]["code"] == "idempotency_key_reused"
+    assert len(calls) == 1
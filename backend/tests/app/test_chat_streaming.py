@@ -0,0 +1,47 @@
+"""Tests for streaming agent runs and SSE token splitting."""
+from __future__ import annotations
+
+import asyncio
+
+from agno.models.message import Message
+from agno.run.agent import RunContentEvent, RunOutput
+
+from app.agent import get_default_agent
+from app.api import chat as chat_api
+
+
+def test_split_stream_words_holds_unfinished_word():
+    words, pending = chat_api._split_stream_words("", "Hel")
+    assert words == [] and pending == "Hel"
+    words, pending = chat_api._split_stream_words(pending, "lo wor")
+    assert words == ["Hello"] and pending == "wor"
+    words, pending = chat_api._split_stream_words(pending, "ld! ")
+    assert words == ["world!"] and pending == ""
+
+
+def test_arun_stream_yields_deltas_then_result(monkeypatch):
+    def fake_agent_arun(self, agno_msgs, **kwargs):
+        assert kwargs.get("stream") is True
+
+        async def _gen():
+            yield RunContentEvent(content="Hi ")
+            yield RunContentEvent(content="there")
+            yield RunOutput(messages=[*agno_msgs, Message(role="assistant", content="Hi there")])
+
+        return _gen()
+
+    monkeypatch.setattr("agno.agent.Agent.arun", fake_agent_arun)
+
+    async def _collect():
+        return [ev async for ev in get_default_agent().arun_stream(
+            [{"role": "user", "content": "hello"}],
+            session_id="s1",
+            user_id="u1",
+        )]
+
+    events = asyncio.run(_collect())
+
+    assert [e.data["delta"] for e in events if e.kind == "token"] == ["Hi ", "there"]
+    assert events[-1].kind == "result"
+    assert events[-1].result.text == "Hi there"
+    assert events[-1].result.used_fallback is False
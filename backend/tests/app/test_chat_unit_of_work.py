@@ -0,0 +1,34 @@
+"""Tests for the chat-turn unit of work."""
+from __future__ import annotations
+
+import asyncio
+
+from app.db.async_repositories import ChatTurnUnitOfWork
+from app.db.repositories import get_chat_session, list_chat_messages
+
+
+def test_unit_of_work_writes_session_and_messages_together(tmp_db):
+    uow = ChatTurnUnitOfWork("s-uow", "demo-user")
+    uow.upsert_session(title="first title")
+    uow.add_message("user", "question")
+    uow.add_message("assistant", "answer")
+    asyncio.run(uow.commit())
+
+    session = get_chat_session("s-uow", "demo-user")
+    assert session is not None and session["title"] == "first title"
+    assert session["last_message_at"] is not None
+    rows = list_chat_messages("s-uow", "demo-user")
+    assert [(r["role"], r["content"]) for r in rows] == [("user", "question"), ("assistant", "answer")]
+
+
+def test_unit_of_work_keeps_existing_title(tmp_db):
+    first = ChatTurnUnitOfWork("s-title", "demo-user")
+    first.upsert_session(title="original")
+    asyncio.run(first.commit())
+
+    second = ChatTurnUnitOfWork("s-title", "demo-user")
+    second.upsert_session(title="replacement")
+    second.add_message("assistant", "hi")
+    asyncio.run(second.commit())
+
+    assert get_chat_session("s-title", "demo-user")["title"] == "original"
@@ -0,0 +1,167 @@
+"""Tests for bulk chunk insertion and the chunk FTS index."""
+from __future__ import annotations
+
+import pytest
+
+from app.db.migrations import run_migrations
+from app.db.repositories import (
+    get_chunks_for_document,
+    get_document_text,
+    insert_chunks,
+    insert_document,
+    list_chunk_rows,
+)
+from app.db.session import pooled_connection
+
+
+def _fts_doc_ids(term: str) -> list[str]:
+    with pooled_connection() as conn:
+        rows = conn.execute(
+            "SELECT doc_id FROM document_chunks_fts WHERE document_chunks_fts MATCH ?", (term,)
+        ).fetchall()
+    return [r["doc_id"] for r in rows]
+
+
+@pytest.mark.parametrize("defer_fts", [False, True])
+def test_insert_chunks_indexes_every_chunk(tmp_db, defer_fts):
+    insert_document("d1", "demo-user", "Bio", "bio.txt", "text/plain", 10, "/tmp/bio.txt")
+    insert_chunks("d1", [{"chunk_text": "mitochondria powerhouse"}, {"chunk_text": "ribosome protein"}], defer_fts=defer_fts)
+
+    assert [c["chunk_index"] for c in get_chunks_for_document("d1")] == [0, 1]
+    assert _fts_doc_ids("ribosome") == ["d1"]
+    with pooled_connection() as conn:
+        trigger = conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name = 'document_chunks_ai'"
+        ).fetchone()
+    assert trigger is not None
+
+
+def test_deferred_fts_leaves_the_schema_alone(tmp_db):
+    insert_document("d1", "demo-user", "Bio", "bio.txt", "text/plain", 10, "/tmp/bio.txt")
+    insert_document("d2", "demo-user", "Chem", "chem.txt", "text/plain", 10, "/tmp/chem.txt")
+    with pooled_connection() as conn:
+        version = conn.execute("PRAGMA schema_version").fetchone()["schema_version"]
+
+    insert_chunks("d1", [{"chunk_text": "mitochondria powerhouse"}], defer_fts=True)
+    insert_chunks("d2", [{"chunk_text": "ribosome protein"}])
+
+    assert _fts_doc_ids("mitochondria") == ["d1"] and _fts_doc_ids("ribosome") == ["d2"]
+    with pooled_connection() as conn:
+        assert conn.execute("PRAGMA schema_version").fetchone()["schema_version"] == version
+        assert conn.execute("SELECT 1 FROM app_meta WHERE key = 'fts_defer_doc'").fetchone() is None
+        conn.execute("INSERT INTO document_chunks_fts(document_chunks_fts, rank) VALUES ('integrity-check', 1)")
+
+
+def test_migration_replaces_an_unconditional_chunk_insert_trigger(tmp_db):
+    with pooled_connection() as conn:
+        conn.execute("DROP TRIGGER document_chunks_ai")
+        conn.execute(
+            "CREATE TRIGGER document_chunks_ai AFTER INSERT ON document_chunks BEGIN SELECT 1; END"
+        )
+        conn.commit()
+    run_migrations()
+
+    with pooled_connection() as conn:
+        sql = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'document_chunks_ai'").fetchone()["sql"]
+    assert "fts_defer_doc" in sql
+
+
+def test_insert_chunks_replace_swaps_chunks_atomically(tmp_db):
+    insert_document("d1", "demo-user", "Bio", "bio.txt", "text/plain", 10, "/tmp/bio.txt")
+    insert_chunks("d1", [{"chunk_text": "old text"}])
+    insert_chunks("d1", [{"chunk_text": "new text"}], replace=True)
+
+    assert [c["chunk_text"] for c in get_chunks_for_document("d1")] == ["new text"]
+    assert _fts_doc_ids("old") == []
+
+
+def test_text_is_stored_once_and_chunks_are_spans_of_it(tmp_db):
+    insert_document("zh", "demo-user", "Cell", "cell.txt", "text/plain", 10, "/tmp/cell.txt")
+    text = "线粒体 是 细胞 的 动力工厂\n\nmitochondria make atp"
+    spans = [{"start": 0, "end": 14, "page": 1}, {"start": 11, "end": len(text), "page": 2}]
+    insert_chunks("zh", spans, replace=True, text=text)
+
+    assert bytes(get_document_text("zh")).decode() == text
+    assert [c["chunk_text"] for c in get_chunks_for_document("zh")] == [text[0:14], text[11:]]
+    assert [r["chunk_text"] for r in list_chunk_rows("zh")] == [text[0:14], text[11:]]
+    assert _fts_doc_ids("atp") == ["zh"]
+
+
+def test_migration_moves_legacy_chunk_text_onto_offsets(tmp_db):
+    with pooled_connection() as conn:
+        conn.executescript("""
+            DROP TRIGGER document_chunks_ai; DROP TRIGGER document_chunks_ad; DROP TRIGGER document_chunks_au;
+            DROP TABLE document_chunks_fts; DROP VIEW document_chunk_fts_texts; DROP VIEW document_chunk_texts;
+            DROP TABLE document_chunks; DROP TABLE document_texts;
+            CREATE TABLE document_chunks (id TEXT PRIMARY KEY, doc_id TEXT NOT NULL, chunk_index INTEGER NOT NULL,
+              chunk_text TEXT NOT NULL, page INTEGER, section TEXT, created_at TEXT DEFAULT (datetime('now')));
+            INSERT INTO document_chunks (rowid, id, doc_id, chunk_index, chunk_text) VALUES
+              (7, 'c0', 'd1', 0, 'mitochondria powerhouse'), (9, 'c1', 'd1', 1, 'ribosome protein');
+        """)
+    run_migrations()
+
+    chunks = get_chunks_for_document("d1")
+    assert [(c["id"], c["chunk_text"]) for c in chunks] == [("c0", "mitochondria powerhouse"), ("c1", "ribosome protein")]
+    assert _fts_doc_ids("ribosome") == ["d1"]
+    with pooled_connection() as conn:
+        highlighted = conn.execute(
+            "SELECT highlight(document_chunks_fts, 0, '[', ']') AS h FROM document_chunks_fts"
+            " WHERE document_chunks_fts MATCH 'ribosome'"
+        ).fetchone()["h"]
+        assert highlighted == "[ribosome] protein"
+        assert [r["rowid"] for r in conn.execute("SELECT rowid FROM document_chunks ORDER BY rowid")] == [7, 9]
+
+
+def test_fts_content_is_the_segmented_text_it_indexed(tmp_db):
+    insert_document("zh", "demo-user", "Cell", "cell.txt", "text/plain", 10, "/tmp/cell.txt")
+    insert_chunks("zh", [{"chunk_text": "细胞分裂 and mitosis"}])
+
+    with pooled_connection() as conn:
+        highlighted = conn.execute(
+            "SELECT highlight(document_chunks_fts, 0, '[', ']') AS h FROM document_chunks_fts"
+            " WHERE document_chunks_fts MATCH '\"胞分\"'"
+        ).fetchone()["h"]
+        # rank=1 checks the index against its content table, not just its own consistency.
+        conn.execute("INSERT INTO document_chunks_fts(document_chunks_fts, rank) VALUES ('integrity-check', 1)")
+    assert highlighted == " 细胞 [胞分] 分裂  and mitosis"
+
+
+def test_migration_rebuilds_an_index_over_raw_chunk_text(tmp_db):
+    insert_document("d1", "demo-user", "Bio", "bio.txt", "text/plain", 10, "/tmp/bio.txt")
+    insert_chunks("d1", [{"chunk_text": "ribosome protein"}])
+    with pooled_connection() as conn:
+        conn.execute("DROP TABLE document_chunks_fts")
+        conn.execute(
+            "CREATE VIRTUAL TABLE document_chunks_fts USING fts5(chunk_text, doc_id UNINDEXED, chunk_index UNINDEXED,"
+            " content='document_chunk_texts', content_rowid='rowid', tokenize='unicode61')"
+        )
+        conn.commit()
+    run_migrations()
+
+    assert _fts_doc_ids("ribosome") == ["d1"]
+    with pooled_connection() as conn:
+        sql = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'document_chunks_fts'").fetchone()["sql"]
+    assert "content='document_chunk_fts_texts'" in sql
+
+
+def test_interrupted_offsets_migration_leaves_the_legacy_layout_intact(tmp_db):
+    with pooled_connection() as conn:
+        conn.executescript("""
+            DROP TRIGGER document_chunks_ai; DROP TRIGGER document_chunks_ad; DROP TRIGGER document_chunks_au;
+            DROP TABLE document_chunks_fts; DROP VIEW document_chunk_fts_texts; DROP VIEW document_chunk_texts;
+            DROP TABLE document_chunks; DROP TABLE document_texts;
+            CREATE TABLE document_chunks (id TEXT PRIMARY KEY, doc_id TEXT NOT NULL, chunk_index INTEGER NOT NULL,
+              chunk_text TEXT NOT NULL, page INTEGER, section TEXT, created_at TEXT DEFAULT (datetime('now')));
+            INSERT INTO document_chunks (id, doc_id, chunk_index, chunk_text) VALUES
+              ('c0', 'd1', 0, 'mitochondria powerhouse'), ('c1', 'd2', 0, X'00ff');
+        """)
+    # The second document's text is not valid text, so the migration fails after moving the first.
+    with pytest.raises(AttributeError):
+        run_migrations()
+
+    with pooled_connection() as conn:
+        tables = {r["name"] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        columns = {r["name"] for r in conn.execute("PRAGMA table_info(document_chunks)")}
+        assert conn.execute("SELECT COUNT(*) AS n FROM document_chunks").fetchone()["n"] == 2
+    assert "document_chunks_legacy" not in tables and "document_texts" not in tables
+    assert "chunk_text" in columns
@@ -0,0 +1,125 @@
+"""Tests for the sentence- and token-aware chunker and heading sections."""
+from __future__ import annotations
+
+import tracemalloc
+
+from app.services.document_parser import chunk_pages, chunk_text, iter_chunk_spans, parse_document_pages
+from app.services.tokens import estimate_tokens
+
+
+def test_estimate_tokens_counts_cjk_per_character_and_words_by_length():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("the cat") == 2
+    assert estimate_tokens("细胞分裂") == 4
+    assert estimate_tokens("细胞 cell") == estimate_tokens("细胞") + estimate_tokens("cell")
+
+
+def test_chunks_break_at_sentence_ends_within_the_token_budget():
+    text = " ".join(f"Sentence number {i} is here." for i in range(40))
+
+    chunks = list(chunk_text(text, max_tokens=30, overlap_tokens=0))
+
+    assert len(chunks) > 1
+    assert all(c.startswith("Sentence") and c.endswith("here.") for c in chunks)
+    assert all(estimate_tokens(c) <= 30 for c in chunks)
+    assert " ".join(chunks) == text
+
+
+def test_chunks_overlap_by_trailing_sentences():
+    text = "Alpha one. Beta two. Gamma three. Delta four. Epsilon five."
+
+    chunks = list(chunk_text(text, max_tokens=8, overlap_tokens=3))
+
+    assert chunks == ["Alpha one. Beta two. Gamma three.", "Gamma three. Delta four. Epsilon five."]
+
+
+def test_paragraph_break_closes_a_mostly_full_chunk():
+    text = "First paragraph has words. More words here.\n\nSecond paragraph starts. It continues."
+
+    chunks = list(chunk_text(text, max_tokens=14, overlap_tokens=0))
+
+    assert chunks == ["First paragraph has words. More words here.", "Second paragraph starts. It continues."]
+
+
+def test_oversized_sentences_and_cjk_runs_are_split():
+    text = "word " * 50 + "。" + "细" * 25
+
+    spans = list(iter_chunk_spans(text.strip(), max_tokens=10, overlap_tokens=0))
+
+    assert all(estimate_tokens(text[s:e]) <= 10 for s, e in spans)
+    assert "".join(text[s:e] for s, e in spans).replace(" ", "") == text.replace(" ", "")
+
+
+def test_chunking_memory_stays_flat_for_long_documents():
+    text = "A short sentence about cells. " * 30_000  # ~0.9 MB
+
+    tracemalloc.start()
+    count = sum(1 for _ in iter_chunk_spans(text))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert count > 100
+    assert peak < len(text) // 10
+
+
+_MARKDOWN = """Intro line.
+
+# Cells
+
+Cells are small.
+
+## Mitochondria
+
+Mitochondria make ATP.
+
+```python
+# not a heading
+```
+
+## Ribosomes
+### Structure
+
+Two subunits.
+
+# Energy
+
+Glucose stores energy.
+"""
+
+
+def test_markdown_headings_become_sections_and_chunks_never_cross_them():
+    doc = chunk_pages([(None, _MARKDOWN)], headings=True)
+
+    assert [(s["level"], s["path"]) for s in doc.sections] == [
+        (1, "Cells"),
+        (2, "Cells > Mitochondria"),
+        (2, "Cells > Ribosomes"),
+        (3, "Cells > Ribosomes > Structure"),
+        (1, "Energy"),
+    ]
+    cells = doc.sections[0]
+    assert doc.text[cells["start"]:cells["end"]].rstrip().endswith("Two subunits.")
+    assert [(c["section"], doc.text[c["start"]:c["end"]]) for c in doc.chunks] == [
+        (None, "Intro line."),
+        ("Cells", "Cells\n\nCells are small."),
+        ("Cells > Mitochondria", "Mitochondria\n\nMitochondria make ATP.\n\n```python # not a heading ```"),
+        ("Cells > Ribosomes > Structure", "Structure\n\nTwo subunits."),
+        ("Energy", "Energy\n\nGlucose stores energy."),
+    ]
+
+
+def test_docx_heading_styles_are_parsed_as_markdown_headings(tmp_path):
+    from docx import Document
+
+    document = Document()
+    document.add_heading("Cells", level=1)
+    document.add_paragraph("Cells are small.")
+    document.add_heading("Mitochondria", level=2)
+    document.add_paragraph("Mitochondria make ATP.")
+    path = tmp_path / "bio.docx"
+    document.save(str(path))
+
+    pages = parse_document_pages(path)
+
+    assert pages == [(None, "# Cells\n\nCells are small.\n\n## Mitochondria\n\nMitochondria make ATP.")]
+    assert [s["path"] for s in chunk_pages(pages, headings=True).sections] == ["Cells", "Cells > Mitochondria"]
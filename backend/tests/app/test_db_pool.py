@@ -0,0 +1,51 @@
+"""Tests for the pooled SQLite connections."""
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from app.db import async_repositories
+from app.db.session import ConnectionPool, get_pool, pooled_connection
+
+
+def test_pool_reuses_connections_and_is_bounded(tmp_path: Path):
+    pool = ConnectionPool(tmp_path / "pool.db", max_size=2, acquire_timeout=0.05)
+    first = pool.acquire()
+    second = pool.acquire()
+    with pytest.raises(TimeoutError):
+        pool.acquire()
+    pool.release(first)
+    assert pool.acquire() is first
+    pool.release(first)
+    pool.release(second)
+    pool.close()
+
+
+def test_pool_rolls_back_uncommitted_work_on_release(tmp_path: Path):
+    pool = ConnectionPool(tmp_path / "pool.db", max_size=1)
+    conn = pool.acquire()
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.commit()
+    conn.execute("INSERT INTO t VALUES (1)")
+    pool.release(conn)
+    conn = pool.acquire()
+    assert conn.execute("SELECT COUNT(*) AS n FROM t").fetchone()["n"] == 0
+    pool.release(conn)
+    pool.close()
+
+
+def test_pooled_connection_uses_wal(tmp_db):
+    with pooled_connection() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()["journal_mode"] == "wal"
+
+
+def test_async_reads_borrow_pooled_connections(tmp_db):
+    async def _reads():
+        for _ in range(5):
+            assert await async_repositories.get_document("missing", "user") is None
+            assert await async_repositories.list_due_reminders("session", "user") == []
+
+    asyncio.run(_reads())
+    assert get_pool()._created == 1
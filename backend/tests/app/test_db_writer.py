@@ -0,0 +1,75 @@
+"""Tests for the group-commit writer."""
+from __future__ import annotations
+
+import sqlite3
+import threading
+from pathlib import Path
+
+import pytest
+
+from app.db.writer import GroupCommitWriter, WriteStatement
+
+
+def test_failed_write_does_not_poison_its_batch(tmp_path: Path):
+    path = tmp_path / "writer.db"
+    sqlite3.connect(path).execute("CREATE TABLE t (x INTEGER PRIMARY KEY)").connection.close()
+    writer = GroupCommitWriter(path, max_delay=0.05)
+
+    ok = writer.submit(WriteStatement("INSERT INTO t VALUES (?)", (1,)))
+    dup = writer.submit(
+        WriteStatement("INSERT INTO t VALUES (?)", (2,)),
+        WriteStatement("INSERT INTO t VALUES (?)", (1,)),
+    )
+    many = writer.submit(WriteStatement("INSERT INTO t VALUES (?)", [(3,), (4,)], many=True))
+
+    ok.result(timeout=5)
+    many.result(timeout=5)
+    with pytest.raises(sqlite3.IntegrityError):
+        dup.result(timeout=5)
+    writer.stop()
+
+    rows = sqlite3.connect(path).execute("SELECT x FROM t ORDER BY x").fetchall()
+    assert rows == [(1,), (3,), (4,)]
+
+
+def test_stop_flushes_queued_writes(tmp_path: Path):
+    path = tmp_path / "writer.db"
+    sqlite3.connect(path).execute("CREATE TABLE t (x INTEGER)").connection.close()
+    writer = GroupCommitWriter(path, max_delay=0.05)
+    futures = [writer.submit(WriteStatement("INSERT INTO t VALUES (?)", (i,))) for i in range(50)]
+    writer.stop()
+
+    assert all(f.done() and f.exception() is None for f in futures)
+    assert sqlite3.connect(path).execute("SELECT COUNT(*) FROM t").fetchone() == (50,)
+    with pytest.raises(RuntimeError):
+        writer.submit(WriteStatement("INSERT INTO t VALUES (0)"))
+
+
+def test_submits_racing_stop_either_commit_or_raise(tmp_path: Path):
+    path = tmp_path / "writer.db"
+    sqlite3.connect(path).execute("CREATE TABLE t (x INTEGER)").connection.close()
+    writer = GroupCommitWriter(path, max_delay=0.001)
+    futures = []
+    rejected = []
+    start = threading.Barrier(5)
+
+    def _submitter(base: int) -> None:
+        start.wait()
+        for i in range(200):
+            try:
+                futures.append(writer.submit(WriteStatement("INSERT INTO t VALUES (?)", (base + i,))))
+            except RuntimeError:
+                rejected.append(base + i)
+
+    threads = [threading.Thread(target=_submitter, args=(n * 1000,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    start.wait()
+    writer.stop()
+    for t in threads:
+        t.join()
+
+    # Every accepted write was committed before the writer stopped; none is left hanging.
+    assert all(f.result(timeout=0) is None for f in futures)
+    assert len(futures) + len(rejected) == 800
+    assert sqlite3.connect(path).execute("SELECT COUNT(*) FROM t").fetchone() == (len(futures),)
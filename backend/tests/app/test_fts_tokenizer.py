@@ -0,0 +1,71 @@
+"""Tests for CJK-aware chunk FTS tokenization and the tokenizer migration."""
+from __future__ import annotations
+
+import pytest
+
+from app.core.config import get_settings
+from app.db.fts import query_terms, segment_for_fts
+from app.db.repositories import insert_chunks, insert_document
+from app.db.session import close_pools, init_db, pooled_connection
+from app.db.writer import stop_writers
+from app.services.retrieval import search_chunks
+
+_ZH_CHUNKS = [
+    "有丝分裂是细胞分裂的一种方式，染色体平均分配到两个子细胞。",
+    "光合作用在叶绿体中进行，把光能转化为化学能。",
+    "The Krebs cycle (柠檬酸循环) runs in the mitochondria.",
+]
+
+
+def _restart_with_tokenizer(monkeypatch, tokenizer: str) -> None:
+    stop_writers()
+    close_pools()
+    monkeypatch.setenv("FTS_TOKENIZER", tokenizer)
+    get_settings.cache_clear()
+    init_db()
+
+
+def _hits(query: str) -> list[int]:
+    return [c.chunk_index for c in search_chunks(query, "demo-user", doc_id="zh", limit=5).chunks]
+
+
+def test_bigram_segmentation_of_cjk_runs():
+    assert segment_for_fts("细胞分裂 and DNA", "bigram") == " 细胞 胞分 分裂  and DNA"
+    assert query_terms("什么是光合作用?", "bigram") == ["什么", "么是", "是光", "光合", "合作", "作用"]
+    assert query_terms("光合作用", "unicode61") == ["光合作用"]
+
+
+def test_chinese_queries_match_inside_longer_runs(tmp_db):
+    insert_document("zh", "demo-user", "生物", "zh.txt", "text/plain", 10, "/tmp/zh.txt")
+    insert_chunks("zh", [{"chunk_text": t} for t in _ZH_CHUNKS])
+
+    assert _hits("细胞分裂")[0] == 0
+    assert _hits("什么是光合作用")[0] == 1
+    assert _hits("柠檬酸循环 mitochondria")[0] == 2
+
+
+@pytest.mark.parametrize("defer_fts", [False, True])
+def test_bulk_insert_segments_text_like_the_trigger(tmp_db, defer_fts):
+    insert_document("zh", "demo-user", "生物", "zh.txt", "text/plain", 10, "/tmp/zh.txt")
+    insert_chunks("zh", [{"chunk_text": t} for t in _ZH_CHUNKS], defer_fts=defer_fts)
+    insert_chunks("zh", [{"chunk_text": "叶绿体"}], replace=True)
+
+    assert _hits("叶绿体") == [0]
+    assert _hits("细胞") == []
+
+
+def test_changing_tokenizer_rebuilds_index(tmp_db, monkeypatch):
+    _restart_with_tokenizer(monkeypatch, "unicode61")
+    insert_document("zh", "demo-user", "生物", "zh.txt", "text/plain", 10, "/tmp/zh.txt")
+    insert_chunks("zh", [{"chunk_text": t} for t in _ZH_CHUNKS])
+    assert _hits("细胞分裂") == []
+
+    _restart_with_tokenizer(monkeypatch, "trigram")
+    assert _hits("细胞分裂")[0] == 0
+    with pooled_connection() as conn:
+        row = conn.execute("SELECT value FROM app_meta WHERE key = 'fts_tokenizer'").fetchone()
+        sql = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'document_chunks_fts'").fetchone()["sql"]
+    assert row["value"] == "trigram" and "tokenize='trigram'" in sql
+
+    _restart_with_tokenizer(monkeypatch, "bigram")
+    assert _hits("光合")[0] == 1
@@ -0,0 +1,170 @@
+"""Tests for background document ingestion and the upload status endpoint."""
+from __future__ import annotations
+
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from app.core.config import get_settings
+from app.db.repositories import (
+    get_chunks_for_document,
+    get_document,
+    insert_chunks,
+    insert_document,
+    update_document_status,
+)
+from app.main import create_app
+from app.services.ingestion import reindex_documents, resume_pending_ingestions, shutdown_ingestion
+from app.services.parse_cache import cache_path, load_parsed, store_parsed
+from app.services.retrieval import search_chunks
+from app.services.uploads import file_sha256
+
+
+def _wait_for_status(client: TestClient, doc_id: str, timeout: float = 5.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while True:
+        body = client.get(f"/api/documents/{doc_id}/status").json()
+        if body["status"] != "processing" or time.monotonic() > deadline:
+            return body
+        time.sleep(0.02)
+
+
+def test_upload_returns_202_and_ingests_in_background(tmp_db):
+    client = TestClient(create_app())
+
+    res = client.post("/api/documents/upload", files={"file": ("notes.txt", b"photosynthesis makes sugar", "text/plain")})
+
+    assert res.status_code == 202
+    doc = res.json()
+    assert doc["status"] == "processing"
+    status = _wait_for_status(client, doc["id"])
+    assert status["status"] == "ready"
+    assert status["stage"] == "ready"
+    assert status["progress"] == 1.0
+    assert client.get(f"/api/documents/{doc['id']}").json()["word_count"] == 3
+    assert [c["chunk_text"] for c in get_chunks_for_document(doc["id"])] == ["photosynthesis makes sugar"]
+
+
+def test_failed_ingestion_is_reported_by_status(tmp_db):
+    client = TestClient(create_app())
+
+    res = client.post("/api/documents/upload", files={"file": ("blank.txt", b"   \n  ", "text/plain")})
+
+    status = _wait_for_status(client, res.json()["id"])
+    assert status["status"] == "failed"
+    assert status["stage"] == "failed"
+    assert "No readable text" in status["error"]
+
+
+def test_status_of_unknown_document_is_404(tmp_db):
+    client = TestClient(create_app())
+
+    assert client.get("/api/documents/missing/status").status_code == 404
+
+
+def test_documents_left_processing_are_resumed(tmp_db, tmp_path):
+    path = tmp_path / "left.txt"
+    path.write_text("interrupted upload text")
+    insert_document("d-left", "demo-user", "Left", "left.txt", "text/plain", 23, str(path))
+
+    assert resume_pending_ingestions() == 1
+    shutdown_ingestion()
+
+    assert get_document("d-left", "demo-user")["status"] == "ready"
+
+
+def test_identical_upload_reuses_parsed_chunks(tmp_db, monkeypatch):
+    client = TestClient(create_app())
+    body = b"krebs cycle oxidizes acetyl coa"
+    first = client.post("/api/documents/upload", files={"file": ("a.txt", body, "text/plain")}).json()
+    assert _wait_for_status(client, first["id"])["status"] == "ready"
+
+    def _no_parse(path):
+        raise AssertionError("duplicate upload should not be parsed")
+
+    monkeypatch.setattr("app.services.ingestion.parse_pages_in_pool", _no_parse)
+    second = client.post("/api/documents/upload", files={"file": ("copy.txt", body, "text/plain")}).json()
+
+    assert _wait_for_status(client, second["id"])["status"] == "ready"
+    assert client.get(f"/api/documents/{second['id']}").json()["word_count"] == 5
+    assert [c["chunk_text"] for c in get_chunks_for_document(second["id"])] == [body.decode()]
+    assert get_chunks_for_document(second["id"])[0]["id"] != get_chunks_for_document(first["id"])[0]["id"]
+    assert second["storage_path"] == first["storage_path"]
+    assert len(list((tmp_db.parent / "uploads").iterdir())) == 1
+
+
+def test_markdown_upload_gets_an_outline_and_section_tagged_chunks(tmp_db):
+    client = TestClient(create_app())
+    body = b"# Cells\n\nCells divide.\n\n## Mitochondria\n\nMitochondria make ATP.\n"
+
+    doc = client.post("/api/documents/upload", files={"file": ("bio.md", body, "text/markdown")}).json()
+
+    assert _wait_for_status(client, doc["id"])["status"] == "ready"
+    outline = client.get(f"/api/documents/{doc['id']}/outline").json()
+    assert [(s["level"], s["title"], s["path"], s["chunk_count"]) for s in outline["sections"]] == [
+        (1, "Cells", "Cells", 1),
+        (2, "Mitochondria", "Cells > Mitochondria", 1),
+    ]
+    assert [c["section"] for c in get_chunks_for_document(doc["id"])] == ["Cells", "Cells > Mitochondria"]
+    assert client.get("/api/documents/missing/outline").status_code == 404
+
+
+def test_reindex_rechunks_from_the_parse_cache_without_parsing(tmp_db, monkeypatch):
+    client = TestClient(create_app())
+    body = b"Cells divide by mitosis. Mitochondria make ATP. Ribosomes build proteins."
+    doc = client.post("/api/documents/upload", files={"file": ("bio.txt", body, "text/plain")}).json()
+    assert _wait_for_status(client, doc["id"])["status"] == "ready"
+    assert len(get_chunks_for_document(doc["id"])) == 1
+    assert len(list((tmp_db.parent / "parse_cache").glob("*/*.json.gz"))) == 1
+
+    def _no_parse(path):
+        raise AssertionError("cached document should not be parsed")
+
+    monkeypatch.setattr("app.services.ingestion.parse_pages_in_pool", _no_parse)
+    monkeypatch.setenv("CHUNK_TOKENS", "6")
+    monkeypatch.setenv("CHUNK_OVERLAP_TOKENS", "0")
+    get_settings.cache_clear()
+
+    assert reindex_documents(workers=2) == {"cached": 1, "parsed": 0, "failed": 0}
+    assert [c["chunk_text"] for c in get_chunks_for_document(doc["id"])] == [
+        "Cells divide by mitosis.", "Mitochondria make ATP.", "Ribosomes build proteins.",
+    ]
+    assert search_chunks("ribosomes", "demo-user", doc_id=doc["id"]).chunks[0].text == "Ribosomes build proteins."
+
+
+def test_reindex_parses_and_caches_documents_missing_from_the_cache(tmp_db, tmp_path):
+    path = tmp_path / "legacy.txt"
+    path.write_text("older upload stored before the parse cache")
+    insert_document("legacy", "demo-user", "Legacy", "legacy.txt", "text/plain", 10, str(path))
+    insert_chunks("legacy", [{"chunk_text": "stale chunk"}])
+    update_document_status("legacy", "ready")
+
+    assert reindex_documents(["legacy"]) == {"cached": 0, "parsed": 1, "failed": 0}
+    assert [c["chunk_text"] for c in get_chunks_for_document("legacy")] == [path.read_text()]
+    assert load_parsed(file_sha256(path), ".txt") == [(None, path.read_text())]
+
+
+def test_concurrent_stores_of_one_hash_leave_a_whole_entry(tmp_db):
+    versions = [[(None, f"version {n} " * 20000)] for n in range(6)]
+    start = threading.Barrier(len(versions))
+
+    def _store(pages) -> None:
+        start.wait()
+        store_parsed("ab" * 32, ".txt", pages)
+
+    threads = [threading.Thread(target=_store, args=(pages,)) for pages in versions]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert load_parsed("ab" * 32, ".txt") in versions
+    assert not list(cache_path("ab" * 32, ".txt").parent.glob("*.tmp"))
+
+
+def test_truncated_cache_entry_is_a_miss(tmp_db):
+    path = store_parsed("cd" * 32, ".txt", [(None, "hello " * 1000)])
+    path.write_bytes(path.read_bytes()[:40])
+
+    assert load_parsed("cd" * 32, ".txt") is None
@@ -0,0 +1,147 @@
+"""Tests for the document parser process pool."""
+from __future__ import annotations
+
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from app.core.config import get_settings
+from app.services.document_parser import chunk_pages, parse_document_pages
+from app.services.parse_pool import (
+    ParseMemoryError,
+    ParserPool,
+    ParseTimeoutError,
+    ParseWorkerError,
+    close_parser_pool,
+    parse_pages_in_pool,
+)
+
+
+def _slow_parse(path: Path) -> str:
+    time.sleep(30)
+    return "never"
+
+
+def _hungry_parse(path: Path) -> str:
+    hog = b"x" * (256 * 1024 * 1024)
+    time.sleep(30)
+    return str(len(hog))
+
+
+def _failing_parse(path: Path) -> str:
+    raise ValueError("bad file")
+
+
+def test_pool_parses_in_worker_and_reuses_it(tmp_path):
+    doc = tmp_path / "a.txt"
+    doc.write_text("hello\r\nworld")
+    pool = ParserPool(max_workers=1, timeout_sec=30, max_rss_bytes=None)
+    try:
+        assert pool.run(parse_document_pages, doc) == [(None, "hello\nworld")]
+        assert pool.run(parse_document_pages, doc) == [(None, "hello\nworld")]
+        assert pool._idle.qsize() == 1
+    finally:
+        pool.close()
+
+
+def test_pool_kills_worker_on_timeout(tmp_path):
+    pool = ParserPool(max_workers=1, timeout_sec=0.5, max_rss_bytes=None)
+    try:
+        started = time.monotonic()
+        with pytest.raises(ParseTimeoutError):
+            pool.run(_slow_parse, tmp_path / "slow.pdf")
+        assert time.monotonic() - started < 10
+        assert pool._idle.qsize() == 0
+    finally:
+        pool.close()
+
+
+def test_deadline_covers_the_wait_for_a_free_worker(tmp_path):
+    pool = ParserPool(max_workers=1, timeout_sec=2, max_rss_bytes=None)
+
+    def occupy_worker() -> None:
+        with pytest.raises(ParseTimeoutError):
+            pool.run(_slow_parse, tmp_path / "a.pdf")
+
+    busy = threading.Thread(target=occupy_worker)
+    busy.start()
+    try:
+        time.sleep(0.2)
+        started = time.monotonic()
+        with pytest.raises(ParseTimeoutError, match="waiting for a free worker"):
+            pool.run(_slow_parse, tmp_path / "b.pdf", deadline=started + 0.3)
+        assert time.monotonic() - started < 1.5
+    finally:
+        busy.join()
+        pool.close()
+
+
+@pytest.mark.skipif(not Path("/proc/self/statm").exists(), reason="RSS is read from /proc")
+def test_pool_kills_worker_over_memory_cap(tmp_path):
+    pool = ParserPool(max_workers=1, timeout_sec=30, max_rss_bytes=128 * 1024 * 1024)
+    try:
+        with pytest.raises(ParseMemoryError):
+            pool.run(_hungry_parse, tmp_path / "big.pdf")
+    finally:
+        pool.close()
+
+
+def test_parser_errors_are_raised_in_caller(tmp_path):
+    pool = ParserPool(max_workers=1, timeout_sec=30, max_rss_bytes=None)
+    try:
+        with pytest.raises(ParseWorkerError, match="ValueError: bad file"):
+            pool.run(_failing_parse, tmp_path / "bad.pdf")
+    finally:
+        pool.close()
+
+
+def _write_pdf(path: Path, page_texts: list[str]) -> None:
+    """Write a minimal PDF with one line of Helvetica text per page."""
+    n = len(page_texts)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % (4 + 2 * i) for i in range(n)) + b"] /Count %d >>" % n,
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, text in enumerate(page_texts):
+        stream = b"BT /F1 12 Tf 72 720 Td (" + text.encode("latin-1") + b") Tj ET"
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >>"
+            b" /Contents %d 0 R >>" % (5 + 2 * i)
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for num, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % num + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(bytes(out))
+
+
+def test_large_pdf_is_extracted_in_page_ranges_with_page_numbers(tmp_db, tmp_path, monkeypatch):
+    pdf = tmp_path / "book.pdf"
+    _write_pdf(pdf, [f"page {i} text" for i in range(1, 41)])
+    monkeypatch.setenv("PARSE_WORKERS", "3")
+    get_settings.cache_clear()
+    close_parser_pool()
+
+    pages = parse_pages_in_pool(pdf)
+
+    assert [page for page, _ in pages] == list(range(1, 41))
+    assert pages[6][1].strip() == "page 7 text"
+
+
+def test_chunk_pages_tags_chunks_with_their_first_page():
+    doc = chunk_pages([(1, "One  two.\nThree."), (2, "Four five."), (3, "Six.")], max_tokens=4, overlap_tokens=0)
+
+    assert doc.text == "One two. Three.\n\nFour five.\n\nSix."
+    assert [(doc.text[c["start"]:c["end"]], c["page"]) for c in doc.chunks] == [
+        ("One two. Three.", 1),
+        ("Four five.\n\nSix.", 2),
+    ]
@@ -0,0 +1,51 @@
+"""Tests for token-budgeted chat prompt assembly."""
+from __future__ import annotations
+
+from app.services.prompt_builder import build_prompt
+from app.services.tokens import estimate_tokens
+
+
+def _history(n: int) -> list[dict[str, str]]:
+    return [{"role": "user" if i % 2 == 0 else "assistant", "content": f"turn {i} " + "word " * 20} for i in range(n)]
+
+
+def test_unlimited_budget_keeps_every_segment_in_reading_order():
+    built = build_prompt(
+        "What is ATP?",
+        "Reply briefly.",
+        budget=0,
+        context=["mitochondria make atp", "ribosomes make protein"],
+        history=[{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"}],
+    )
+
+    assert built.text == (
+        "Recent conversation history:\n[user] hi\n[assistant] hello\n\n"
+        "Context:\nmitochondria make atp\n\nribosomes make protein\n\n"
+        "User question:\nWhat is ATP?\n\nReply briefly."
+    )
+    assert built.total_tokens == estimate_tokens(built.text)
+    assert not any(built.dropped.values())
+
+
+def test_budget_packs_context_before_history_after_the_system_prefix():
+    context = ["alpha " * 40, "beta " * 400, "gamma " * 40]
+    built = build_prompt("question", "Reply.", budget=300, context=context, history=_history(10), prefix_tokens=100)
+
+    assert built.total_tokens <= 300
+    assert built.usage["system"] == 100 + estimate_tokens("Reply.")
+    assert built.total_tokens == estimate_tokens(built.text) + 100
+    # The oversized block is skipped but the smaller lower-ranked one still fits.
+    assert "alpha" in built.text and "gamma" in built.text and "beta" not in built.text
+    assert built.dropped["context"] == 1
+    # Only the newest turns are kept, contiguous up to the last one.
+    kept = [line for line in built.text.splitlines() if line.startswith("[")]
+    assert kept and kept[-1].startswith("[assistant] turn 9")
+    assert built.dropped["history"] == 10 - len(kept)
+
+
+def test_message_and_instructions_are_kept_past_the_budget():
+    built = build_prompt("long " * 50, "Reply.", budget=10, context=["ctx"], history=_history(2))
+
+    assert built.text == "User question:\n" + "long " * 50 + "\n\nReply."
+    assert built.usage["context"] == built.usage["history"] == 0
+    assert built.dropped["context"] == 1 and built.dropped["history"] == 2
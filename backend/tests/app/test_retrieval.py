@@ -0,0 +1,161 @@
+"""Tests for BM25 chunk retrieval and its use in chat context."""
+from __future__ import annotations
+
+from agno.models.message import Message
+from agno.run.agent import RunOutput
+from fastapi.testclient import TestClient
+
+from app.db.repositories import create_subject, insert_chunks, insert_document, set_document_subject
+from app.main import create_app
+from app.services.ingestion import _index_vectors
+from app.services.retrieval import (
+    RetrievedChunk,
+    build_match_query,
+    format_snippets,
+    hybrid_search,
+    invalidate_document,
+    reciprocal_rank_fusion,
+    search_chunks,
+)
+
+
+def _doc(doc_id: str, title: str, chunks: list[str], user_id: str = "demo-user") -> None:
+    insert_document(doc_id, user_id, title, f"{doc_id}.txt", "text/plain", 10, f"/tmp/{doc_id}.txt")
+    insert_chunks(doc_id, [{"chunk_text": t, "page": i + 1} for i, t in enumerate(chunks)])
+
+
+def test_build_match_query_quotes_distinct_terms_without_stopwords():
+    assert build_match_query('What is the "Krebs" cycle? krebs!') == '"krebs" OR "cycle"'
+    assert build_match_query("is the a") is None
+
+
+def test_search_ranks_by_bm25_within_document(tmp_db):
+    _doc("bio", "Biology", [
+        "cells divide by mitosis",
+        "the krebs cycle runs in the mitochondria; the krebs cycle makes NADH",
+        "photosynthesis happens in chloroplasts",
+    ])
+    _doc("other", "Other", ["krebs cycle krebs cycle krebs cycle"])
+
+    result = search_chunks("explain the krebs cycle", "demo-user", doc_id="bio", limit=2)
+
+    assert [(c.doc_id, c.chunk_index, c.page) for c in result.chunks] == [("bio", 1, 2)]
+    assert result.latency_ms >= 0
+
+
+def test_search_scopes_by_subject_and_user(tmp_db):
+    subject = create_subject("demo-user", "Chem")
+    _doc("c1", "Acids", ["acids donate protons"])
+    _doc("c2", "Bases", ["bases accept protons"])
+    _doc("x", "Unfiled", ["protons everywhere"])
+    for doc_id in ("c1", "c2"):
+        set_document_subject(doc_id, "demo-user", subject["id"])
+
+    hits = search_chunks("protons", "demo-user", subject_id=subject["id"]).chunks
+    assert sorted(c.doc_id for c in hits) == ["c1", "c2"]
+    assert search_chunks("protons", "someone-else", subject_id=subject["id"]).chunks == []
+
+
+def test_format_snippets_names_source_and_trims(tmp_db):
+    _doc("bio", "Biology", ["word " * 100])
+    [block] = format_snippets(search_chunks("word", "demo-user", doc_id="bio").chunks, max_chars=30)
+
+    assert block.startswith("Relevant passage (Biology, p. 1):\n")
+    assert block.endswith(" …")
+
+
+def test_chat_prompt_includes_retrieved_chunks(tmp_db, monkeypatch):
+    _doc("bio", "Biology", ["cells divide by mitosis", "the krebs cycle makes NADH"])
+    prompts: list[str] = []
+
+    async def fake_arun(self, agno_msgs, **kwargs):
+        prompts.append(str(agno_msgs[-1].content))
+        return RunOutput(messages=[*agno_msgs, Message(role="assistant", content="Sure!")])
+
+    monkeypatch.setattr("agno.agent.Agent.arun", fake_arun)
+    client = TestClient(create_app())
+
+    res = client.post("/api/ai/chat", json={"message": "what does the krebs cycle make?", "doc_id": "bio"})
+
+    assert res.status_code == 200
+    assert "Relevant passage (Biology, p. 2):\nthe krebs cycle makes NADH" in prompts[0]
+    assert "mitosis" not in prompts[0]
+
+
+def _chunk(rowid: int) -> RetrievedChunk:
+    return RetrievedChunk(rowid=rowid, doc_id="d", chunk_index=rowid, page=None, section=None, text="", title="", score=0.0)
+
+
+def test_reciprocal_rank_fusion_prefers_chunks_ranked_by_both():
+    keyword = [_chunk(1), _chunk(2), _chunk(3)]
+    semantic = [_chunk(3), _chunk(4), _chunk(1)]
+
+    fused = reciprocal_rank_fusion([keyword, semantic], k=3)
+
+    assert [c.rowid for c in fused] == [1, 3, 2]
+    assert fused[0].score == -(1 / 61 + 1 / 63)
+
+
+def test_hybrid_search_caches_and_invalidates_per_document(tmp_db):
+    _doc("bio", "Biology", ["the krebs cycle makes NADH"])
+    _doc("chem", "Chemistry", ["krebs was a chemist"])
+    for doc_id in ("bio", "chem"):
+        _index_vectors(doc_id)
+
+    first = hybrid_search("Krebs cycle?", "demo-user", doc_id="bio")
+    assert not first.cached and [c.doc_id for c in first.chunks] == ["bio"]
+    assert hybrid_search("  krebs   CYCLE ", "demo-user", doc_id="bio").cached
+    assert hybrid_search("krebs", "demo-user", doc_id="chem").cached is False
+    assert hybrid_search("krebs", "demo-user", doc_id="chem").cached
+
+    insert_chunks("bio", [{"chunk_text": "glycolysis splits glucose"}], replace=True)
+    _index_vectors("bio")
+
+    assert hybrid_search("krebs cycle", "demo-user", doc_id="bio").chunks == []
+    assert hybrid_search("krebs", "demo-user", doc_id="chem").cached
+
+
+def test_result_invalidated_mid_search_is_not_cached(tmp_db, monkeypatch):
+    _doc("bio", "Biology", ["the krebs cycle makes NADH"])
+
+    reingests = ["bio"]
+
+    def search_then_reingest(*args, **kwargs):
+        result = search_chunks(*args, **kwargs)
+        if reingests:
+            invalidate_document(reingests.pop())
+        return result
+
+    monkeypatch.setattr("app.services.retrieval.search_chunks", search_then_reingest)
+    assert not hybrid_search("krebs", "demo-user", doc_id="bio").cached
+    assert not hybrid_search("krebs", "demo-user", doc_id="bio").cached
+    assert hybrid_search("krebs", "demo-user", doc_id="bio").cached
+
+
+def test_moving_a_document_into_a_subject_invalidates_subject_results(tmp_db):
+    subject = create_subject("demo-user", "Bio")
+    _doc("bio", "Biology", ["the krebs cycle makes NADH"])
+    client = TestClient(create_app())
+
+    assert hybrid_search("krebs", "demo-user", subject_id=subject["id"]).chunks == []
+    client.patch("/api/documents/bio", json={"subject_id": subject["id"]})
+
+    result = hybrid_search("krebs", "demo-user", subject_id=subject["id"])
+    assert not result.cached and [c.doc_id for c in result.chunks] == ["bio"]
+
+
+def test_section_narrows_retrieval_to_its_subtree(tmp_db):
+    insert_document("bio", "demo-user", "Biology", "bio.md", "text/markdown", 10, "/tmp/bio.md")
+    insert_chunks("bio", [
+        {"chunk_text": "energy from glucose in mitochondria", "section": "Cells > Mitochondria"},
+        {"chunk_text": "energy stored as glucose", "section": "Energy"},
+        {"chunk_text": "cell energy overview", "section": "Cells"},
+    ])
+
+    narrowed = hybrid_search("glucose energy", "demo-user", doc_id="bio", section="Cells")
+    everything = hybrid_search("glucose energy", "demo-user", doc_id="bio")
+
+    assert {c.section for c in narrowed.chunks} == {"Cells", "Cells > Mitochondria"}
+    assert len(everything.chunks) == 3
+    assert search_chunks("glucose", "demo-user", doc_id="bio", section="Cells > Mito").chunks == []
+    assert format_snippets(narrowed.chunks[:1])[0].startswith("Relevant passage (Biology, Cells")
@@ -0,0 +1,43 @@
+"""Tests for the retrieval LRU cache."""
+from __future__ import annotations
+
+from app.services.retrieval_cache import RetrievalCache, normalize_query
+
+
+def test_normalize_query_folds_case_space_and_edge_punctuation():
+    assert normalize_query("  What is  the Krebs\nCycle?? ") == "what is the krebs cycle"
+
+
+def test_lru_evicts_least_recently_used_and_cleans_deps():
+    cache = RetrievalCache(max_entries=2)
+    cache.put("a", 1, ["doc:1"])
+    cache.put("b", 2, ["doc:2"])
+    assert cache.get("a") == 1
+    cache.put("c", 3, ["doc:3"])
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.invalidate("doc:2") == 0
+
+
+def test_invalidate_drops_only_dependent_entries():
+    cache = RetrievalCache(max_entries=10)
+    cache.put("doc1", 1, ["doc:1"])
+    cache.put("subject", 2, ["subject:s", "doc:1", "doc:2"])
+    cache.put("doc2", 3, ["doc:2"])
+
+    assert cache.invalidate("doc:1") == 2
+    assert cache.get("doc2") == 3
+    assert len(cache) == 1
+
+
+def test_put_skips_results_computed_across_an_invalidation():
+    cache = RetrievalCache(max_entries=10)
+    since = cache.mark()
+    cache.invalidate("doc:1")
+    assert cache.put("stale", 1, ["doc:1"], since=since) is False
+    assert cache.put("other", 2, ["doc:2"], since=since) is True
+    since = cache.mark()
+    cache.clear()
+    assert cache.put("cleared", 3, ["doc:2"], since=since) is False
+    assert cache.get("stale") is None and cache.get("cleared") is None
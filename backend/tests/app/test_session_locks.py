@@ -0,0 +1,65 @@
+"""Tests for per-session turn serialization."""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app.api import chat as chat_api
+from app.core.config import get_settings
+from app.core.metrics import snapshot
+from app.core.session_locks import SessionLockRegistry
+from app.main import create_app
+
+
+def test_turns_of_one_session_serialize_and_other_sessions_overlap(tmp_db):
+    registry = SessionLockRegistry()
+    log: list[str] = []
+
+    async def turn(session_id: str, name: str) -> None:
+        async with registry.hold(session_id):
+            log.append(f"{name}+")
+            await asyncio.sleep(0.02)
+            log.append(f"{name}-")
+
+    async def main() -> None:
+        await asyncio.gather(turn("s1", "a"), turn("s1", "b"), turn("s2", "c"))
+
+    asyncio.run(main())
+
+    assert log.index("a-") < log.index("b+")
+    assert log.index("c+") < log.index("a-")
+    assert len(registry) == 0
+    assert snapshot()["timings"]["chat.session_lock_wait"]["count"] == 3
+
+
+def test_busy_session_is_rejected_with_rate_limited(tmp_db, monkeypatch):
+    registry = SessionLockRegistry()
+    monkeypatch.setattr(chat_api, "get_session_locks", lambda: registry)
+
+    async def main() -> None:
+        async with registry.hold("s1"):
+            with pytest.raises(HTTPException) as exc:
+                async with chat_api._session_turn("s1", wait=False):
+                    pass
+            assert exc.value.status_code == 429
+            assert exc.value.detail["code"] == "rate_limited"
+            async with chat_api._session_turn("s2", wait=False):
+                pass
+
+    asyncio.run(main())
+    assert snapshot()["counters"]["chat.session_busy_rejected"] == 1
+
+
+def test_stream_rejects_busy_session_before_streaming(tmp_db, monkeypatch):
+    monkeypatch.setenv("CHAT_REJECT_BUSY_SESSION", "true")
+    get_settings.cache_clear()
+    monkeypatch.setattr(SessionLockRegistry, "busy", lambda self, session_id: session_id == "s-busy")
+    client = TestClient(create_app())
+
+    res = client.post("/api/ai/chat/stream", json={"message": "hi", "session_id": "s-busy"})
+
+    assert res.status_code == 429
+    assert res.json()["detail"]["code"] == "rate_limited"
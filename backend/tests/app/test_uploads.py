@@ -0,0 +1,48 @@
+"""Tests for streaming uploads to disk."""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import io
+
+import pytest
+from fastapi import UploadFile
+from fastapi.testclient import TestClient
+
+from app.core.config import get_settings
+from app.main import create_app
+from app.services.uploads import UPLOAD_BLOCK_SIZE, UploadTooLargeError, spool_upload
+
+
+def test_spool_upload_writes_blocks_and_hashes(tmp_path):
+    data = b"x" * (UPLOAD_BLOCK_SIZE * 2 + 17)
+    upload = UploadFile(io.BytesIO(data), filename="big.txt")
+
+    stored = asyncio.run(spool_upload(upload, tmp_path / "big.txt", max_bytes=len(data)))
+
+    assert stored.size_bytes == len(data)
+    assert stored.content_hash == hashlib.sha256(data).hexdigest()
+    assert (tmp_path / "big.txt").read_bytes() == data
+    assert list(tmp_path.iterdir()) == [tmp_path / "big.txt"]
+
+
+def test_spool_upload_stops_at_size_limit_and_leaves_nothing(tmp_path):
+    upload = UploadFile(io.BytesIO(b"x" * (UPLOAD_BLOCK_SIZE * 3)), filename="big.txt")
+
+    with pytest.raises(UploadTooLargeError):
+        asyncio.run(spool_upload(upload, tmp_path / "big.txt", max_bytes=UPLOAD_BLOCK_SIZE))
+
+    assert upload.file.tell() == UPLOAD_BLOCK_SIZE * 2
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_oversized_upload_is_rejected(tmp_db, monkeypatch):
+    monkeypatch.setenv("MAX_UPLOAD_BYTES", "10")
+    get_settings.cache_clear()
+    client = TestClient(create_app())
+
+    res = client.post("/api/documents/upload", files={"file": ("notes.txt", b"way more than ten bytes", "text/plain")})
+
+    assert res.status_code == 400
+    assert res.json()["detail"]["code"] == "invalid_document"
+    assert list((tmp_db.parent / "uploads").glob("*")) == []
@@ -0,0 +1,95 @@
+"""Tests for the local embedder and the memory-mapped dense chunk index."""
+from __future__ import annotations
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.db.repositories import insert_chunks, insert_document
+from app.services.embeddings import HashingEmbedder
+from app.services.ingestion import _index_vectors
+from app.services.retrieval import semantic_search
+from app.services.vector_index import VectorIndex
+
+
+def _unit_rows(n: int, dim: int, seed: int = 0) -> np.ndarray:
+    rows = np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+def test_hashing_embedder_is_normalized_and_topical():
+    emb = HashingEmbedder(dim=128)
+    vecs = emb.embed(["the krebs cycle makes atp", "krebs cycle produces atp", "french revolution of 1789", ""])
+
+    assert vecs.shape == (4, 128) and vecs.dtype == np.float32
+    assert np.allclose(np.linalg.norm(vecs[:3], axis=1), 1.0, atol=1e-5)
+    assert not vecs[3].any()
+    assert vecs[0] @ vecs[1] > vecs[0] @ vecs[2]
+
+
+def test_index_search_top_k_candidates_and_newest_row_wins(tmp_path):
+    index = VectorIndex(tmp_path / "u", dim=16, dtype="float32", embedder_name="t")
+    rows = _unit_rows(5, 16)
+    index.add([10, 11, 12, 13, 14], rows)
+
+    assert [rowid for rowid, _ in index.search(rows[2], k=2)][0] == 12
+    assert [rowid for rowid, _ in index.search(rows[2], k=3, candidates=[10, 14])] in ([10, 14], [14, 10])
+
+    index.add([12], rows[4:5])  # rowid 12 re-embedded: the old row no longer matches
+    top_rowid, score = index.search(rows[2], k=1, candidates=[12])[0]
+    assert top_rowid == 12 and abs(score - float(rows[4] @ rows[2])) < 1e-5
+
+
+def test_index_persists_and_resets_on_embedder_change(tmp_path):
+    rows = _unit_rows(3, 8)
+    VectorIndex(tmp_path / "u", dim=8, dtype="float16", embedder_name="a").add([1, 2, 3], rows)
+
+    reopened = VectorIndex(tmp_path / "u", dim=8, dtype="float16", embedder_name="a")
+    assert len(reopened) == 3
+    assert reopened.search(rows[1], k=1)[0][0] == 2
+    assert len(VectorIndex(tmp_path / "u", dim=8, dtype="float16", embedder_name="b")) == 0
+
+
+def test_ivf_search_finds_exact_match_after_training(tmp_path, monkeypatch):
+    monkeypatch.setenv("VECTOR_IVF_MIN_ROWS", "400")
+    monkeypatch.setenv("VECTOR_IVF_NPROBE", "4")
+    get_settings.cache_clear()
+    index = VectorIndex(tmp_path / "u", dim=32, dtype="float32", embedder_name="t")
+    rows = _unit_rows(1000, 32)
+    index.add(range(500), rows[:500])
+    index.add(range(500, 1000), rows[500:])
+
+    assert (tmp_path / "u" / "ivf.npy").exists()
+    assert all(index.search(rows[i], k=1)[0][0] == i for i in (3, 499, 777))
+    get_settings.cache_clear()
+
+
+def test_retraining_ivf_leaves_a_readers_old_mapping_intact(tmp_path, monkeypatch):
+    monkeypatch.setenv("VECTOR_IVF_MIN_ROWS", "200")
+    get_settings.cache_clear()
+    index = VectorIndex(tmp_path / "u", dim=16, dtype="float32", embedder_name="t")
+    rows = _unit_rows(800, 16)
+    index.add(range(200), rows[:200])
+    old_lists = index._lists  # what a search in flight holds
+    snapshot = np.array(old_lists)
+
+    index.add(range(200, 800), rows[200:])  # count doubled: retrains and rewrites lists.bin
+
+    assert index._ivf_trained_at == 800 and len(index._lists) == 800
+    assert np.array_equal(np.asarray(old_lists), snapshot)
+    assert not list((tmp_path / "u").glob("*.tmp"))
+    get_settings.cache_clear()
+
+
+def test_semantic_search_over_ingested_chunks(tmp_db):
+    insert_document("bio", "demo-user", "Biology", "bio.txt", "text/plain", 10, "/tmp/bio.txt")
+    insert_chunks("bio", [
+        {"chunk_text": "mitochondria produce atp in the cell"},
+        {"chunk_text": "the french revolution began in 1789"},
+    ])
+    _index_vectors("bio")
+
+    result = semantic_search("how do mitochondria produce atp", "demo-user", doc_id="bio", limit=1)
+
+    assert [(c.doc_id, c.chunk_index) for c in result.chunks] == [("bio", 0)]
+    assert result.chunks[0].score < 0
+    assert semantic_search("mitochondria", "someone-else").chunks == []
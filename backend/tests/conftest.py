@@ -0,0 +1,38 @@
+"""Shared pytest fixtures."""
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from app.core.config import get_settings
+
+
+@pytest.fixture
+def tmp_db(tmp_path: Path, monkeypatch):
+    """Point the app at a fresh, migrated SQLite database under tmp_path."""
+    from app.core.idempotency import reset_idempotent_turns
+    from app.core.metrics import reset_metrics
+    from app.db.session import close_pools, init_db
+    from app.db.writer import stop_writers
+    from app.services.ingestion import shutdown_ingestion
+    from app.services.retrieval import reset_retrieval_cache
+    from app.services.vector_index import close_vector_indexes
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("DATABASE_URL", "sqlite:///waifu_tutor.db")
+    monkeypatch.setenv("UPLOAD_DIR", str(tmp_path / "uploads"))
+    monkeypatch.setenv("LOG_DIR", str(tmp_path / "logs"))
+    monkeypatch.setenv("VECTOR_INDEX_DIR", str(tmp_path / "vectors"))
+    monkeypatch.setenv("PARSE_CACHE_DIR", str(tmp_path / "parse_cache"))
+    get_settings.cache_clear()
+    init_db()
+    yield get_settings().sqlite_path()
+    shutdown_ingestion()
+    stop_writers()
+    close_pools()
+    close_vector_indexes()
+    reset_retrieval_cache()
+    reset_metrics()
+    reset_idempotent_turns()
+    get_settings.cache_clear()
@@ -2,7 +2,9 @@ import { apiClient } from "./api-client";
 import type {
   ChatMessage,
   ChatResponse,
+  DocumentIngestionStatus,
   DocumentMeta,
+  DocumentOutline,
   Flashcard,
   NoteFolder,
   StudyNote,
@@ -91,17 +93,79 @@ export const setDocumentSubject = async (docId: string, subjectId: string | null
   return data;
 };
 
+const DOCUMENT_STATUS_POLL_MS = 500;
+// How long uploadDocument waits for background parsing/indexing before giving up; the document
+// keeps processing on the server and shows up in the list once it is ready.
+const DOCUMENT_PROCESSING_TIMEOUT_MS = 10 * 60 * 1000;
+
+export const getDocumentStatus = async (
+  docId: string,
+  signal?: AbortSignal
+): Promise<DocumentIngestionStatus> => {
+  const { data } = await apiClient.get<DocumentIngestionStatus>(`/api/documents/${docId}/status`, { signal });
+  return data;
+};
+
+export const getDocumentOutline = async (docId: string): Promise<DocumentOutline> => {
+  const { data } = await apiClient.get<DocumentOutline>(`/api/documents/${docId}/outline`);
+  return data;
+};
+
+export interface UploadDocumentOptions {
+  /** Cancels the upload or the wait for processing (rejects with the signal's reason). */
+  signal?: AbortSignal;
+  /** Max wait for processing after the upload is accepted (default 10 minutes). */
+  timeoutMs?: number;
+}
+
+const abortReason = (signal: AbortSignal): unknown => signal.reason ?? new Error("Upload cancelled");
+
+const sleep = (ms: number, signal?: AbortSignal): Promise<void> =>
+  new Promise((resolve, reject) => {
+    if (signal?.aborted) {
+      reject(abortReason(signal));
+      return;
+    }
+    const onAbort = () => {
+      clearTimeout(timeoutId);
+      reject(abortReason(signal!));
+    };
+    const timeoutId = setTimeout(() => {
+      signal?.removeEventListener("abort", onAbort);
+      resolve();
+    }, ms);
+    signal?.addEventListener("abort", onAbort, { once: true });
+  });
+
 export const uploadDocument = async (
   file: File,
-  folderName?: string | null
+  folderName?: string | null,
+  { signal, timeoutMs = DOCUMENT_PROCESSING_TIMEOUT_MS }: UploadDocumentOptions = {}
 ): Promise<DocumentMeta> => {
   const form = new FormData();
   form.append("file", file);
   if (folderName) form.append("folder_name", folderName);
   const { data } = await apiClient.post<DocumentMeta>("/api/documents/upload", form, {
     headers: { "Content-Type": "multipart/form-data" },
+    signal,
   });
-  return data;
+  // Parsing/indexing runs in the background (202); wait until the document is ready or failed.
+  const deadline = Date.now() + timeoutMs;
+  let status = await getDocumentStatus(data.id, signal);
+  while (status.status === "processing") {
+    if (Date.now() + DOCUMENT_STATUS_POLL_MS > deadline) {
+      throw Object.assign(
+        new Error(`"${data.filename}" is still processing after ${Math.round(timeoutMs / 1000)}s; it will appear in your documents when ready.`),
+        { code: "processing_timeout", docId: data.id }
+      );
+    }
+    await sleep(DOCUMENT_STATUS_POLL_MS, signal);
+    status = await getDocumentStatus(data.id, signal);
+  }
+  if (status.status === "failed") {
+    throw new Error(status.error ?? "Document processing failed");
+  }
+  return { ...data, status: status.status };
 };
 
 export const summarizeDocument = async (
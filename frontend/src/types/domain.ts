@@ -23,6 +23,27 @@ export interface DocumentMeta {
   subject_needs_confirmation?: boolean;
 }
 
+export interface DocumentIngestionStatus {
+  doc_id: string;
+  status: DocumentMeta["status"];
+  stage: "queued" | "parsing" | "chunking" | "indexing" | "ready" | "failed" | "processing";
+  progress: number | null;
+  error: string | null;
+}
+
+export interface DocumentSection {
+  section_index: number;
+  level: number;
+  title: string;
+  path: string;
+  chunk_count: number;
+}
+
+export interface DocumentOutline {
+  doc_id: string;
+  sections: DocumentSection[];
+}
+
 export interface Subject {
   id: string;
   user_id: string;